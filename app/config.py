@@ -22,6 +22,115 @@ class Settings(BaseSettings):
 
     SUPPLY_CHAIN_DATABASE_URL: str
 
+    # --- Read replica cho tool ERP chỉ đọc (rỗng = dùng database chính) ---
+    FINANCE_DATABASE_REPLICA_URL: str = ""
+    HRM_DATABASE_REPLICA_URL: str = ""
+    SALE_CRM_DATABASE_REPLICA_URL: str = ""
+    SUPPLY_CHAIN_DATABASE_REPLICA_URL: str = ""
+
+    # --- Connection pool (app/db/engine_factory.py, áp dụng cho cả 5 database) ---
+    # DB_POOL_SIZE_OVERRIDES: pool_size riêng theo database, VD: '{"supply_chain": 20}'
+    # DB_STATEMENT_TIMEOUT_MS: 0 = không giới hạn (chỉ áp dụng PostgreSQL)
+    DB_POOL_SIZE: int = 10
+    DB_POOL_SIZE_OVERRIDES: dict[str, int] = {}
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 15000
+    DB_ECHO: bool = False
+
+    # --- Embedding backend ---
+    # EMBEDDING_DEVICE: "auto" | "cpu" | "cuda" | "mps"
+    # EMBEDDING_BACKEND: "torch" (fp32) | "torch_int8" (dynamic quantization, CPU) | "onnx"
+    # EMBEDDING_NUM_THREADS: 0 = để torch tự chọn
+    EMBEDDING_DEVICE: str = "auto"
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_NUM_THREADS: int = 0
+
+    # --- Embedding micro-batching (gom câu hỏi từ nhiều request) ---
+    EMBED_BATCH_MAX_SIZE: int = 32
+    EMBED_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # --- Cache embedding câu hỏi (LRU trong RAM + SQLite trên đĩa) ---
+    # EMBED_CACHE_PATH rỗng = <project_root>/cache/query_embeddings.sqlite
+    EMBED_CACHE_ENABLED: bool = True
+    EMBED_CACHE_MEMORY_ITEMS: int = 2048
+    EMBED_CACHE_DISK_ITEMS: int = 100000
+    EMBED_CACHE_PATH: str = ""
+
+    # --- Retrieval ---
+    # RETRIEVAL_MODE: "dense" (chỉ Chroma) | "hybrid" (Chroma + BM25, gộp bằng RRF)
+    RETRIEVAL_MODE: str = "hybrid"
+    RETRIEVAL_CANDIDATES: int = 20
+    RRF_K: int = 60
+    # Second-stage bằng lexical weights của BGE-M3 (chỉ khi EMBEDDING_BACKEND="flag_m3")
+    LEXICAL_RERANK: bool = True
+    LEXICAL_RERANK_WEIGHT: float = 0.3
+
+    # --- Cross-encoder rerank (2 giai đoạn) ---
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    RERANK_CANDIDATES: int = 30
+    RERANK_BATCH_SIZE: int = 32
+    RERANK_BUDGET_MS: float = 300.0
+    RERANK_CACHE_ITEMS: int = 50000
+
+    # --- LLM (Gemini) ---
+    # LLM_API_ENDPOINT: rỗng = endpoint mặc định của Google; đặt khi dùng proxy / stub server
+    # LLM_TRANSPORT: rỗng = mặc định của SDK (grpc, gọi async native) | "rest"
+    # LLM_MODEL_<NGHIỆP VỤ>: model riêng cho từng luồng chat; rỗng = dùng LLM_MODEL
+    LLM_MODEL: str = "gemini-2.5-flash-lite"
+    LLM_MODEL_RAG: str = ""
+    LLM_MODEL_FINANCE: str = ""
+    LLM_MODEL_HRM: str = ""
+    LLM_MODEL_SALE_CRM: str = "gemini-2.5-flash"
+    LLM_MODEL_SUPPLY_CHAIN: str = "gemini-2.5-flash"
+    LLM_API_ENDPOINT: str = ""
+    LLM_TRANSPORT: str = ""
+    LLM_MAX_CONCURRENCY: int = 256
+
+    # --- Thread pool cho phần blocking của request async (DB, retrieval) ---
+    DB_EXECUTOR_WORKERS: int = 32
+    RETRIEVAL_EXECUTOR_WORKERS: int = 32
+
+    # --- Chạy song song các tool của 1 intent ghép ---
+    # TOOL_TIMEOUT_SECONDS: quá hạn -> tool đó trả {"error": ...}, các tool khác vẫn dùng được
+    TOOL_EXECUTOR_WORKERS: int = 32
+    TOOL_TIMEOUT_SECONDS: float = 5.0
+
+    # --- Cache kết quả tool ERP đọc dữ liệu ít thay đổi (TTL khai báo ở từng tool) ---
+    # TOOL_CACHE_WRITE_GRACE_SECONDS: sau khi ghi, không cache kết quả đọc trong khoảng này
+    # (đặt >= độ trễ của read replica)
+    TOOL_CACHE_ENABLED: bool = True
+    TOOL_CACHE_WRITE_GRACE_SECONDS: float = 5.0
+
+    # --- Chỉ mục tên sản phẩm / kho / nhà cung cấp trong RAM (tra tên -> ID) ---
+    # Quá NAME_INDEX_REFRESH_SECONDS -> nạp lại ở nền, trong lúc đó vẫn dùng bản cũ
+    NAME_INDEX_REFRESH_SECONDS: float = 300.0
+
+    # --- Router ngữ nghĩa (keyword không khớp -> so embedding câu hỏi với câu mẫu của intent) ---
+    # SEMANTIC_ROUTER_CACHE_PATH rỗng = <project_root>/cache/intent_prototypes.npz
+    # SEMANTIC_ROUTER_MIN_SCORE phụ thuộc model embedding: hiệu chỉnh bằng scripts/bench_semantic_router.py
+    # Mặc định tắt: 0.75 chưa đo trên backend production; ngưỡng sai -> câu hỏi RAG bị
+    # trả lời bằng dữ liệu ERP không liên quan. Chạy bench, đặt MIN_SCORE rồi mới bật.
+    SEMANTIC_ROUTER_ENABLED: bool = False
+    SEMANTIC_ROUTER_MIN_SCORE: float = 0.75
+    SEMANTIC_ROUTER_CACHE_PATH: str = ""
+
+    # --- Câu trả lời theo mẫu, không gọi LLM (app/services/answer_templates.py) ---
+    # Intent có trong tập này + kết quả đơn giản -> trả lời ngay; bỏ intent khỏi tập = quay về Gemini
+    # Env: TEMPLATED_ANSWER_INTENTS='["payslip", "account_balance"]'; '[]' = tắt hẳn
+    TEMPLATED_ANSWER_INTENTS: set[str] = {
+        "get_purchase_order_status",
+        "get_inventory_stock_by_sku",
+        "get_inventory_stock",
+        "payslip",
+        "ar_invoice_status",
+        "ap_invoice_status",
+        "account_balance",
+    }
+
     model_config = SettingsConfigDict(env_file=env_path)
 
 # Tạo một đối tượng 'settings' duy nhất
@@ -1,27 +1,128 @@
 # app/core/embedder.py
 
+import torch
 from sentence_transformers import SentenceTransformer
 from functools import lru_cache
 
+from app.config import settings
+
 # Cập nhật tên model theo yêu cầu của bạn
 MODEL_NAME = "BAAI/bge-m3"
 
+# 'flag_m3' dùng BGEM3FlagModel (thư viện FlagEmbedding): trả về cả dense vector
+# và lexical weights (sparse) trong CÙNG một lần forward.
+SUPPORTED_BACKENDS = ("torch", "torch_int8", "onnx", "flag_m3")
+
+
+def resolve_device(device: str = "auto") -> str:
+    """
+    Chọn device thực tế. 'auto' = cuda nếu có GPU, mps nếu là Apple Silicon, ngược lại cpu.
+    """
+    device = (device or "auto").lower()
+    if device != "auto":
+        if device.startswith("cuda") and not torch.cuda.is_available():
+            print(f"CẢNH BÁO: Không có GPU, chuyển '{device}' sang 'cpu'.")
+            return "cpu"
+        return device
+
+    if torch.cuda.is_available():
+        return "cuda"
+    if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def load_embedding_model(
+    device: str = "auto",
+    backend: str = "torch",
+    num_threads: int = 0
+) -> SentenceTransformer:
+    """
+    Tải model embedding theo cấu hình (không cache).
+    - backend='torch'      : fp32 như cũ
+    - backend='torch_int8' : dynamic quantization int8 cho các lớp Linear (chỉ CPU)
+    - backend='onnx'       : dùng ONNX Runtime (sentence-transformers >= 3.2, cần 'optimum[onnxruntime]')
+    - backend='flag_m3'    : BGEM3FlagModel (cần 'FlagEmbedding'), hỗ trợ encode_with_sparse()
+    """
+    backend = (backend or "torch").lower()
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"EMBEDDING_BACKEND không hợp lệ: {backend}. Hỗ trợ: {SUPPORTED_BACKENDS}")
+
+    resolved = resolve_device(device)
+
+    if num_threads and num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+    if backend == "torch_int8" and resolved != "cpu":
+        print(f"CẢNH BÁO: int8 dynamic quantization chỉ chạy trên CPU, bỏ qua device '{resolved}'.")
+        resolved = "cpu"
+
+    print(f"Đang tải mô hình embedding: {MODEL_NAME} (device={resolved}, backend={backend})...")
+
+    if backend == "flag_m3":
+        try:
+            from FlagEmbedding import BGEM3FlagModel
+        except ImportError as e:
+            raise ImportError("EMBEDDING_BACKEND='flag_m3' cần cài thư viện 'FlagEmbedding'") from e
+
+        model = BGEM3FlagModel(
+            MODEL_NAME,
+            use_fp16=resolved.startswith("cuda"),
+            devices=resolved
+        )
+        print("Tải mô hình thành công.")
+        return model
+
+    if backend == "onnx":
+        model = SentenceTransformer(MODEL_NAME, device=resolved, backend="onnx")
+    else:
+        model = SentenceTransformer(MODEL_NAME, device=resolved)
+
+    if backend == "torch_int8":
+        model = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    model.eval()
+    print("Tải mô hình thành công.")
+    return model
+
+
 @lru_cache(maxsize=1) # Dùng cache để chỉ tải model 1 lần
 def get_embedding_model():
     """
-    Khởi tạo và trả về mô hình embedding BAAI/bge-m3.
+    Khởi tạo và trả về mô hình embedding BAAI/bge-m3 theo cấu hình trong Settings.
     """
-    print(f"Đang tải mô hình embedding: {MODEL_NAME}...")
-    
-    # BGE-M3 yêu cầu 'device' (CPU hoặc CUDA)
-    # và 'normalize_embeddings=True' để có hiệu suất tốt nhất
-    model = SentenceTransformer(
-        MODEL_NAME,
-        device="cuda"  # Dùng 'cuda' nếu bạn có GPU
+    return load_embedding_model(
+        device=settings.EMBEDDING_DEVICE,
+        backend=settings.EMBEDDING_BACKEND,
+        num_threads=settings.EMBEDDING_NUM_THREADS
     )
-    
-    print("Tải mô hình thành công.")
-    return model
+
+def supports_sparse(model=None) -> bool:
+    """
+    Model hiện tại có trả về lexical weights (sparse) hay không.
+    """
+    model = model if model is not None else get_embedding_model()
+    return not isinstance(model, SentenceTransformer)
+
+
+def encode_dense(model, texts: list[str], batch_size: int = 32):
+    """
+    Encode dense (đã normalize) cho mọi backend, trả về numpy array.
+    """
+    if supports_sparse(model):
+        return model.encode(
+            texts,
+            batch_size=batch_size,
+            return_dense=True,
+            return_sparse=False,
+            return_colbert_vecs=False
+        )["dense_vecs"]
+
+    # 'normalize_embeddings=True' rất quan trọng cho BGE
+    return model.encode(texts, normalize_embeddings=True, batch_size=batch_size)
+
 
 def embed_texts(texts: list[str]) -> list[list[float]]:
     """
@@ -29,12 +130,31 @@ def embed_texts(texts: list[str]) -> list[list[float]]:
     BGE-M3 yêu cầu normalize_embeddings=True.
     """
     model = get_embedding_model()
-    
-    # 'normalize_embeddings=True' rất quan trọng cho BGE
-    embeddings = model.encode(texts, normalize_embeddings=True)
-    
+    embeddings = encode_dense(model, texts)
     return embeddings.tolist()
 
+
+def encode_with_sparse(texts: list[str]) -> tuple[list[list[float]], list[dict[str, float]]]:
+    """
+    Một lần forward BGE-M3, trả về (dense vectors, lexical weights).
+    lexical weights: {token_id (str): trọng số}. Chỉ dùng được với backend 'flag_m3'.
+    """
+    model = get_embedding_model()
+    if not supports_sparse(model):
+        raise RuntimeError("Lexical weights chỉ có khi EMBEDDING_BACKEND='flag_m3'")
+
+    out = model.encode(
+        texts,
+        return_dense=True,
+        return_sparse=True,
+        return_colbert_vecs=False
+    )
+    sparse = [
+        {str(token): float(weight) for token, weight in weights.items()}
+        for weights in out["lexical_weights"]
+    ]
+    return out["dense_vecs"].tolist(), sparse
+
 # --- Hàm cũ - Vẫn giữ lại để tương thích ---
 # (Hàm mới 'embed_texts' ở trên tốt hơn)
 def embed_text(text: str) -> list[float]:
@@ -42,5 +162,5 @@ def embed_text(text: str) -> list[float]:
     Tạo embedding cho một đoạn văn bản duy nhất.
     """
     model = get_embedding_model()
-    embedding = model.encode(text, normalize_embeddings=True)
+    embedding = encode_dense(model, [text])[0]
     return embedding.tolist()
\ No newline at end of file
@@ -0,0 +1,203 @@
+# app/core/embedding_batcher.py
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Callable
+
+from app.config import settings
+from app.core.embedder import embed_texts, encode_with_sparse
+
+
+class EmbeddingBatcher:
+    """
+    Dịch vụ embedding in-process có micro-batching.
+
+    Các request đồng thời gọi submit() và nhận về Future.
+    Một worker thread gom các câu trong tối đa `max_wait_ms` (hoặc đủ
+    `max_batch_size` câu) rồi gọi model.encode MỘT lần cho cả batch.
+
+    `encode_fn` nhận list[str] và trả về list kết quả cùng thứ tự
+    (mặc định: embed_texts -> list vector dense).
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        encode_fn: Callable[[list[str]], list[Any]] = embed_texts
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue[tuple[str, Future] | None]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._closed = False
+
+        # Thống kê đơn giản để theo dõi hiệu quả gom batch
+        self.total_batches = 0
+        self.total_texts = 0
+
+    # =============================
+    # PUBLIC API
+    # =============================
+    def submit(self, text: str) -> Future:
+        """
+        Đưa một câu vào hàng đợi, trả về Future chứa vector (list[float]).
+        """
+        future: Future = Future()
+        # Kiểm tra _closed và put cùng 1 lần giữ lock với shutdown(): mọi câu
+        # đã vào hàng đợi đều đứng trước sentinel nên luôn được xử lý
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("EmbeddingBatcher đã bị đóng")
+            if self._worker is None:
+                self._start_worker()
+            self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str, timeout: float | None = None) -> list[float]:
+        """
+        Hàm đồng bộ tiện dụng: submit rồi chờ kết quả.
+        """
+        return self.submit(text).result(timeout=timeout)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Dừng worker. Các câu đang chờ vẫn được xử lý nốt.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+            self._queue.put(None)
+
+        if wait and worker is not None:
+            worker.join()
+
+    @property
+    def avg_batch_size(self) -> float:
+        if not self.total_batches:
+            return 0.0
+        return self.total_texts / self.total_batches
+
+    # =============================
+    # WORKER
+    # =============================
+    def _start_worker(self):
+        # Gọi khi đang giữ self._lock
+        self._worker = threading.Thread(
+            target=self._run,
+            name="embedding-batcher",
+            daemon=True
+        )
+        self._worker.start()
+
+    def _collect_batch(self) -> tuple[list[tuple[str, Future]], bool]:
+        """
+        Chờ câu đầu tiên (blocking), sau đó gom thêm trong cửa sổ max_wait.
+        Trả về (batch, stop).
+        """
+        first = self._queue.get()
+        if first is None:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._collect_batch()
+            if batch:
+                self._process(batch)
+
+        # Xử lý nốt các câu còn trong hàng đợi sau khi shutdown
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftover.append(item)
+        for i in range(0, len(leftover), self.max_batch_size):
+            self._process(leftover[i:i + self.max_batch_size])
+
+    def _process(self, batch: list[tuple[str, Future]]):
+        # Bỏ qua các Future đã bị caller huỷ
+        active = [(t, f) for t, f in batch if f.set_running_or_notify_cancel()]
+        if not active:
+            return
+
+        texts = [t for t, _ in active]
+        try:
+            vectors = self.encode_fn(texts)
+        except Exception as e:
+            for _, f in active:
+                f.set_exception(e)
+            return
+
+        self.total_batches += 1
+        self.total_texts += len(texts)
+
+        for (_, f), vec in zip(active, vectors):
+            f.set_result(vec)
+
+
+@lru_cache(maxsize=1)  # Một batcher duy nhất cho cả process
+def get_embedding_batcher() -> EmbeddingBatcher:
+    return EmbeddingBatcher(
+        max_batch_size=settings.EMBED_BATCH_MAX_SIZE,
+        max_wait_ms=settings.EMBED_BATCH_MAX_WAIT_MS
+    )
+
+
+def embed_query(text: str) -> list[float]:
+    """
+    Nhúng một câu hỏi thông qua batcher dùng chung.
+    """
+    return get_embedding_batcher().embed(text)
+
+
+def _encode_pairs(texts: list[str]) -> list[tuple[list[float], dict[str, float]]]:
+    dense, sparse = encode_with_sparse(texts)
+    return list(zip(dense, sparse))
+
+
+@lru_cache(maxsize=1)
+def get_sparse_embedding_batcher() -> EmbeddingBatcher:
+    """
+    Batcher cho backend 'flag_m3': mỗi kết quả là (dense vector, lexical weights).
+    """
+    return EmbeddingBatcher(
+        max_batch_size=settings.EMBED_BATCH_MAX_SIZE,
+        max_wait_ms=settings.EMBED_BATCH_MAX_WAIT_MS,
+        encode_fn=_encode_pairs
+    )
+
+
+def embed_query_with_sparse(text: str) -> tuple[list[float], dict[str, float]]:
+    """
+    Nhúng câu hỏi, trả về cả dense vector và lexical weights (1 lần forward).
+    """
+    return get_sparse_embedding_batcher().embed(text)
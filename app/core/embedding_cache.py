@@ -0,0 +1,263 @@
+# app/core/embedding_cache.py
+
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable
+
+from app.config import settings
+from app.core.embedder import MODEL_NAME
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """
+    Chuẩn hoá câu hỏi trước khi tạo khoá cache:
+    Unicode NFC, chữ thường, gộp khoảng trắng, bỏ dấu câu ở cuối.
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text.rstrip("?!.… ")
+
+
+def make_cache_key(model_tag: str, instruction: str, question: str) -> str:
+    raw = "\x1f".join([model_tag, instruction, normalize_question(question)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _to_blob(vector: list[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _from_blob(blob: bytes) -> list[float]:
+    vec = array("f")
+    vec.frombytes(blob)
+    return vec.tolist()
+
+
+class QueryEmbeddingCache:
+    """
+    Cache 2 tầng cho embedding câu hỏi:
+    - Tầng 1: LRU trong RAM (OrderedDict)
+    - Tầng 2: SQLite trên đĩa, vector lưu dạng float32, giữ qua các lần restart
+
+    Khi vượt giới hạn, tầng đĩa xoá các entry ít được truy cập gần đây nhất.
+    last_access của các lần đọc trúng đĩa được gom lại, ghi 1 lần
+    (ACCESS_FLUSH_SIZE lần đọc, hoặc cùng lần ghi tiếp theo): đọc không phải
+    chờ commit / fsync của SQLite.
+    """
+
+    ACCESS_FLUSH_SIZE = 256
+
+    def __init__(
+        self,
+        path: str | None,
+        model_tag: str,
+        memory_items: int = 2048,
+        disk_items: int = 100000
+    ):
+        self.model_tag = model_tag
+        self.memory_items = max(0, memory_items)
+        self.disk_items = max(0, disk_items)
+
+        self._memory: "OrderedDict[str, list[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> thời điểm đọc trúng đĩa, chưa ghi xuống SQLite
+        self._pending_access: dict[str, float] = {}
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._conn: sqlite3.Connection | None = None
+        if path and self.disk_items:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_query_embeddings_last_access "
+                "ON query_embeddings (last_access)"
+            )
+            self._conn.commit()
+        self._disk_size = self._disk_count()
+
+    # =============================
+    # PUBLIC API
+    # =============================
+    def get(self, instruction: str, question: str) -> list[float] | None:
+        key = make_cache_key(self.model_tag, instruction, question)
+
+        with self._lock:
+            vec = self._memory.get(key)
+            if vec is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vec
+
+            vec = self._disk_get(key)
+            if vec is not None:
+                self._memory_put(key, vec)
+                self.disk_hits += 1
+                return vec
+
+            self.misses += 1
+            return None
+
+    def put(self, instruction: str, question: str, vector: list[float]):
+        key = make_cache_key(self.model_tag, instruction, question)
+        with self._lock:
+            self._memory_put(key, vector)
+            self._disk_put(key, vector)
+
+    def get_or_compute(
+        self,
+        instruction: str,
+        question: str,
+        compute: Callable[[str], list[float]]
+    ) -> list[float]:
+        """
+        Trả về embedding từ cache; nếu chưa có thì gọi compute(instruction + question).
+        """
+        vec = self.get(instruction, question)
+        if vec is not None:
+            return vec
+
+        vec = compute(instruction + question)
+        self.put(instruction, question, vec)
+        return vec
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._pending_access.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM query_embeddings")
+                self._conn.commit()
+            self._disk_size = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._flush_access()
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_size": len(self._memory),
+            "disk_size": self._disk_size,
+        }
+
+    # =============================
+    # INTERNAL
+    # =============================
+    def _memory_put(self, key: str, vector: list[float]):
+        if not self.memory_items:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> list[float] | None:
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            "SELECT vector FROM query_embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._pending_access[key] = time.time()
+        if len(self._pending_access) >= self.ACCESS_FLUSH_SIZE:
+            self._flush_access()
+            self._conn.commit()
+        return _from_blob(row[0])
+
+    def _flush_access(self):
+        # Gọi khi đang giữ self._lock; commit do nơi gọi thực hiện
+        if not self._pending_access:
+            return
+        self._conn.executemany(
+            "UPDATE query_embeddings SET last_access = ? WHERE key = ?",
+            [(ts, key) for key, ts in self._pending_access.items()]
+        )
+        self._pending_access.clear()
+
+    def _disk_put(self, key: str, vector: list[float]):
+        if self._conn is None:
+            return
+        exists = self._conn.execute(
+            "SELECT 1 FROM query_embeddings WHERE key = ?", (key,)
+        ).fetchone() is not None
+        self._conn.execute(
+            "INSERT OR REPLACE INTO query_embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+            (key, _to_blob(vector), time.time())
+        )
+        if not exists:
+            self._disk_size += 1
+        # Cập nhật last_access trước khi xoá entry cũ nhất, chung 1 commit với lần ghi này
+        self._pending_access.pop(key, None)
+        self._flush_access()
+
+        overflow = self._disk_size - self.disk_items
+        if overflow > 0:
+            self._conn.execute(
+                """
+                DELETE FROM query_embeddings WHERE key IN (
+                    SELECT key FROM query_embeddings ORDER BY last_access ASC LIMIT ?
+                )
+                """,
+                (overflow,)
+            )
+            self.evictions += overflow
+            self._disk_size -= overflow
+        self._conn.commit()
+
+    def _disk_count(self) -> int:
+        if self._conn is None:
+            return 0
+        return self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+
+
+def _default_cache_path() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, "cache", "query_embeddings.sqlite")
+
+
+@lru_cache(maxsize=1)  # Một cache duy nhất cho cả process
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    return QueryEmbeddingCache(
+        path=settings.EMBED_CACHE_PATH or _default_cache_path(),
+        # Vector khác nhau giữa fp32 / int8 / onnx nên backend là một phần của khoá
+        model_tag=f"{MODEL_NAME}:{settings.EMBEDDING_BACKEND}",
+        memory_items=settings.EMBED_CACHE_MEMORY_ITEMS,
+        disk_items=settings.EMBED_CACHE_DISK_ITEMS
+    )
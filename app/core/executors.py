@@ -0,0 +1,112 @@
+# app/core/executors.py
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable
+
+from app.config import settings
+
+# Mỗi loại công việc blocking có thread pool riêng, có giới hạn:
+# - "db"       : SQLAlchemy (lịch sử chat, ERP tools)
+# - "retrieval": embedding + ChromaDB + rerank
+# - "llm"      : gọi Gemini khi transport không hỗ trợ async native
+# - "tools"    : các tool con của 1 intent ghép (xem run_parallel)
+# Một loại bị nghẽn (VD: DB chậm) không chiếm hết thread của loại khác.
+EXECUTOR_SIZES = {
+    "db": settings.DB_EXECUTOR_WORKERS,
+    "retrieval": settings.RETRIEVAL_EXECUTOR_WORKERS,
+    "llm": settings.LLM_MAX_CONCURRENCY,
+    "tools": settings.TOOL_EXECUTOR_WORKERS,
+}
+
+_lock = threading.Lock()
+_executors: dict[str, ThreadPoolExecutor] = {}
+
+
+def get_executor(kind: str) -> ThreadPoolExecutor:
+    if kind not in EXECUTOR_SIZES:
+        raise ValueError(f"Loại executor không hợp lệ: {kind}. Hỗ trợ: {list(EXECUTOR_SIZES)}")
+
+    executor = _executors.get(kind)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(kind)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=max(1, EXECUTOR_SIZES[kind]),
+                    thread_name_prefix=f"{kind}-worker"
+                )
+                _executors[kind] = executor
+    return executor
+
+
+async def run_blocking(kind: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Chạy hàm blocking trên thread pool `kind` mà không chặn event loop.
+    Context (contextvars) của request được chuyển sang worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(kind), call)
+
+
+def run_parallel(
+    calls: dict[str, Callable[[], Any]],
+    timeout: float | None = None,
+    timeouts: dict[str, float] | None = None
+) -> dict[str, Any]:
+    """
+    Chạy đồng thời các tool độc lập của 1 câu hỏi trên pool "tools" (blocking,
+    gọi từ code sync - VD: router đang chạy trên pool "db").
+    Tổng thời gian ~ tool chậm nhất thay vì tổng các tool.
+
+    - timeout : hạn mặc định cho mỗi tool (giây), mặc định TOOL_TIMEOUT_SECONDS
+    - timeouts: hạn riêng theo tên tool
+    Tool lỗi / quá hạn -> {"error": ...} ở đúng key đó, các key khác vẫn có kết quả.
+    """
+    default_timeout = settings.TOOL_TIMEOUT_SECONDS if timeout is None else timeout
+    timeouts = timeouts or {}
+
+    # Đang ở trong worker của pool "tools" (intent ghép lồng nhau):
+    # chạy tuần tự để không chờ chính pool mình -> tránh deadlock khi pool đầy
+    if threading.current_thread().name.startswith("tools-worker"):
+        return {name: _call_safely(fn) for name, fn in calls.items()}
+
+    executor = get_executor("tools")
+    started = time.monotonic()
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, fn)
+        for name, fn in calls.items()
+    }
+
+    results: dict[str, Any] = {}
+    for name, future in futures.items():
+        deadline = started + timeouts.get(name, default_timeout)
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            results[name] = {"error": f"Quá thời gian chờ ({timeouts.get(name, default_timeout)}s)"}
+        except Exception as e:
+            results[name] = {"error": str(e)}
+    return results
+
+
+def _call_safely(fn: Callable[[], Any]) -> Any:
+    try:
+        return fn()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def shutdown_executors(wait: bool = True):
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
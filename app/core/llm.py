@@ -0,0 +1,165 @@
+# app/core/llm.py
+
+import asyncio
+import threading
+from functools import lru_cache
+from typing import AsyncIterator, Iterator
+
+import google.generativeai as genai
+
+from app.config import settings
+from app.core.executors import get_executor, run_blocking
+
+_configure_lock = threading.Lock()
+_configured = False
+
+# Semaphore giới hạn số lời gọi Gemini async đồng thời (tạo lười trong event loop)
+_semaphore: asyncio.Semaphore | None = None
+
+
+def configure_llm():
+    """
+    Cấu hình SDK Gemini MỘT lần cho cả process
+    (API key, transport, endpoint tuỳ chọn cho proxy / stub server).
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+
+        options = {"api_key": settings.GOOGLE_API_KEY}
+        if settings.LLM_TRANSPORT:
+            options["transport"] = settings.LLM_TRANSPORT
+        if settings.LLM_API_ENDPOINT:
+            options["client_options"] = {"api_endpoint": settings.LLM_API_ENDPOINT}
+
+        genai.configure(**options)
+        _configured = True
+
+
+@lru_cache(maxsize=None)  # Một GenerativeModel cho mỗi tên model
+def get_llm(model_name: str | None = None) -> genai.GenerativeModel:
+    configure_llm()
+    return genai.GenerativeModel(model_name or settings.LLM_MODEL)
+
+
+def _generation_config(temperature: float):
+    return genai.types.GenerationConfig(temperature=temperature)
+
+
+def _supports_native_async() -> bool:
+    # Client async của SDK chỉ chạy trên grpc_asyncio
+    return settings.LLM_TRANSPORT in ("", "grpc", "grpc_asyncio")
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(max(1, settings.LLM_MAX_CONCURRENCY))
+    return _semaphore
+
+
+def generate_text(prompt: str, model_name: str | None = None, temperature: float = 0.1) -> str:
+    """
+    Gọi Gemini (đồng bộ), trả về text của câu trả lời.
+    """
+    return get_llm(model_name).generate_content(
+        prompt,
+        generation_config=_generation_config(temperature)
+    ).text
+
+
+async def generate_text_async(
+    prompt: str,
+    model_name: str | None = None,
+    temperature: float = 0.1
+) -> str:
+    """
+    Gọi Gemini không chặn event loop.
+    - transport grpc: dùng client async native của SDK
+    - transport khác (VD: "rest"): chạy bản đồng bộ trên thread pool "llm"
+    """
+    if not _supports_native_async():
+        return await run_blocking("llm", generate_text, prompt, model_name, temperature)
+
+    async with _get_semaphore():
+        response = await get_llm(model_name).generate_content_async(
+            prompt,
+            generation_config=_generation_config(temperature)
+        )
+    return response.text
+
+
+def _chunk_text(chunk) -> str:
+    # chunk không có text (VD: chỉ chứa finish_reason / safety) -> .text raise ValueError
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+def stream_text(prompt: str, model_name: str | None = None, temperature: float = 0.1) -> Iterator[str]:
+    """
+    Gọi Gemini ở chế độ stream (đồng bộ), yield từng đoạn text.
+    """
+    response = get_llm(model_name).generate_content(
+        prompt,
+        generation_config=_generation_config(temperature),
+        stream=True
+    )
+    for chunk in response:
+        text = _chunk_text(chunk)
+        if text:
+            yield text
+
+
+async def stream_text_async(
+    prompt: str,
+    model_name: str | None = None,
+    temperature: float = 0.1
+) -> AsyncIterator[str]:
+    """
+    Stream câu trả lời của Gemini mà không chặn event loop.
+    Transport không hỗ trợ async: stream đồng bộ chạy trên pool "llm",
+    từng đoạn text được đẩy về event loop qua asyncio.Queue.
+    """
+    if _supports_native_async():
+        async with _get_semaphore():
+            response = await get_llm(model_name).generate_content_async(
+                prompt,
+                generation_config=_generation_config(temperature),
+                stream=True
+            )
+            async for chunk in response:
+                text = _chunk_text(chunk)
+                if text:
+                    yield text
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stopped = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for text in stream_text(prompt, model_name, temperature):
+                if stopped.is_set():  # client đã ngắt kết nối
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, text)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    get_executor("llm").submit(produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
@@ -0,0 +1,149 @@
+# app/core/text_normalize.py
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+
+# =====================================================
+# CHUẨN HOÁ TIẾNG VIỆT DÙNG CHUNG
+# (domain classifier, router + entity của 4 module, chỉ mục tên, BM25)
+# "Tồn kho HN" / "ton kho ha noi" / "tồn kho Hà Nội" -> cùng 1 dạng so khớp.
+# Mỗi câu hỏi chỉ chuẩn hoá 1 lần: normalize() có cache theo nguyên văn câu hỏi.
+# Keyword: dùng KeywordMatcher (app/erp_tools/router/keyword_automaton.py).
+# =====================================================
+
+
+def _build_fold_table() -> dict[int, str]:
+    # Mỗi chữ Latin có dấu (dạng NFC) -> 1 chữ không dấu: giữ nguyên độ dài chuỗi
+    table = {ord("đ"): "d", ord("Đ"): "D"}
+    for code in (*range(0x00C0, 0x0250), *range(0x1E00, 0x1F00)):
+        char = chr(code)
+        base = "".join(c for c in unicodedata.normalize("NFD", char) if not unicodedata.combining(c))
+        if len(base) == 1 and base != char:
+            table[code] = base
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+
+# Viết tắt hay gặp (khoá ở dạng không dấu, chữ thường) -> dạng đầy đủ
+ABBREVIATIONS = {
+    "hn": "hà nội",
+    "hcm": "hồ chí minh",
+    "tphcm": "hồ chí minh",
+    "tp hcm": "hồ chí minh",
+    "sg": "hồ chí minh",
+    "sai gon": "hồ chí minh",
+    "ncc": "nhà cung cấp",
+    "kh": "khách hàng",
+    "nv": "nhân viên",
+    "sp": "sản phẩm",
+    "sl": "số lượng",
+}
+
+# Trọn từ, không phải 1 phần của mã ("KH-001", "SG01" giữ nguyên);
+# tìm trên dạng không dấu nên "Sài Gòn" cũng khớp "sai gon"
+_ABBREVIATION_PATTERN = re.compile(
+    r"(?<![\w\-])("
+    + "|".join(re.escape(a) for a in sorted(ABBREVIATIONS, key=len, reverse=True))
+    + r")(?![\w\-])",
+    re.IGNORECASE
+)
+
+_WHITESPACE = re.compile(r"\s+")
+# Cùng định nghĩa "từ" với KeywordAutomaton
+_WORD = re.compile(r"[^\W\d_]+")
+
+# Từ gõ không dấu ứng với nhiều từ có dấu hay gặp: keyword 1 từ có dạng không dấu
+# nằm ở đây chỉ khớp khi gõ đúng dấu ("hang iphone" là hàng, không phải hãng)
+AMBIGUOUS_FOLDED_WORDS = {
+    "hang",  # hàng / hãng / hạng
+    "gi",    # gì / GI (phiếu xuất)
+    "ke",    # kệ / kế (toán) / kể
+    "ma",    # mã / mà / má
+    "no",    # nợ / nó / no
+}
+
+
+def fold_diacritics(text: str) -> str:
+    """
+    Bỏ dấu, giữ hoa/thường và độ dài: "Tồn kho Hà Nội" -> "Ton kho Ha Noi".
+    `text` phải ở dạng NFC.
+    """
+    return text.translate(_FOLD_TABLE)
+
+
+@dataclass(frozen=True)
+class NormalizedText:
+    """
+    - text    : Unicode NFC, gộp khoảng trắng
+    - lower   : text viết thường, đã mở rộng viết tắt ("hn" -> "hà nội")
+    - cased   : như lower nhưng bỏ dấu và giữ hoa/thường (quét mã / SKU / số)
+    - folded  : cased viết thường (chỉ mục tên, BM25)
+    - accented: câu hỏi gõ có dấu
+
+    lower và folded khớp nhau từng từ (bỏ dấu không đổi độ dài chuỗi).
+    """
+    text: str
+    lower: str
+    cased: str
+    folded: str
+    accented: bool
+
+    @property
+    def match_text(self) -> str:
+        """
+        Dạng dùng để so keyword: gõ có dấu -> so đúng dấu ("gì" không phải "gi"
+        phiếu xuất); gõ không dấu -> so dạng không dấu ("ton kho" = "tồn kho").
+        """
+        return self.lower if self.accented else self.folded
+
+    @cached_property
+    def plain_words(self) -> tuple[bool, ...]:
+        """
+        Từng từ (theo thứ tự) có được gõ không dấu không; câu lẫn có dấu / không
+        dấu ("ton kho ở Hà Nội") so keyword không dấu trên các từ này.
+        """
+        return tuple(w == f for w, f in zip(_WORD.findall(self.lower), _WORD.findall(self.folded)))
+
+
+def normalize_text(text: str) -> NormalizedText:
+    nfc = _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+    base = fold_diacritics(nfc)
+
+    # Tìm viết tắt trên dạng không dấu, thay cùng vị trí ở cả 2 dạng
+    expanded, cased, pos = [], [], 0
+    for m in _ABBREVIATION_PATTERN.finditer(base):
+        full = ABBREVIATIONS[m.group(1).lower()]
+        expanded += [nfc[pos:m.start()], full]
+        cased += [base[pos:m.start()], fold_diacritics(full)]
+        pos = m.end()
+    expanded.append(nfc[pos:])
+    cased.append(base[pos:])
+
+    cased_text = "".join(cased)
+    return NormalizedText(
+        text=nfc,
+        lower="".join(expanded).lower(),
+        cased=cased_text,
+        folded=cased_text.lower(),
+        accented=base != nfc,
+    )
+
+
+@lru_cache(maxsize=2048)
+def normalize(text: str) -> NormalizedText:
+    """
+    Như normalize_text nhưng có cache: classify_domain, router, entity
+    và BM25 gọi với cùng câu hỏi chỉ tính 1 lần.
+    """
+    return normalize_text(text)
+
+
+def fold_text(text: str) -> str:
+    """
+    Dạng không dấu, chữ thường, đã mở rộng viết tắt — dùng cho nhãn / tên lúc
+    dựng chỉ mục và cho văn bản dài (tài liệu) không cần cache.
+    """
+    return normalize_text(text).folded
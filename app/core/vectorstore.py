@@ -1,29 +1,113 @@
 # app/core/vectorstore.py
 
 import os
+import threading
 import chromadb
 
 # Tên collection (giống như tên bảng)
 COLLECTION_NAME = "erp_knowledge_base"
 
+# Lấy đường dẫn thư mục gốc của dự án (đi lùi 2 cấp từ file này)
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CHROMA_DB_PATH = os.path.join(project_root, "chroma_db")
+
+# --- Handle dùng chung cho cả process ---
+# Mở PersistentClient (SQLite + HNSW) tốn kém, nên chỉ mở 1 lần
+# và tái sử dụng cho mọi request retrieval / ingestion.
+_lock = threading.Lock()
+_client = None
+_collections: dict = {}
+
+
 def get_chroma_client():
     """
-    Khởi tạo và trả về ChromaDB client.
-    Dữ liệu sẽ được lưu vào thư mục 'chroma_db'.
+    Trả về ChromaDB client dùng chung (khởi tạo lười ở lần gọi đầu tiên).
+    Dữ liệu được lưu vào thư mục 'chroma_db'.
+    """
+    global _client
+
+    if _client is not None:
+        return _client
+
+    with _lock:
+        if _client is None:
+            print(f"Đang kết nối ChromaDB tại: {CHROMA_DB_PATH}")
+            _client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+    return _client
+
+
+def get_vector_collection(name: str = COLLECTION_NAME):
+    """
+    Lấy collection (bảng) vector từ ChromaDB, cache handle theo tên.
     """
-    # Lấy đường dẫn thư mục gốc của dự án (đi lùi 2 cấp từ file này)
-    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    db_path = os.path.join(project_root, "chroma_db")
-    
-    print(f"Đang kết nối ChromaDB tại: {db_path}")
-    client = chromadb.PersistentClient(path=db_path)
-    return client
+    collection = _collections.get(name)
+    if collection is not None:
+        return collection
+
+    client = get_chroma_client()
+    with _lock:
+        collection = _collections.get(name)
+        if collection is None:
+            collection = client.get_or_create_collection(name=name)
+            _collections[name] = collection
+    return collection
 
-def get_vector_collection():
+
+def reset_vector_collection(name: str = COLLECTION_NAME):
     """
-    Lấy collection (bảng) vector từ ChromaDB.
-    (Đây là hàm mà file lỗi đang tìm kiếm)
+    Xoá toàn bộ dữ liệu của collection (dùng khi nạp lại từ đầu).
     """
     client = get_chroma_client()
-    collection = client.get_or_create_collection(name=COLLECTION_NAME)
-    return collection
\ No newline at end of file
+    with _lock:
+        _collections.pop(name, None)
+        try:
+            client.delete_collection(name=name)
+        except Exception:
+            pass  # Collection chưa tồn tại
+    print(f"Đã xoá collection '{name}'.")
+
+
+def check_vectorstore_health() -> dict:
+    """
+    Kiểm tra kết nối ChromaDB. Dùng cho health-check endpoint.
+    Nếu lỗi, bỏ handle hiện tại để request sau tự kết nối lại.
+    """
+    try:
+        client = get_chroma_client()
+        heartbeat = client.heartbeat()
+        count = get_vector_collection().count()
+        return {"status": "ok", "heartbeat": heartbeat, "documents": count}
+    except Exception as e:
+        reset_vectorstore()
+        return {"status": "error", "error": str(e)}
+
+
+def reset_vectorstore():
+    """
+    Bỏ handle hiện tại để lần gọi sau mở lại client
+    (ví dụ sau khi health-check báo lỗi).
+    """
+    global _client
+
+    with _lock:
+        _collections.clear()
+        _client = None
+
+
+def shutdown_vectorstore():
+    """
+    Đóng client khi tắt ứng dụng.
+    """
+    global _client
+
+    with _lock:
+        client = _client
+        _collections.clear()
+        _client = None
+
+    if client is not None:
+        # PersistentClient giữ system dùng chung theo path; xoá để giải phóng file handle
+        clear_cache = getattr(client, "clear_system_cache", None)
+        if clear_cache is not None:
+            clear_cache()
+        print("Đã đóng kết nối ChromaDB.")
@@ -1,15 +1,12 @@
 # app/db/database.py
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.db.engine_factory import create_db_engine
 
 # ===== DATABASE CHATBOT =====
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=False
-)
+engine = create_db_engine("chat", DATABASE_URL)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -0,0 +1,164 @@
+# app/db/engine_factory.py
+
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.config import settings
+
+# =====================================================
+# ENGINE FACTORY DÙNG CHUNG CHO 5 DATABASE
+# (chat, finance, hrm, sale_crm, supply_chain)
+# Cấu hình pool / timeout / echo ở 1 chỗ (DB_* trong config), có số liệu
+# thời gian chờ lấy connection để chỉnh pool cho từng module.
+# =====================================================
+
+
+class PoolMetrics:
+    """
+    Thời gian chờ lấy connection từ pool (gồm cả thời gian mở connection mới).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def record(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": self.wait_total_ms / total if total else 0.0,
+                "wait_max_ms": self.wait_max_ms,
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool ghi lại thời gian chờ mỗi lần lấy connection.
+    """
+
+    metrics: PoolMetrics
+
+    def recreate(self) -> "TimedQueuePool":
+        # Pool được tạo lại (VD: engine.dispose()) vẫn dùng chung metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record((time.perf_counter() - start) * 1000, timed_out=True)
+            raise
+        self.metrics.record((time.perf_counter() - start) * 1000)
+        return entry
+
+
+# Tên database -> (engine chính, engine đọc)
+_ENGINES: dict[str, tuple[Engine, Engine]] = {}
+
+# sessionmaker của tool -> engine đọc (replica nếu có)
+_READ_BINDS: dict[sessionmaker, Engine] = {}
+
+
+def _engine_kwargs(name: str, url: str) -> dict:
+    kwargs: dict = {"echo": settings.DB_ECHO}
+
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        # SQLite dùng pool riêng của SQLAlchemy (không có pool_size / overflow)
+        return kwargs
+
+    kwargs.update(
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE_OVERRIDES.get(name, settings.DB_POOL_SIZE),
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+    if settings.DB_STATEMENT_TIMEOUT_MS and backend == "postgresql":
+        kwargs["connect_args"] = {
+            "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        }
+
+    return kwargs
+
+
+def create_db_engine(name: str, url: str, replica_url: str = "") -> Engine:
+    """
+    Tạo engine chính cho database `name`; replica_url (nếu có) tạo thêm
+    engine đọc cho các tool chỉ đọc (xem register_read_sessionmaker).
+    """
+    engine = _create(name, url)
+    read_engine = _create(name, replica_url) if replica_url else engine
+    _ENGINES[name] = (engine, read_engine)
+    return engine
+
+
+def _create(name: str, url: str) -> Engine:
+    engine = create_engine(url, **_engine_kwargs(name, url))
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.metrics = PoolMetrics()
+    return engine
+
+
+def register_read_sessionmaker(name: str, factory: sessionmaker):
+    """
+    Session mở bằng `factory` cho tool chỉ đọc sẽ đi vào engine đọc của `name`.
+    """
+    _READ_BINDS[factory] = _ENGINES[name][1]
+
+
+def read_bind_for(factory: sessionmaker) -> Optional[Engine]:
+    return _READ_BINDS.get(factory)
+
+
+def get_pool_metrics() -> dict:
+    metrics = {}
+    for name, (engine, read_engine) in _ENGINES.items():
+        engines = {name: engine}
+        if read_engine is not engine:
+            engines[f"{name}_replica"] = read_engine
+
+        for label, eng in engines.items():
+            pool = eng.pool
+            if not isinstance(pool, TimedQueuePool):
+                continue
+            metrics[label] = {
+                **pool.metrics.stats(),
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            }
+    return metrics
+
+
+def dispose_engines():
+    for engine, read_engine in _ENGINES.values():
+        engine.dispose()
+        if read_engine is not engine:
+            read_engine.dispose()
@@ -1,11 +1,12 @@
 # app/db/finance_database.py
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.db.engine_factory import create_db_engine, register_read_sessionmaker
 
-engine = create_engine(
+engine = create_db_engine(
+    "finance",
     settings.FINANCE_DATABASE_URL,
-    echo=True 
+    replica_url=settings.FINANCE_DATABASE_REPLICA_URL
 )
 
 FinanceSessionLocal = sessionmaker(
@@ -13,5 +14,6 @@ FinanceSessionLocal = sessionmaker(
     autoflush=False,
     bind=engine
 )
+register_read_sessionmaker("finance", FinanceSessionLocal)
 
 FinanceBase = declarative_base()
@@ -1,12 +1,14 @@
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.db.engine_factory import create_db_engine, register_read_sessionmaker
 
-HRM_ENGINE = create_engine(
+HRM_ENGINE = create_db_engine(
+    "hrm",
     settings.HRM_DATABASE_URL,
-    echo=True
+    replica_url=settings.HRM_DATABASE_REPLICA_URL
 )
 
 HrmSessionLocal = sessionmaker(bind=HRM_ENGINE)
+register_read_sessionmaker("hrm", HrmSessionLocal)
 
-HrmBase = declarative_base()
\ No newline at end of file
+HrmBase = declarative_base()
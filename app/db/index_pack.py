@@ -0,0 +1,86 @@
+# app/db/index_pack.py
+
+from typing import Iterable
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+# =====================================================
+# INDEX PACK CHO CÁC CỘT TOOL ERP HAY TRA CỨU
+# Index khai báo ngay trong __table_args__ của model (create_all tạo luôn
+# với database mới); database đang chạy thì dùng apply_index_pack()
+# (scripts/apply_index_pack.py) để tạo bổ sung các index còn thiếu.
+# =====================================================
+
+
+def _invalid_indexes(connection, names: list[str]) -> set[str]:
+    # CREATE INDEX CONCURRENTLY bị huỷ giữa chừng để lại index INVALID: vẫn có
+    # tên trong catalog (inspector thấy) nhưng planner không dùng
+    rows = connection.execute(
+        text(
+            "SELECT c.relname FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE NOT i.indisvalid AND pg_table_is_visible(c.oid) "
+            "AND c.relname = ANY(:names)"
+        ),
+        {"names": names},
+    )
+    return {name for (name,) in rows}
+
+
+def apply_index_pack(engine: Engine, metadata: MetaData, retired: Iterable[str] = ()) -> list[str]:
+    """
+    Tạo các index đã khai báo trong model mà database chưa có; xoá các index
+    trong `retired` (đã bỏ khỏi model, không còn query nào dùng nhưng vẫn tốn ghi).
+
+    PostgreSQL: CREATE INDEX CONCURRENTLY (không khoá ghi bảng lớn), nên phải
+    chạy ngoài transaction (AUTOCOMMIT), không giới hạn statement_timeout của
+    engine; index INVALID do lần chạy trước bị huỷ được xoá và tạo lại.
+    Trả về tên các index vừa tạo.
+    """
+    created = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        postgresql = connection.dialect.name == "postgresql"
+        if postgresql:
+            # Engine của app đặt statement_timeout (DB_STATEMENT_TIMEOUT_MS); tạo index
+            # trên bảng lớn lâu hơn nhiều -> bỏ giới hạn cho riêng connection này
+            connection.exec_driver_sql("SET statement_timeout = 0")
+
+        try:
+            inspector = inspect(connection)
+            retired = set(retired)
+            for table in metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    # Bảng chưa có -> create_all sẽ tạo cả bảng lẫn index
+                    continue
+
+                existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+                for name in sorted(existing & retired):
+                    print(f"   - {name}")
+                    concurrently = "CONCURRENTLY " if postgresql else ""
+                    connection.exec_driver_sql(f'DROP INDEX {concurrently}IF EXISTS "{name}"')
+                if postgresql and table.indexes:
+                    for name in sorted(_invalid_indexes(connection, [ix.name for ix in table.indexes])):
+                        print(f"⚠️ Index {name} INVALID (lần tạo trước bị huỷ) -> tạo lại")
+                        connection.exec_driver_sql(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+                        existing.discard(name)
+
+                for index in sorted(table.indexes, key=lambda ix: ix.name):
+                    if index.name in existing:
+                        continue
+
+                    if postgresql:
+                        index.dialect_options["postgresql"]["concurrently"] = True
+                    try:
+                        connection.execute(CreateIndex(index, if_not_exists=True))
+                    finally:
+                        if postgresql:
+                            index.dialect_options["postgresql"]["concurrently"] = False
+                    created.append(index.name)
+        finally:
+            if postgresql:
+                # Connection quay lại pool -> trả statement_timeout về mặc định của engine
+                connection.exec_driver_sql("RESET statement_timeout")
+
+    return created
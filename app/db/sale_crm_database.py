@@ -1,10 +1,16 @@
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.db.engine_factory import create_db_engine, register_read_sessionmaker
 
 SALE_CRM_DATABASE_URL = settings.SALE_CRM_DATABASE_URL
 
-sale_crm_engine = create_engine(SALE_CRM_DATABASE_URL, echo=True)
+sale_crm_engine = create_db_engine(
+    "sale_crm",
+    SALE_CRM_DATABASE_URL,
+    replica_url=settings.SALE_CRM_DATABASE_REPLICA_URL
+)
 
 SaleCrmSessionLocal = sessionmaker(bind=sale_crm_engine)
-SaleCrmBase = declarative_base()
\ No newline at end of file
+register_read_sessionmaker("sale_crm", SaleCrmSessionLocal)
+
+SaleCrmBase = declarative_base()
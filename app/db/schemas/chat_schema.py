@@ -37,6 +37,12 @@ class ChatResponse(BaseModel):
     # Dành cho FN-2 & FN-3 (Agent Tools)
     action_data: Optional[Dict[str, Any]] = None
 
+class ChatStreamMeta(BaseModel):
+    """Frame đầu tiên của /chat/stream: loại câu trả lời + nguồn RAG / dữ liệu ERP"""
+    response_type: str
+    sources: Optional[List[RAGSource]] = None
+    action_data: Optional[Dict[str, Any]] = None
+
 class ChatHistoryOut(BaseModel):
     """Schema trả về lịch sử chat (khi bạn dùng PostgreSQL sau)"""
     chat_id: int
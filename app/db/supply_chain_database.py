@@ -1,16 +1,18 @@
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.db.engine_factory import create_db_engine, register_read_sessionmaker
 
 SUPPLY_CHAIN_DATABASE_URL = settings.SUPPLY_CHAIN_DATABASE_URL
 
-SupplyChainEngine = create_engine(
+SupplyChainEngine = create_db_engine(
+    "supply_chain",
     SUPPLY_CHAIN_DATABASE_URL,
-    echo=True
+    replica_url=settings.SUPPLY_CHAIN_DATABASE_REPLICA_URL
 )
 
 SupplyChainSessionLocal = sessionmaker(
     bind=SupplyChainEngine
 )
+register_read_sessionmaker("supply_chain", SupplyChainSessionLocal)
 
 SupplyChainBase = declarative_base()
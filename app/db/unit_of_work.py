@@ -0,0 +1,186 @@
+# app/db/unit_of_work.py
+
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.engine_factory import read_bind_for
+
+# =====================================================
+# UNIT OF WORK CHO 1 LƯỢT CHAT
+# Mọi tool ERP gọi trong cùng 1 câu hỏi dùng chung 1 session (1 connection,
+# 1 transaction chỉ đọc) cho mỗi database, thay vì mỗi tool mở / đóng 1 session:
+# - ít lần lấy / trả connection từ pool hơn
+# - câu trả lời ghép nhiều tool đọc cùng 1 snapshot (kể cả tool chạy song song
+#   trên pool "tools": PostgreSQL export snapshot cho session của worker)
+# =====================================================
+
+_current_uow: ContextVar[Optional["UnitOfWork"]] = ContextVar("erp_unit_of_work", default=None)
+
+
+def _read_session(factory: sessionmaker) -> Session:
+    # Tool chỉ đọc -> engine đọc (read replica nếu có cấu hình)
+    bind = read_bind_for(factory)
+    return factory(bind=bind) if bind is not None else factory()
+
+
+# ID do pg_export_snapshot() trả về, VD "00000003-0000001B-1"
+_SNAPSHOT_ID = re.compile(r"^[0-9A-F]+(?:-[0-9A-F]+)+$", re.IGNORECASE)
+
+
+def _is_postgresql(session: Session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def _begin_read_only(session: Session, snapshot: Optional[str] = None):
+    # PostgreSQL: REPEATABLE READ = 1 snapshot cho cả transaction;
+    # READ ONLY để tool đọc không vô tình ghi
+    if not _is_postgresql(session):
+        return
+    session.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY"))
+    if snapshot is None or not _SNAPSHOT_ID.match(snapshot):
+        return
+    try:
+        # Phải là lệnh đầu tiên sau SET TRANSACTION; không nhận bind param
+        session.execute(text(f"SET TRANSACTION SNAPSHOT '{snapshot}'"))
+    except Exception as e:
+        # VD: replica sau load balancer khác server với session export -> snapshot riêng
+        print(f"⚠️ Không dùng chung được snapshot {snapshot}: {e}")
+        session.rollback()
+        session.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY"))
+
+
+def _export_snapshot(session: Session) -> Optional[str]:
+    if not _is_postgresql(session):
+        return None
+    try:
+        return session.execute(text("SELECT pg_export_snapshot()")).scalar()
+    except Exception as e:
+        print(f"⚠️ Không export được snapshot: {e}")
+        session.rollback()
+        _begin_read_only(session)
+        return None
+
+
+class UnitOfWork:
+    """
+    Giữ session dùng chung theo từng sessionmaker (mở khi tool đầu tiên cần).
+
+    Session SQLAlchemy không thread-safe nên chỉ thread mở unit of work được
+    dùng chung session. Tool chạy song song trên thread khác (run_parallel) mở
+    session riêng (worker_session) nhưng trên PostgreSQL import snapshot mà
+    session dùng chung đã export -> vẫn đọc cùng 1 snapshot.
+    """
+
+    def __init__(self):
+        self._owner = threading.get_ident()
+        self._lock = threading.Lock()
+        self._sessions: dict[sessionmaker, Session] = {}
+        self._snapshots: dict[sessionmaker, Optional[str]] = {}
+        self._closed = False
+
+    def session_for(self, factory: sessionmaker) -> Optional[Session]:
+        if threading.get_ident() != self._owner:
+            return None
+        with self._lock:
+            return self._shared_session(factory)
+
+    def _shared_session(self, factory: sessionmaker) -> Session:
+        # Gọi khi đang giữ self._lock
+        session = self._sessions.get(factory)
+        if session is None:
+            session = _read_session(factory)
+            _begin_read_only(session)
+            self._snapshots[factory] = _export_snapshot(session)
+            self._sessions[factory] = session
+        return session
+
+    def worker_session(self, factory: sessionmaker) -> Session:
+        """
+        Session riêng cho tool chạy trên thread khác; người gọi tự đóng.
+        Snapshot được export khi cần (tool đầu tiên của database đó có thể
+        chạy trên worker) và sống tới khi unit of work đóng.
+        """
+        with self._lock:
+            if self._closed:
+                # Tool quá hạn vẫn chạy sau khi lượt chat đã xong
+                snapshot = None
+            else:
+                self._shared_session(factory)
+                snapshot = self._snapshots[factory]
+
+        session = _read_session(factory)
+        _begin_read_only(session, snapshot)
+        return session
+
+    def owns(self, session: Session) -> bool:
+        return any(s is session for s in self._sessions.values())
+
+    def close(self):
+        # close() kết thúc transaction (rollback) và trả connection về pool;
+        # khác rollback(), dữ liệu ORM đã đọc không bị expire nên vẫn dùng được
+        with self._lock:
+            self._closed = True
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._snapshots.clear()
+        for session in sessions:
+            session.close()
+
+
+@contextmanager
+def unit_of_work() -> Iterator[UnitOfWork]:
+    """
+    Mở unit of work cho đoạn code bên trong; lồng nhau thì dùng lại cái ngoài.
+    """
+    current = _current_uow.get()
+    if current is not None:
+        yield current
+        return
+
+    uow = UnitOfWork()
+    token = _current_uow.set(uow)
+    try:
+        yield uow
+    finally:
+        _current_uow.reset(token)
+        uow.close()
+
+
+def run_in_unit_of_work(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Chạy router + tools của 1 câu hỏi trong 1 unit of work
+    (VD: run_blocking("db", run_in_unit_of_work, finance_router, query=...)).
+    """
+    with unit_of_work():
+        return fn(*args, **kwargs)
+
+
+# =====================================================
+# DÙNG TRONG TOOLS
+# =====================================================
+def acquire_session(factory: sessionmaker) -> Session:
+    """
+    Session chỉ đọc: của unit of work hiện tại; tool chạy trên worker -> session
+    riêng cùng snapshot; ngoài unit of work -> session mới.
+    """
+    uow = _current_uow.get()
+    if uow is None:
+        return _read_session(factory)
+    session = uow.session_for(factory)
+    return session if session is not None else uow.worker_session(factory)
+
+
+def release_session(session: Session):
+    """
+    Đóng session tự mở; session của unit of work để unit of work đóng.
+    """
+    uow = _current_uow.get()
+    if uow is not None and uow.owns(session):
+        return
+    session.close()
@@ -1,6 +1,8 @@
 from datetime import date
 from sqlalchemy import func
 from app.db.finance_database import FinanceSessionLocal
+from app.db.unit_of_work import acquire_session, release_session
+from app.erp_tools.tool_cache import cached_tool
 
 from app.erp_tools.modules.finance_accounting.models import (
     BusinessPartner,
@@ -15,7 +17,7 @@ from app.erp_tools.modules.finance_accounting.models import (
 )
 
 def get_ar_invoice_status(invoice_id: int):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         inv = db.query(ARInvoice).filter(ARInvoice.invoice_id == invoice_id).first()
         if not inv:
@@ -29,10 +31,10 @@ def get_ar_invoice_status(invoice_id: int):
             "due_date": inv.due_date
         }
     finally:
-        db.close()
+        release_session(db)
 
 def get_ar_invoice_detail(invoice_id: int):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         inv = (
             db.query(ARInvoice, BusinessPartner)
@@ -54,10 +56,10 @@ def get_ar_invoice_detail(invoice_id: int):
             "payment_status": ar.payment_status
         }
     finally:
-        db.close()
+        release_session(db)
 
 def get_customer_receivable_summary(partner_id: int):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         rows = (
             db.query(
@@ -76,10 +78,10 @@ def get_customer_receivable_summary(partner_id: int):
             "outstanding": float((total or 0) - (received or 0))
         }
     finally:
-        db.close()
+        release_session(db)
 
 def get_ap_invoice_status(invoice_id: int):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         inv = db.query(APInvoice).filter(APInvoice.invoice_id == invoice_id).first()
         if not inv:
@@ -93,10 +95,10 @@ def get_ap_invoice_status(invoice_id: int):
             "due_date": inv.due_date
         }
     finally:
-        db.close()
+        release_session(db)
 
 def get_ap_invoice_detail(invoice_id: int):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         inv = (
             db.query(APInvoice, BusinessPartner)
@@ -118,10 +120,10 @@ def get_ap_invoice_detail(invoice_id: int):
             "payment_status": ap.payment_status
         }
     finally:
-        db.close()
+        release_session(db)
 
 def get_supplier_payable_summary(partner_id: int):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         rows = (
             db.query(
@@ -140,10 +142,10 @@ def get_supplier_payable_summary(partner_id: int):
             "outstanding": float((total or 0) - (paid or 0))
         }
     finally:
-        db.close()
+        release_session(db)
 
 def get_cash_transaction(transaction_id: int):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         tx = db.query(CashTransaction).filter(CashTransaction.transaction_id == transaction_id).first()
         if not tx:
@@ -157,10 +159,10 @@ def get_cash_transaction(transaction_id: int):
             "created_at": tx.created_at
         }
     finally:
-        db.close()
+        release_session(db)
 
 def get_journal_entries(limit: int = 10):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         rows = (
             db.query(JournalEntry)
@@ -180,10 +182,10 @@ def get_journal_entries(limit: int = 10):
             for e in rows
         ]
     finally:
-        db.close()
+        release_session(db)
 
 def get_journal_entry_detail(entry_id: int):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         rows = (
             db.query(JournalEntryLine, ChartOfAccounts)
@@ -201,10 +203,10 @@ def get_journal_entry_detail(entry_id: int):
             for line, acc in rows
         ]
     finally:
-        db.close()
+        release_session(db)
 
 def get_account_balance(account_id: int):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         debit, credit = db.query(
             func.sum(JournalEntryLine.debit_amount),
@@ -216,10 +218,11 @@ def get_account_balance(account_id: int):
             "balance": float((debit or 0) - (credit or 0))
         }
     finally:
-        db.close()
+        release_session(db)
 
+@cached_tool(ttl=600, tags=("finance.fiscal",))
 def get_current_fiscal_period():
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         p = db.query(FiscalPeriod).filter(FiscalPeriod.status == "OPEN").first()
         if not p:
@@ -232,10 +235,11 @@ def get_current_fiscal_period():
             "status": p.status
         }
     finally:
-        db.close()
+        release_session(db)
 
+@cached_tool(ttl=600, tags=("finance.fiscal",))
 def get_fiscal_periods(limit: int = 6):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         rows = (
             db.query(FiscalPeriod)
@@ -252,10 +256,10 @@ def get_fiscal_periods(limit: int = 6):
             for r in rows
         ]
     finally:
-        db.close()
+        release_session(db)
 
 def explain_posting_rule(event_code: str):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         r = db.query(PostingRule).filter(PostingRule.event_code == event_code).first()
         if not r:
@@ -269,10 +273,10 @@ def explain_posting_rule(event_code: str):
             "module": r.module_source
         }
     finally:
-        db.close()
+        release_session(db)
 
 def get_cash_flow_history(limit: int = 10):
-    db = FinanceSessionLocal()
+    db = acquire_session(FinanceSessionLocal)
     try:
         rows = (
             db.query(CashTransaction)
@@ -291,4 +295,4 @@ def get_cash_flow_history(limit: int = 10):
             for r in rows
         ]
     finally:
-        db.close()
+        release_session(db)
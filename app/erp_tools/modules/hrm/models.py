@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, ForeignKey,
-    Date, DateTime, Time, Float, Numeric, Boolean, Enum, JSON
+    Date, DateTime, Time, Float, Numeric, Boolean, Enum, JSON, Index
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -90,6 +90,9 @@ class WorkShift(HrmBase):
 # =========================
 class TimesheetDaily(HrmBase):
     __tablename__ = "timesheet_daily"
+    __table_args__ = (
+        Index("ix_timesheet_daily_employee_date", "employee_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True)
     employee_id = Column(Integer, ForeignKey("employee.id"))
@@ -240,6 +243,9 @@ class PayrollPeriod(HrmBase):
 # =========================
 class Payslip(HrmBase):
     __tablename__ = "payslip"
+    __table_args__ = (
+        Index("ix_payslip_employee_period", "employee_id", "payroll_period_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     payroll_period_id = Column(Integer, ForeignKey("payroll_period.id"))
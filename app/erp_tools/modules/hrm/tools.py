@@ -1,6 +1,7 @@
 from datetime import date
 from sqlalchemy import func
 from app.db.hrm_database import HrmSessionLocal
+from app.db.unit_of_work import acquire_session, release_session
 
 from app.erp_tools.modules.hrm.models import (
     Employee,
@@ -20,7 +21,7 @@ from app.erp_tools.modules.hrm.models import (
 # 1. HỒ SƠ NHÂN VIÊN
 # =====================================================
 def get_employee_profile(employee_id: int):
-    db = HrmSessionLocal()
+    db = acquire_session(HrmSessionLocal)
     try:
         emp = db.query(Employee).filter(Employee.id == employee_id).first()
         if not emp:
@@ -35,14 +36,14 @@ def get_employee_profile(employee_id: int):
             "join_date": emp.join_date,
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # 2. PHÒNG BAN
 # =====================================================
 def get_employee_department(employee_id: int):
-    db = HrmSessionLocal()
+    db = acquire_session(HrmSessionLocal)
     try:
         row = (
             db.query(Employee, Department)
@@ -60,14 +61,14 @@ def get_employee_department(employee_id: int):
             "description": dept.description
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # 3. CHỨC VỤ
 # =====================================================
 def get_employee_position(employee_id: int):
-    db = HrmSessionLocal()
+    db = acquire_session(HrmSessionLocal)
     try:
         row = (
             db.query(Employee, Position)
@@ -87,14 +88,14 @@ def get_employee_position(employee_id: int):
             }
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # 4. CHẤM CÔNG HÔM NAY
 # =====================================================
 def get_today_attendance(employee_id: int):
-    db = HrmSessionLocal()
+    db = acquire_session(HrmSessionLocal)
     today = date.today()
 
     try:
@@ -118,14 +119,14 @@ def get_today_attendance(employee_id: int):
             "ot_hours": row.ot_hours
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # 5. LỊCH SỬ CHẤM CÔNG
 # =====================================================
 def get_attendance_history(employee_id: int, limit: int = 10):
-    db = HrmSessionLocal()
+    db = acquire_session(HrmSessionLocal)
     try:
         rows = (
             db.query(TimesheetDaily)
@@ -145,14 +146,14 @@ def get_attendance_history(employee_id: int, limit: int = 10):
             for r in rows
         ]
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # 6. ĐI MUỘN / OT THEO THÁNG
 # =====================================================
 def get_late_ot_summary(employee_id: int, month: int, year: int):
-    db = HrmSessionLocal()
+    db = acquire_session(HrmSessionLocal)
     try:
         rows = (
             db.query(
@@ -174,7 +175,7 @@ def get_late_ot_summary(employee_id: int, month: int, year: int):
             "total_ot_hours": float(rows[1] or 0)
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
@@ -190,7 +191,7 @@ def get_work_shift(employee_id: int):
 # 8. HỢP ĐỒNG LAO ĐỘNG
 # =====================================================
 def get_labor_contract(employee_id: int):
-    db = HrmSessionLocal()
+    db = acquire_session(HrmSessionLocal)
     try:
         c = (
             db.query(LaborContract)
@@ -211,14 +212,14 @@ def get_labor_contract(employee_id: int):
             "status": c.status
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # 9. BẢNG LƯƠNG THÁNG
 # =====================================================
 def get_payslip(employee_id: int, month: int, year: int):
-    db = HrmSessionLocal()
+    db = acquire_session(HrmSessionLocal)
     try:
         row = (
             db.query(Payslip, PayrollPeriod)
@@ -243,14 +244,14 @@ def get_payslip(employee_id: int, month: int, year: int):
             "status": p.status
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # 10. CHI TIẾT LƯƠNG
 # =====================================================
 def get_payslip_detail(payslip_id: int):
-    db = HrmSessionLocal()
+    db = acquire_session(HrmSessionLocal)
     try:
         rows = (
             db.query(PayslipDetail, SalaryRule)
@@ -268,14 +269,14 @@ def get_payslip_detail(payslip_id: int):
             for d, r in rows
         ]
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # 11. LỊCH SỬ LƯƠNG
 # =====================================================
 def get_salary_history(employee_id: int, limit: int = 6):
-    db = HrmSessionLocal()
+    db = acquire_session(HrmSessionLocal)
     try:
         rows = (
             db.query(Payslip, PayrollPeriod)
@@ -295,4 +296,4 @@ def get_salary_history(employee_id: int, limit: int = 6):
             for p, period in rows
         ]
     finally:
-        db.close()
+        release_session(db)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -89,6 +89,9 @@ class Payment(SaleCrmBase):
 
 class Order(SaleCrmBase):
     __tablename__ = "order"
+    __table_args__ = (
+        Index("ix_order_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("user.id"))
@@ -105,6 +108,9 @@ class Order(SaleCrmBase):
 
 class OrderDetail(SaleCrmBase):
     __tablename__ = "order_detail"
+    __table_args__ = (
+        Index("ix_order_detail_order", "order_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     order_id = Column(Integer, ForeignKey("order.id"))
@@ -115,6 +121,9 @@ class OrderDetail(SaleCrmBase):
 
 class Review(SaleCrmBase):
     __tablename__ = "review"
+    __table_args__ = (
+        Index("ix_review_product", "product_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     product_id = Column(Integer, ForeignKey("product.id"))
@@ -2,6 +2,8 @@ from sqlalchemy import func
 from datetime import datetime
 
 from app.db.sale_crm_database import SaleCrmSessionLocal
+from app.db.unit_of_work import acquire_session, release_session
+from app.erp_tools.tool_cache import cached_tool, invalidate
 from app.erp_tools.modules.sales_crm.models import (
     User, Address,
     Product, ProductVariant, Brand,
@@ -14,7 +16,7 @@ from app.erp_tools.modules.sales_crm.models import (
 # TRA CỨU TRẠNG THÁI ĐƠN HÀNG
 # =====================================================
 def get_order_status(order_id: int, user_id: int):
-    db = SaleCrmSessionLocal()
+    db = acquire_session(SaleCrmSessionLocal)
     try:
         row = (
             db.query(Order, Payment)
@@ -35,14 +37,14 @@ def get_order_status(order_id: int, user_id: int):
             "created_at": o.created_at
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # CHI TIẾT ĐƠN HÀNG
 # =====================================================
 def get_order_detail(order_id: int):
-    db = SaleCrmSessionLocal()
+    db = acquire_session(SaleCrmSessionLocal)
     try:
         items = (
             db.query(
@@ -64,14 +66,14 @@ def get_order_detail(order_id: int):
             for name, qty, price in items
         ]
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # LỊCH SỬ MUA HÀNG
 # =====================================================
 def get_purchase_history(user_id: int):
-    db = SaleCrmSessionLocal()
+    db = acquire_session(SaleCrmSessionLocal)
     try:
         rows = (
             db.query(
@@ -97,14 +99,14 @@ def get_purchase_history(user_id: int):
             for oid, created_at, status, total in rows
         ]
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # TRẠNG THÁI THANH TOÁN
 # =====================================================
 def get_payment_status(payment_id: int):
-    db = SaleCrmSessionLocal()
+    db = acquire_session(SaleCrmSessionLocal)
     try:
         p = db.query(Payment).filter(Payment.id == payment_id).first()
         if not p:
@@ -117,14 +119,14 @@ def get_payment_status(payment_id: int):
             "amount": float(p.amount)
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # KIỂM TRA VOUCHER
 # =====================================================
 def check_voucher_valid(code: str, order_amount: float | None = None):
-    db = SaleCrmSessionLocal()
+    db = acquire_session(SaleCrmSessionLocal)
     try:
         vd = (
             db.query(VoucherDetail)
@@ -162,13 +164,14 @@ def check_voucher_valid(code: str, order_amount: float | None = None):
             "discount_value": float(v.discount_value)
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # TẠO ĐÁNH GIÁ SẢN PHẨM
 # =====================================================
 def create_review(product_id: int, user_id: int, content: str, rating: int):
+    # Ghi dữ liệu -> session riêng, không dùng transaction chỉ đọc của unit of work
     db = SaleCrmSessionLocal()
     try:
         r = Review(
@@ -181,6 +184,7 @@ def create_review(product_id: int, user_id: int, content: str, rating: int):
         db.add(r)
         db.commit()
         db.refresh(r)
+        invalidate("sales_crm.reviews")
         return {"review_id": r.id}
     finally:
         db.close()
@@ -189,8 +193,9 @@ def create_review(product_id: int, user_id: int, content: str, rating: int):
 # =====================================================
 # XEM ĐÁNH GIÁ SẢN PHẨM
 # =====================================================
+@cached_tool(ttl=120, max_items=1024, tags=("sales_crm.reviews",))
 def get_product_reviews(product_id: int):
-    db = SaleCrmSessionLocal()
+    db = acquire_session(SaleCrmSessionLocal)
     try:
         rows = (
             db.query(
@@ -215,14 +220,14 @@ def get_product_reviews(product_id: int):
             for rating, content, username, created_at in rows
         ]
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # THÔNG TIN KHÁCH HÀNG
 # =====================================================
 def get_customer_profile(user_id: int):
-    db = SaleCrmSessionLocal()
+    db = acquire_session(SaleCrmSessionLocal)
     try:
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
@@ -241,14 +246,14 @@ def get_customer_profile(user_id: int):
             "default_address": addr.street_address if addr else None
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # THÔNG TIN SẢN PHẨM
 # =====================================================
 def get_product_info(product_id: int):
-    db = SaleCrmSessionLocal()
+    db = acquire_session(SaleCrmSessionLocal)
     try:
         row = (
             db.query(Product, Brand)
@@ -268,14 +273,14 @@ def get_product_info(product_id: int):
             "active": product.is_active
         }
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # BIẾN THỂ SẢN PHẨM
 # =====================================================
 def get_product_variants(product_id: int):
-    db = SaleCrmSessionLocal()
+    db = acquire_session(SaleCrmSessionLocal)
     try:
         variants = (
             db.query(ProductVariant)
@@ -293,14 +298,14 @@ def get_product_variants(product_id: int):
             for v in variants
         ]
     finally:
-        db.close()
+        release_session(db)
 
 
 # =====================================================
 # SẢN PHẨM THEO HÃNG
 # =====================================================
 def get_products_by_brand(brand_id: int):
-    db = SaleCrmSessionLocal()
+    db = acquire_session(SaleCrmSessionLocal)
     try:
         products = (
             db.query(Product)
@@ -310,4 +315,4 @@ def get_products_by_brand(brand_id: int):
 
         return [{"id": p.id, "name": p.name} for p in products]
     finally:
-        db.close()
+        release_session(db)
@@ -1,12 +1,22 @@
 from sqlalchemy import (
     Column, Integer, BigInteger, String, Date, DateTime,
-    Enum, Boolean, ForeignKey, DECIMAL, Text, UniqueConstraint
+    Enum, Boolean, ForeignKey, DECIMAL, Text, UniqueConstraint, Index,
+    case, event, func, insert, select
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from app.db.supply_chain_database import SupplyChainBase
 
+# Index trigram (GIN) cũ cho tìm tên bằng ILIKE '%kw%'; tra tên giờ dùng NameIndex
+# trong RAM (name_index.py) nên không query nào dùng -> apply_index_pack xoá đi
+RETIRED_INDEXES = (
+    "ix_warehouses_name_trgm",
+    "ix_products_name_trgm",
+    "ix_products_sku_trgm",
+    "ix_suppliers_name_trgm",
+)
+
 class Warehouse(SupplyChainBase):
     __tablename__ = "warehouses"
 
@@ -248,6 +258,9 @@ class CurrentStock(SupplyChainBase):
 
 class InventoryTransactionLog(SupplyChainBase):
     __tablename__ = "inventory_transaction_logs"
+    __table_args__ = (
+        Index("ix_inventory_logs_product_date", "product_id", "transaction_date"),
+    )
 
     log_id = Column(BigInteger, primary_key=True)
     transaction_type = Column(
@@ -308,3 +321,212 @@ class PurchaseReturn(SupplyChainBase):
         default="DRAFT"
     )
     finance_journal_entry_id = Column(BigInteger)
+
+
+# =====================================================
+# TỔNG HỢP TỒN KHO (bảng tổng hợp, cập nhật tăng dần)
+# Tool phân tích (tổng tồn, sắp hết, tồn nhiều, tồn theo kho) đọc từ đây
+# thay vì SUM(current_stock) GROUP BY mỗi lần hỏi.
+# Nguồn số liệu là current_stock (số tồn mà tool trả về): trigger PostgreSQL
+# cộng phần chênh lệch của mỗi dòng INSERT / UPDATE / DELETE vào 2 bảng dưới.
+# =====================================================
+class ProductStockSummary(SupplyChainBase):
+    __tablename__ = "product_stock_summary"
+
+    product_id = Column(Integer, ForeignKey("products.product_id"), primary_key=True)
+    quantity_on_hand = Column(BigInteger, nullable=False, default=0)
+    quantity_allocated = Column(BigInteger, nullable=False, default=0)
+    # Số dòng current_stock đang góp vào tổng (về 0 -> xoá dòng tổng hợp)
+    stock_rows = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class WarehouseStockSummary(SupplyChainBase):
+    __tablename__ = "warehouse_stock_summary"
+
+    warehouse_id = Column(Integer, ForeignKey("warehouses.warehouse_id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.product_id"), primary_key=True)
+    quantity_on_hand = Column(BigInteger, nullable=False, default=0)
+    quantity_allocated = Column(BigInteger, nullable=False, default=0)
+    stock_rows = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+STOCK_SUMMARY_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION stock_summary_add(
+        p_product INT, p_warehouse INT, d_qty BIGINT, d_alloc BIGINT, d_rows INT
+    ) RETURNS void AS $$
+    BEGIN
+        INSERT INTO product_stock_summary AS s
+            (product_id, quantity_on_hand, quantity_allocated, stock_rows, updated_at)
+        VALUES (p_product, d_qty, d_alloc, d_rows, now())
+        ON CONFLICT (product_id) DO UPDATE SET
+            quantity_on_hand = s.quantity_on_hand + EXCLUDED.quantity_on_hand,
+            quantity_allocated = s.quantity_allocated + EXCLUDED.quantity_allocated,
+            stock_rows = s.stock_rows + EXCLUDED.stock_rows,
+            updated_at = now();
+
+        INSERT INTO warehouse_stock_summary AS s
+            (warehouse_id, product_id, quantity_on_hand, quantity_allocated, stock_rows, updated_at)
+        VALUES (p_warehouse, p_product, d_qty, d_alloc, d_rows, now())
+        ON CONFLICT (warehouse_id, product_id) DO UPDATE SET
+            quantity_on_hand = s.quantity_on_hand + EXCLUDED.quantity_on_hand,
+            quantity_allocated = s.quantity_allocated + EXCLUDED.quantity_allocated,
+            stock_rows = s.stock_rows + EXCLUDED.stock_rows,
+            updated_at = now();
+
+        IF d_rows < 0 THEN
+            DELETE FROM product_stock_summary
+            WHERE product_id = p_product AND stock_rows <= 0;
+            DELETE FROM warehouse_stock_summary
+            WHERE warehouse_id = p_warehouse AND product_id = p_product AND stock_rows <= 0;
+        END IF;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION current_stock_summary_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM stock_summary_add(
+                OLD.product_id, OLD.warehouse_id,
+                -COALESCE(OLD.quantity_on_hand, 0), -COALESCE(OLD.quantity_allocated, 0), -1
+            );
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM stock_summary_add(
+                NEW.product_id, NEW.warehouse_id,
+                COALESCE(NEW.quantity_on_hand, 0), COALESCE(NEW.quantity_allocated, 0), 1
+            );
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_current_stock_summary ON current_stock",
+    """
+    CREATE TRIGGER trg_current_stock_summary
+    AFTER INSERT OR DELETE
+        OR UPDATE OF quantity_on_hand, quantity_allocated, product_id, warehouse_id
+    ON current_stock
+    FOR EACH ROW EXECUTE FUNCTION current_stock_summary_trigger()
+    """,
+]
+
+
+def rebuild_stock_summaries(connection):
+    """
+    Tính lại toàn bộ bảng tổng hợp từ current_stock (lần đầu tạo bảng,
+    hoặc database không có trigger - VD: SQLite khi dev).
+    """
+    if connection.dialect.name == "postgresql":
+        # Chặn ghi current_stock tới hết transaction: trigger của giao dịch ghi xen
+        # giữa DELETE và INSERT ... SELECT sẽ cộng vào bảng rỗng rồi bị ghi đè
+        connection.exec_driver_sql("LOCK TABLE current_stock IN SHARE MODE")
+
+    summaries = (
+        (ProductStockSummary, (CurrentStock.product_id,)),
+        (WarehouseStockSummary, (CurrentStock.warehouse_id, CurrentStock.product_id)),
+    )
+    for model, keys in summaries:
+        connection.execute(model.__table__.delete())
+        connection.execute(
+            insert(model).from_select(
+                [k.key for k in keys] + ["quantity_on_hand", "quantity_allocated", "stock_rows", "updated_at"],
+                select(
+                    *keys,
+                    func.sum(func.coalesce(CurrentStock.quantity_on_hand, 0)),
+                    func.sum(func.coalesce(CurrentStock.quantity_allocated, 0)),
+                    func.count(),
+                    func.now()
+                ).group_by(*keys)
+            )
+        )
+
+
+# =====================================================
+# LẦN XUẤT KHO CUỐI CỦA TỪNG SẢN PHẨM (phát hiện dead stock)
+# Trigger cập nhật khi ghi log giao dịch kho -> hỏi dead stock chỉ cần tra
+# bảng nhỏ này theo khoá chính, không quét inventory_transaction_logs.
+# =====================================================
+class ProductLastMovement(SupplyChainBase):
+    __tablename__ = "product_last_movement"
+
+    product_id = Column(Integer, ForeignKey("products.product_id"), primary_key=True)
+    last_outbound_at = Column(DateTime, index=True)
+    last_movement_at = Column(DateTime)
+
+
+LAST_MOVEMENT_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION inventory_log_last_movement_trigger() RETURNS trigger AS $$
+    DECLARE
+        tx_date TIMESTAMP := COALESCE(NEW.transaction_date, now());
+    BEGIN
+        INSERT INTO product_last_movement AS m (product_id, last_outbound_at, last_movement_at)
+        VALUES (
+            NEW.product_id,
+            CASE WHEN NEW.transaction_type = 'OUTBOUND' THEN tx_date END,
+            tx_date
+        )
+        ON CONFLICT (product_id) DO UPDATE SET
+            last_outbound_at = GREATEST(m.last_outbound_at, EXCLUDED.last_outbound_at),
+            last_movement_at = GREATEST(m.last_movement_at, EXCLUDED.last_movement_at);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_inventory_log_last_movement ON inventory_transaction_logs",
+    """
+    CREATE TRIGGER trg_inventory_log_last_movement
+    AFTER INSERT ON inventory_transaction_logs
+    FOR EACH ROW EXECUTE FUNCTION inventory_log_last_movement_trigger()
+    """,
+]
+
+
+def rebuild_last_movements(connection):
+    """
+    Tính lại product_last_movement từ toàn bộ log (chạy 1 lần khi tạo bảng).
+    """
+    log = InventoryTransactionLog
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("LOCK TABLE inventory_transaction_logs IN SHARE MODE")
+
+    connection.execute(ProductLastMovement.__table__.delete())
+    connection.execute(
+        insert(ProductLastMovement).from_select(
+            ["product_id", "last_outbound_at", "last_movement_at"],
+            select(
+                log.product_id,
+                func.max(case((log.transaction_type == "OUTBOUND", log.transaction_date))),
+                func.max(log.transaction_date)
+            ).group_by(log.product_id)
+        )
+    )
+
+
+def rebuild_derived_tables_without_triggers(connection):
+    """
+    Database không có trigger (SQLite khi dev): gọi sau khi ghi current_stock /
+    inventory_transaction_logs ngoài app (seed, import) để tool tồn kho thấy dữ liệu.
+    PostgreSQL: trigger đã cập nhật -> không làm gì.
+    """
+    if connection.dialect.name == "postgresql":
+        return
+    rebuild_stock_summaries(connection)
+    rebuild_last_movements(connection)
+
+
+@event.listens_for(SupplyChainBase.metadata, "after_create")
+def _install_stock_summaries(target, connection, tables=(), **kw):
+    if connection.dialect.name == "postgresql":
+        for statement in STOCK_SUMMARY_DDL + LAST_MOVEMENT_DDL:
+            connection.exec_driver_sql(statement)
+
+    # Bảng tổng hợp vừa được tạo -> nạp số liệu hiện có
+    if ProductStockSummary.__table__ in tables or WarehouseStockSummary.__table__ in tables:
+        rebuild_stock_summaries(connection)
+    if ProductLastMovement.__table__ in tables:
+        rebuild_last_movements(connection)
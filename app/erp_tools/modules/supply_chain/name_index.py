@@ -0,0 +1,200 @@
+# app/erp_tools/modules/supply_chain/name_index.py
+
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Iterable, Optional
+
+from app.config import settings
+from app.core.executors import get_executor
+from app.core.text_normalize import fold_text
+from app.db.supply_chain_database import SupplyChainSessionLocal
+from app.db.unit_of_work import acquire_session, release_session
+from app.erp_tools.modules.supply_chain.models import Product, Supplier, Warehouse
+from app.erp_tools.router.keyword_automaton import KeywordAutomaton
+
+# =====================================================
+# CHỈ MỤC TÊN TRONG RAM: SẢN PHẨM / SKU / KHO / NHÀ CUNG CẤP
+# Tên người dùng gõ ("iphone 15", "kho ha noi", "hn") -> ID, không cần
+# ILIKE '%kw%' quét bảng lúc trả lời chat; tool chỉ còn truy vấn theo khoá chính.
+# Nạp lại định kỳ ở nền (NAME_INDEX_REFRESH_SECONDS).
+# =====================================================
+
+_SEPARATORS = re.compile(r"[\s\-_/.,]+")
+
+
+def fold(text: str) -> str:
+    """
+    "Kho Chính  Hà Nội" -> "kho chinh ha noi": dạng không dấu dùng chung
+    (text_normalize), coi "-", "_", "/" ... như khoảng trắng.
+    """
+    return _SEPARATORS.sub(" ", fold_text(text)).strip()
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+    """
+    Chỉ mục 1 loại đối tượng: mỗi ID có vài tên (tên, mã...) và alias (viết tắt).
+
+    - search(keyword): như ILIKE '%keyword%' trên các tên nhưng không phân biệt
+      dấu; lọc ứng viên bằng trigram rồi mới so chuỗi con. Không khớp -> rỗng,
+      không đoán gần đúng: "iphone 16" / "xps 15" giống "iphone 15" / "xps 13"
+      gần hết trigram nhưng là model khác, trả nhầm tồn kho còn tệ hơn không có.
+    - find_in_text(text): ID có tên / alias xuất hiện nguyên cụm từ trong câu.
+    """
+
+    def __init__(self, entries: Iterable[tuple[int, str, Iterable[str], Iterable[str]]]):
+        self.display: dict[int, str] = {}
+        self._names: dict[int, tuple[str, ...]] = {}
+        self._grams: dict[str, set[int]] = {}
+        self._aliases: dict[str, set[int]] = {}
+
+        for entity_id, display, names, aliases in entries:
+            folded = tuple(dict.fromkeys(fold(n) for n in names if n))
+            self.display[entity_id] = display
+            self._names[entity_id] = folded
+
+            for name in folded:
+                for gram in _trigrams(name):
+                    self._grams.setdefault(gram, set()).add(entity_id)
+
+            for alias in aliases:
+                self._aliases.setdefault(alias, set()).add(entity_id)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def search(self, keyword: str) -> list[int]:
+        key = fold(keyword or "")
+        if not key:
+            return []
+
+        ids = set(self._aliases.get(key, ()))
+
+        grams = _trigrams(key)
+        if grams:
+            postings = sorted((self._grams.get(g, set()) for g in grams), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        else:
+            # Keyword < 3 ký tự: không lọc được bằng trigram
+            candidates = self._names
+
+        ids.update(i for i in candidates if any(key in name for name in self._names[i]))
+        return sorted(ids)
+
+    @cached_property
+    def _phrases(self) -> KeywordAutomaton:
+        # Chỉ dựng khi cần find_in_text (kho), không tốn RAM cho bảng sản phẩm lớn
+        phrases = [(name, i) for i, names in self._names.items() for name in names]
+        phrases += [(alias, i) for alias, ids in self._aliases.items() for i in ids]
+        return KeywordAutomaton(phrases)
+
+    def find_in_text(self, text: str) -> list[int]:
+        # Cụm dài hơn (cụ thể hơn) đứng trước
+        matches = sorted(self._phrases.iter_matches(fold(text)), key=lambda m: m[0] - m[1])
+        return list(dict.fromkeys(entity_id for _, _, entity_id in matches))
+
+
+def _acronym(words: list[str]) -> str:
+    return "".join(w[0] for w in words)
+
+
+def warehouse_aliases(name: str) -> set[str]:
+    """
+    "Kho Chính Hà Nội" -> {"chinh ha noi", "ha noi", "chn", "hn"}:
+    các đuôi >= 2 từ của tên (bỏ chữ "kho") và chữ viết tắt của chúng.
+    """
+    words = fold(name).split()
+    if words[:1] == ["kho"]:
+        words = words[1:]
+
+    aliases = set()
+    for start in range(len(words) - 1):
+        tail = words[start:]
+        aliases.add(" ".join(tail))
+        aliases.add(_acronym(tail))
+    return aliases
+
+
+@dataclass
+class SupplyChainNameIndexes:
+    products: NameIndex
+    warehouses: NameIndex
+    suppliers: NameIndex
+    built_at: float = field(default_factory=time.monotonic)
+
+
+def build_name_indexes() -> SupplyChainNameIndexes:
+    db = acquire_session(SupplyChainSessionLocal)
+    try:
+        products = db.query(Product.product_id, Product.product_name, Product.sku).all()
+        warehouses = db.query(
+            Warehouse.warehouse_id, Warehouse.warehouse_name, Warehouse.warehouse_code
+        ).all()
+        suppliers = db.query(
+            Supplier.supplier_id, Supplier.supplier_name, Supplier.supplier_code
+        ).all()
+    finally:
+        release_session(db)
+
+    return SupplyChainNameIndexes(
+        products=NameIndex((pid, name, (name, sku), ()) for pid, name, sku in products),
+        warehouses=NameIndex(
+            (wid, name, (name, code), warehouse_aliases(name)) for wid, name, code in warehouses
+        ),
+        suppliers=NameIndex((sid, name, (name, code), ()) for sid, name, code in suppliers),
+    )
+
+
+# =====================================================
+# BẢN DÙNG CHUNG + NẠP LẠI Ở NỀN
+# =====================================================
+_lock = threading.Lock()
+_current: Optional[SupplyChainNameIndexes] = None
+_refreshing = False
+
+
+def get_name_indexes() -> SupplyChainNameIndexes:
+    """
+    Lần đầu: nạp ngay. Sau đó bản cũ quá hạn -> trả bản cũ và nạp lại ở nền.
+    """
+    global _current, _refreshing
+
+    current = _current
+    if current is None:
+        with _lock:
+            if _current is None:
+                _current = build_name_indexes()
+            return _current
+
+    if time.monotonic() - current.built_at > settings.NAME_INDEX_REFRESH_SECONDS:
+        with _lock:
+            start = not _refreshing
+            _refreshing = True
+        if start:
+            get_executor("db").submit(_refresh_in_background)
+
+    return current
+
+
+def _refresh_in_background():
+    global _refreshing
+    try:
+        refresh_name_indexes()
+    finally:
+        _refreshing = False
+
+
+def refresh_name_indexes() -> SupplyChainNameIndexes:
+    """
+    Nạp lại ngay (VD: vừa thêm sản phẩm / kho mới).
+    """
+    global _current
+    indexes = build_name_indexes()
+    _current = indexes
+    return indexes
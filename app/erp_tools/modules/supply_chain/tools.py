@@ -1,12 +1,17 @@
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, exists
 from app.db.supply_chain_database import SupplyChainSessionLocal
-from sqlalchemy import or_
+from app.db.unit_of_work import acquire_session, release_session
+from app.erp_tools.tool_cache import cached_tool
+from app.erp_tools.modules.supply_chain.name_index import get_name_indexes
 
 from app.erp_tools.modules.supply_chain.models import (
     # Inventory
     CurrentStock,
     InventoryTransactionLog,
+    ProductStockSummary,
+    WarehouseStockSummary,
+    ProductLastMovement,
 
     # Master
     Product,
@@ -35,153 +40,120 @@ from app.erp_tools.modules.supply_chain.models import (
 )
 
 def get_inventory_stock(product_id: int):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.product_name,
-            func.sum(CurrentStock.quantity_on_hand).label("quantity")
+            ProductStockSummary.quantity_on_hand.label("quantity")
         ).join(Product).filter(
-            CurrentStock.product_id == product_id
-        ).group_by(Product.product_name).first()
+            ProductStockSummary.product_id == product_id
+        ).first()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_inventory_stock_by_sku(sku: str):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.sku,
             Product.product_name,
-            func.sum(CurrentStock.quantity_on_hand).label("quantity")
+            ProductStockSummary.quantity_on_hand.label("quantity")
         ).join(Product).filter(
             Product.sku == sku
-        ).group_by(Product.sku, Product.product_name).first()
+        ).first()
     finally:
-        db.close()
-
-from sqlalchemy import func, or_
-from app.erp_tools.modules.supply_chain.models import (
-    Product, CurrentStock
-)
-from app.db.supply_chain_database import SupplyChainSessionLocal
-
+        release_session(db)
 
 def get_inventory_stock_by_keyword(keyword: str):
-    db = SupplyChainSessionLocal()
+    # Tên / SKU -> product_id qua chỉ mục trong RAM, rồi truy vấn theo khoá chính
+    product_ids = get_name_indexes().products.search(keyword)
+    if not product_ids:
+        return []
+
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return (
             db.query(
                 Product.product_name,
-                func.sum(CurrentStock.quantity_on_hand).label("quantity")
-            )
-            .join(Product, Product.product_id == CurrentStock.product_id)
-            .filter(
-                or_(
-                    Product.product_name.ilike(f"%{keyword}%"),
-                    Product.sku.ilike(f"%{keyword}%")
-                )
+                ProductStockSummary.quantity_on_hand.label("quantity")
             )
-            .group_by(Product.product_name)
+            .join(Product, Product.product_id == ProductStockSummary.product_id)
+            .filter(ProductStockSummary.product_id.in_(product_ids))
             .all()
         )
     finally:
-        db.close()
-
-from sqlalchemy import or_
-from app.erp_tools.modules.supply_chain.models import Supplier
+        release_session(db)
 
 
 def get_supplier_by_keyword(keyword: str):
-    db = SupplyChainSessionLocal()
+    supplier_ids = get_name_indexes().suppliers.search(keyword)
+    if not supplier_ids:
+        return []
+
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return (
             db.query(Supplier)
-            .filter(
-                or_(
-                    Supplier.supplier_name.ilike(f"%{keyword}%"),
-                    Supplier.supplier_code.ilike(f"%{keyword.upper()}%")
-                )
-            )
+            .filter(Supplier.supplier_id.in_(supplier_ids))
             .all()
         )
     finally:
-        db.close()
-
-from sqlalchemy import or_
-from app.erp_tools.modules.supply_chain.models import Warehouse
+        release_session(db)
 
 
-def get_stock_by_warehouse(keyword: str):
-    db = SupplyChainSessionLocal()
-    try:
-        return (
-            db.query(
-                Product.product_name,
-                func.sum(CurrentStock.quantity_on_hand).label("quantity")
-            )
-            .join(Product, Product.product_id == CurrentStock.product_id)
-            .join(Warehouse, Warehouse.warehouse_id == CurrentStock.warehouse_id)
-            .filter(
-                or_(
-                    Warehouse.warehouse_name.ilike(f"%{keyword}%"),
-                    Warehouse.warehouse_code.ilike(f"%{keyword.upper()}%")
-                )
-            )
-            .group_by(Product.product_name)
-            .all()
-        )
-    finally:
-        db.close()
-
 def get_stock_by_warehouse_and_product(
     warehouse_keyword: str,
     product_keyword: str
 ):
-    db = SupplyChainSessionLocal()
+    indexes = get_name_indexes()
+    warehouse_ids = indexes.warehouses.search(warehouse_keyword)
+    product_ids = indexes.products.search(product_keyword)
+    if not warehouse_ids or not product_ids:
+        return []
+
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return (
             db.query(
                 Product.product_name,
-                func.sum(CurrentStock.quantity_on_hand).label("quantity")
+                func.sum(WarehouseStockSummary.quantity_on_hand).label("quantity")
             )
-            .join(Product)
-            .join(Warehouse)
+            .join(Product, Product.product_id == WarehouseStockSummary.product_id)
             .filter(
-                Warehouse.warehouse_name.ilike(f"%{warehouse_keyword}%"),
-                Product.product_name.ilike(f"%{product_keyword}%")
+                WarehouseStockSummary.warehouse_id.in_(warehouse_ids),
+                WarehouseStockSummary.product_id.in_(product_ids)
             )
             .group_by(Product.product_name)
             .all()
         )
     finally:
-        db.close()
+        release_session(db)
 
 def get_stock_by_warehouse(warehouse_keyword: str):
-    db = SupplyChainSessionLocal()
+    warehouse_ids = get_name_indexes().warehouses.search(warehouse_keyword)
+    if not warehouse_ids:
+        return []
+
+    db = acquire_session(SupplyChainSessionLocal)
     try:
+        # Tổng theo sản phẩm trên các kho khớp tên / mã (1 dòng / kho / sản phẩm)
         return (
             db.query(
                 Product.product_name,
-                func.sum(CurrentStock.quantity_on_hand).label("quantity")
-            )
-            .join(Product, Product.product_id == CurrentStock.product_id)
-            .join(Warehouse, Warehouse.warehouse_id == CurrentStock.warehouse_id)
-            .filter(
-                or_(
-                    Warehouse.warehouse_name.ilike(f"%{warehouse_keyword}%"),
-                    Warehouse.warehouse_code.ilike(f"%{warehouse_keyword.upper()}%")
-                )
+                func.sum(WarehouseStockSummary.quantity_on_hand).label("quantity")
             )
+            .join(Product, Product.product_id == WarehouseStockSummary.product_id)
+            .filter(WarehouseStockSummary.warehouse_id.in_(warehouse_ids))
             .group_by(Product.product_name)
             .all()
         )
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_stock_by_bin(bin_id: int):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.product_name,
@@ -190,62 +162,72 @@ def get_stock_by_bin(bin_id: int):
             CurrentStock.bin_id == bin_id
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
+@cached_tool(ttl=60, tags=("supply_chain.stock",))
 def get_all_stock_summary():
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.product_name,
-            func.sum(CurrentStock.quantity_on_hand).label("total_quantity")
-        ).join(Product).group_by(Product.product_name).all()
+            ProductStockSummary.quantity_on_hand.label("total_quantity")
+        ).join(Product).all()
     finally:
-        db.close()
+        release_session(db)
 
 def check_product_availability(product_id: int):
     stock = get_inventory_stock(product_id)
     return stock and stock.quantity > 0
 
 
+@cached_tool(ttl=60, tags=("supply_chain.stock",))
 def get_low_stock_products():
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.product_name,
-            func.sum(CurrentStock.quantity_on_hand).label("quantity"),
+            ProductStockSummary.quantity_on_hand.label("quantity"),
             Product.min_stock_level
-        ).join(Product).group_by(Product.product_id).having(
-            func.sum(CurrentStock.quantity_on_hand) < Product.min_stock_level
+        ).join(Product).filter(
+            ProductStockSummary.quantity_on_hand < Product.min_stock_level
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
+@cached_tool(ttl=60, tags=("supply_chain.stock",))
 def get_overstock_products(threshold: int = 500):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.product_name,
-            func.sum(CurrentStock.quantity_on_hand).label("quantity")
-        ).join(Product).group_by(Product.product_id).having(
-            func.sum(CurrentStock.quantity_on_hand) > threshold
+            ProductStockSummary.quantity_on_hand.label("quantity")
+        ).join(Product).filter(
+            ProductStockSummary.quantity_on_hand > threshold
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
+@cached_tool(ttl=300, tags=("supply_chain.stock",))
 def get_dead_stock_products(days: int = 90):
-    db = SupplyChainSessionLocal()
+    """
+    Sản phẩm không xuất kho trong `days` ngày (chưa từng xuất thì tính từ
+    lần nhập / điều chỉnh cuối). Tra product_last_movement theo khoá chính.
+    """
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         cutoff = datetime.utcnow() - timedelta(days=days)
-        return db.query(Product.product_name).filter(
-            ~Product.product_id.in_(
-                db.query(InventoryTransactionLog.product_id)
-                .filter(InventoryTransactionLog.transaction_date >= cutoff)
-            )
-        ).all()
+        moved_recently = exists().where(
+            ProductLastMovement.product_id == Product.product_id,
+            func.coalesce(
+                ProductLastMovement.last_outbound_at,
+                ProductLastMovement.last_movement_at
+            ) >= cutoff
+        )
+        return db.query(Product.product_name).filter(~moved_recently).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_stock_alerts():
@@ -255,7 +237,7 @@ def get_stock_alerts():
     }
 
 def get_stock_reserved_quantity(product_id: int):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             func.sum(CurrentStock.quantity_allocated)
@@ -263,17 +245,17 @@ def get_stock_reserved_quantity(product_id: int):
             CurrentStock.product_id == product_id
         ).scalar()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_available_stock(product_id: int):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             func.sum(CurrentStock.quantity_on_hand - CurrentStock.quantity_allocated)
         ).filter(CurrentStock.product_id == product_id).scalar()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_stock_for_sales_order(product_id: int, required_qty: int):
@@ -281,65 +263,71 @@ def get_stock_for_sales_order(product_id: int, required_qty: int):
     return available >= required_qty
 
 def get_goods_receipt_status(gr_code: str):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             GoodsReceipt.gr_code,
             GoodsReceipt.status
         ).filter(GoodsReceipt.gr_code == gr_code).first()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_goods_receipt_detail(gr_code: str):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.product_name,
             GRItem.quantity_received,
             Warehouse.warehouse_name
-        ).join(GRItem).join(Product).join(Warehouse).filter(
+        ).select_from(GoodsReceipt).join(
+            GRItem, GRItem.gr_id == GoodsReceipt.gr_id
+        ).join(
+            Product, Product.product_id == GRItem.product_id
+        ).join(
+            Warehouse, Warehouse.warehouse_id == GoodsReceipt.warehouse_id
+        ).filter(
             GoodsReceipt.gr_code == gr_code
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_goods_receipts_by_po(po_id: int):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(GoodsReceipt).filter(
             GoodsReceipt.po_id == po_id
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_goods_receipts_by_supplier(supplier_id: int):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(GoodsReceipt).join(PurchaseOrder).filter(
             PurchaseOrder.supplier_id == supplier_id
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_recent_goods_receipts(days: int = 7):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(GoodsReceipt).filter(
             GoodsReceipt.receipt_date >= datetime.utcnow() - timedelta(days=days)
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 def get_received_vs_ordered_quantity(po_id: int):
     """
     So sánh số lượng đặt mua (PO) và số lượng đã nhập kho (GR)
     Dùng cho phân tích thiếu hàng / nhập chưa đủ
     """
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         result = (
             db.query(
@@ -372,21 +360,21 @@ def get_received_vs_ordered_quantity(po_id: int):
         ]
 
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_partial_received_pos():
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(PurchaseOrder.po_code).filter(
             PurchaseOrder.status == "PARTIAL_RECEIVED"
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_supplier_delivery_performance():
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Supplier.supplier_name,
@@ -395,63 +383,67 @@ def get_supplier_delivery_performance():
             Supplier.supplier_name
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 def get_goods_issue_status(gi_code: str):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             GoodsIssue.gi_code,
             GoodsIssue.status
         ).filter(GoodsIssue.gi_code == gi_code).first()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_goods_issue_detail(gi_code: str):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.product_name,
             GIItem.quantity_issued
-        ).join(GIItem).join(Product).filter(
+        ).select_from(GoodsIssue).join(
+            GIItem, GIItem.gi_id == GoodsIssue.gi_id
+        ).join(
+            Product, Product.product_id == GIItem.product_id
+        ).filter(
             GoodsIssue.gi_code == gi_code
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_goods_issues_by_type(issue_type: str):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(GoodsIssue).filter(
             GoodsIssue.issue_type == issue_type
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_goods_issues_by_reference(ref: str):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(GoodsIssue).filter(
             GoodsIssue.reference_doc_id == ref
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 def get_pending_goods_issues():
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(GoodsIssue).filter(
             GoodsIssue.status == "DRAFT"
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_daily_outbound_summary():
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             func.date(GoodsIssue.issue_date),
@@ -460,11 +452,11 @@ def get_daily_outbound_summary():
             func.date(GoodsIssue.issue_date)
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_top_issued_products(limit: int = 5):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.product_name,
@@ -473,31 +465,31 @@ def get_top_issued_products(limit: int = 5):
             Product.product_name
         ).order_by(func.sum(GIItem.quantity_issued).desc()).limit(limit).all()
     finally:
-        db.close()
+        release_session(db)
 
 def get_purchase_request_status(pr_code: str):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             PurchaseRequest.pr_code,
             PurchaseRequest.status
         ).filter(PurchaseRequest.pr_code == pr_code).first()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_open_purchase_requests():
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(PurchaseRequest).filter(
             PurchaseRequest.status != "PROCESSED"
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_pr_detail(pr_id: int):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.product_name,
@@ -506,22 +498,22 @@ def get_pr_detail(pr_id: int):
             PRItem.pr_id == pr_id
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_purchase_order_status(po_code: str):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             PurchaseOrder.po_code,
             PurchaseOrder.status
         ).filter(PurchaseOrder.po_code == po_code).first()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_po_receiving_progress(po_id: int):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         ordered = db.query(func.sum(POItem.quantity_ordered)).filter(
             POItem.po_id == po_id
@@ -531,20 +523,21 @@ def get_po_receiving_progress(po_id: int):
         ).scalar() or 0
         return {"ordered": ordered, "received": received}
     finally:
-        db.close()
+        release_session(db)
 
 def get_supplier_profile(supplier_code: str):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(Supplier).filter(
             Supplier.supplier_code == supplier_code
         ).first()
     finally:
-        db.close()
+        release_session(db)
 
 
+@cached_tool(ttl=600, tags=("supply_chain.procurement",))
 def rank_suppliers_by_performance():
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Supplier.supplier_name,
@@ -553,10 +546,10 @@ def rank_suppliers_by_performance():
             Supplier.supplier_name
         ).order_by(func.count(PurchaseOrder.po_id).desc()).all()
     finally:
-        db.close()
+        release_session(db)
 
 def get_inventory_transaction_logs(product_id: int):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             InventoryTransactionLog.transaction_type,
@@ -568,10 +561,10 @@ def get_inventory_transaction_logs(product_id: int):
             InventoryTransactionLog.transaction_date.desc()
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 def get_stocktake_status(stocktake_code: str):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Stocktake.stocktake_code,
@@ -580,32 +573,36 @@ def get_stocktake_status(stocktake_code: str):
             Stocktake.stocktake_code == stocktake_code
         ).first()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_stocktake_detail(stocktake_id: int):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.product_name,
             StocktakeDetail.system_quantity,
             StocktakeDetail.actual_quantity
-        ).join(StocktakeDetail).join(Product).filter(
+        ).select_from(StocktakeDetail).join(
+            Product, Product.product_id == StocktakeDetail.product_id
+        ).filter(
             StocktakeDetail.stocktake_id == stocktake_id
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
 
 def get_stock_variance_report(stocktake_id: int):
-    db = SupplyChainSessionLocal()
+    db = acquire_session(SupplyChainSessionLocal)
     try:
         return db.query(
             Product.product_name,
             (StocktakeDetail.actual_quantity - StocktakeDetail.system_quantity).label("variance")
-        ).join(StocktakeDetail).join(Product).filter(
+        ).select_from(StocktakeDetail).join(
+            Product, Product.product_id == StocktakeDetail.product_id
+        ).filter(
             StocktakeDetail.stocktake_id == stocktake_id
         ).all()
     finally:
-        db.close()
+        release_session(db)
 
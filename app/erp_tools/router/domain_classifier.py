@@ -0,0 +1,110 @@
+# app/erp_tools/router/domain_classifier.py
+
+from typing import Dict
+
+from app.core.text_normalize import normalize
+from app.erp_tools.router.keyword_automaton import KeywordMatcher
+
+# =====================================================
+# TỪ VỰNG THEO NGHIỆP VỤ (keyword -> trọng số)
+# Lấy từ các router của từng module; cụm từ đặc trưng = 3, từ chung chung = 1.
+# "rag" = câu hỏi kiến thức / quy trình -> trả lời bằng tài liệu.
+# =====================================================
+DOMAIN_KEYWORDS: Dict[str, Dict[str, float]] = {
+    "finance": {
+        "hóa đơn bán": 3, "hóa đơn mua": 3, "hóa đơn": 2, "ar": 2, "ap": 2,
+        "công nợ": 3, "công nợ khách hàng": 4, "công nợ nhà cung cấp": 4,
+        "còn nợ": 2, "nợ": 1, "phải trả": 2, "phải thu": 2, "đã thu tiền": 2,
+        "thu chi": 3, "giao dịch tiền": 3, "dòng tiền": 2,
+        "bút toán": 3, "nhật ký kế toán": 3, "kế toán": 2,
+        "số dư tài khoản": 3, "số dư": 2,
+        "kỳ kế toán": 3, "hạch toán": 3, "ghi nhận": 1,
+    },
+    "hrm": {
+        "hồ sơ": 2, "thông tin nhân viên": 3, "nhân viên": 2,
+        "phòng ban": 3, "phòng": 1, "chức vụ": 3, "vị trí": 1,
+        "chấm công": 3, "check in": 3, "đi muộn": 3, "tăng ca": 3, "ot": 2,
+        "ca làm": 3, "hợp đồng": 2, "hợp đồng lao động": 3,
+        "lương": 3, "phiếu lương": 3, "lịch sử lương": 3, "chi tiết lương": 3,
+        "nghỉ phép": 3,
+    },
+    "sale_crm": {
+        "đơn hàng": 3, "lịch sử mua": 3, "đã mua": 2, "mua những gì": 3,
+        "thanh toán": 1, "voucher": 3, "mã giảm giá": 3, "áp voucher": 3,
+        "mã": 1, "dùng được": 1,
+        "thông tin tài khoản": 3, "thông tin của tôi": 2,
+        "sản phẩm": 1, "phiên bản": 2, "hãng": 2, "thương hiệu": 2, "đánh giá": 2,
+    },
+    "supply_chain": {
+        "tồn kho": 3, "tồn": 1, "còn hàng": 3, "hết hàng": 3, "số lượng": 1,
+        "sắp hết": 3, "cảnh báo": 1, "thiếu hàng": 3,
+        "tồn nhiều": 3, "dư thừa": 2, "overstock": 3,
+        "không bán": 1, "lâu không xuất": 3, "dead stock": 3,
+        "nhập kho": 3, "phiếu nhập": 3, "gr": 2,
+        "xuất kho": 3, "phiếu xuất": 3, "gi": 2,
+        "đơn mua": 3, "po": 2, "mua hàng": 2, "yêu cầu mua": 3, "pr": 2,
+        "nhà cung cấp": 2, "ncc": 2, "supplier": 3,
+        "kho": 2, "warehouse": 3, "sku": 3, "kệ": 2, "bin": 2,
+        "biến động": 2, "kiểm kê": 3, "stocktake": 3, "chênh lệch": 1,
+    },
+    "rag": {
+        "quy trình": 4, "hướng dẫn": 4, "là gì": 2, "như thế nào": 2,
+        "cách": 1, "làm sao": 2, "tại sao": 2, "chính sách": 2, "quy định": 2,
+        "giải thích": 2, "khái niệm": 2, "ý nghĩa": 2,
+    },
+}
+
+# Khi điểm bằng nhau: ưu tiên theo thứ tự này (ERP trước RAG, vì handler ERP
+# không xử lý được vẫn fallback sang RAG)
+DOMAIN_PRIORITY = ("supply_chain", "finance", "hrm", "sale_crm", "rag")
+
+FALLBACK_DOMAIN = "rag"
+
+# Biên dịch 1 lần lúc import (khớp cả câu gõ không dấu, xem KeywordMatcher)
+_AUTOMATON = KeywordMatcher(
+    (keyword, (domain, weight))
+    for domain, keywords in DOMAIN_KEYWORDS.items()
+    for keyword, weight in keywords.items()
+)
+
+
+def score_domains(text: str) -> Dict[str, float]:
+    """
+    Tổng trọng số keyword khớp theo từng nghiệp vụ (1 lần duyệt câu hỏi).
+    """
+    # Keyword nằm trọn trong keyword dài hơn cùng nghiệp vụ ("kho" trong
+    # "nhập kho") không được cộng điểm lần nữa. Câu gõ không dấu: cụm dài hơn
+    # cũng quyết định nghĩa của từ bên trong dù khác nghiệp vụ ("so luong" là
+    # số lượng, không phải lương)
+    normalized = normalize(text)
+    matches = sorted(
+        _AUTOMATON.iter_matches(normalized),
+        key=lambda m: m[0] - m[1]
+    )
+
+    scores: Dict[str, float] = {}
+    accepted: list[tuple[int, int, str]] = []
+    for start, end, (domain, weight) in matches:
+        if any(
+            (d == domain or not normalized.accented) and s <= start and end <= e
+            for s, e, d in accepted
+        ):
+            continue
+        accepted.append((start, end, domain))
+        scores[domain] = scores.get(domain, 0) + weight
+    return scores
+
+
+def classify_domain(text: str) -> str:
+    """
+    Phân loại câu hỏi vào 1 nghiệp vụ mà không cần gọi LLM.
+    Không khớp keyword nào -> FALLBACK_DOMAIN ("rag").
+    """
+    scores = score_domains(text)
+    if not scores:
+        return FALLBACK_DOMAIN
+
+    return max(
+        DOMAIN_PRIORITY,
+        key=lambda d: (scores.get(d, 0), -DOMAIN_PRIORITY.index(d))
+    )
@@ -1,4 +1,4 @@
-import re
+from app.erp_tools.router.intent_registry import Intent, IntentRegistry
 
 from app.erp_tools.modules.finance_accounting.tools import (
     get_ar_invoice_status,
@@ -23,168 +23,97 @@ from app.erp_tools.modules.finance_accounting.tools import (
 )
 
 # =====================================================
-# HELPER: TRÍCH ID / CODE
+# KEYWORD
+# Bảng keyword theo nhóm, biên dịch 1 lần thành automaton:
+# mỗi câu hỏi chỉ duyệt 1 lần để biết tất cả nhóm khớp.
 # =====================================================
 
-def extract_number(text: str):
-    match = re.search(r"\b(\d+)\b", text)
-    return int(match.group(1)) if match else None
-
-
-def extract_invoice_code(text: str):
-    match = re.search(r"(AR|AP)[-_ ]?(\d+)", text.upper())
-    return int(match.group(2)) if match else None
-
-
-def extract_partner_id(text: str):
-    match = re.search(r"đối tác\s*(\d+)|khách hàng\s*(\d+)|nhà cung cấp\s*(\d+)", text.lower())
-    if not match:
-        return None
-    return int(next(g for g in match.groups() if g))
-
-
-def extract_account_id(text: str):
-    match = re.search(r"tài khoản\s*(\d+)", text.lower())
-    return int(match.group(1)) if match else None
-
-
-def extract_event_code(text: str):
-    match = re.search(r"event\s*([A-Z0-9_]+)", text.upper())
-    return match.group(1) if match else None
-
+KEYWORD_GROUPS = {
+    "ar_invoice": ["hóa đơn bán", "ar"],
+    "ap_invoice": ["hóa đơn mua", "ap"],
+    "receivable": ["công nợ khách hàng", "khách hàng còn nợ"],
+    "payable": ["công nợ nhà cung cấp", "phải trả"],
+    "customer_receivable": ["còn nợ", "công nợ"],
+    "cash": ["thu chi", "giao dịch tiền"],
+    "journal": ["bút toán", "nhật ký kế toán"],
+    "account_balance": ["số dư tài khoản"],
+    "fiscal": ["kỳ kế toán"],
+    "posting_rule": ["hạch toán", "ghi nhận"],
+
+    # Bổ nghĩa
+    "detail": ["chi tiết"],
+    "current": ["hiện tại"],
+}
 
 # =====================================================
-# RULE MATCHER
+# ENTITY DẪN XUẤT
+# (order_id, partner_id, account_id, event_code... đã có sẵn
+#  từ lần quét entity chung của intent_registry)
 # =====================================================
+EXTRACTORS = {
+    # AR-001 / AP001 -> 1; không có mã -> số đầu tiên trong câu
+    "invoice_id": lambda e: e["number"],
+}
 
-def is_ar_invoice_query(text: str):
-    return "hóa đơn bán" in text.lower() or "ar" in text.lower()
-
-
-def is_ap_invoice_query(text: str):
-    return "hóa đơn mua" in text.lower() or "ap" in text.lower()
-
-
-def is_receivable_query(text: str):
-    return "công nợ khách hàng" in text.lower() or "khách hàng còn nợ" in text.lower()
-
-
-def is_payable_query(text: str):
-    return "công nợ nhà cung cấp" in text.lower() or "phải trả" in text.lower()
-
-def is_customer_receivable_query(text: str):
-    return "còn nợ" in text.lower() or "công nợ" in text.lower()
+# =====================================================
+# INTENT (thứ tự = ưu tiên)
+# =====================================================
+INTENTS = [
+    # 1️ HÓA ĐƠN BÁN (AR)
+    Intent("ar_invoice_detail", ("ar_invoice", "detail"), get_ar_invoice_detail,
+           params={"invoice_id": "invoice_id"}),
+    Intent("ar_invoice_status", ("ar_invoice",), get_ar_invoice_status,
+           params={"invoice_id": "invoice_id"}),
 
+    # 2️ CÔNG NỢ KHÁCH HÀNG
+    Intent("customer_receivable", ("receivable",), get_customer_receivable_summary,
+           params={"partner_id": "partner_id"}),
 
-def is_cash_query(text: str):
-    return "thu chi" in text.lower() or "giao dịch tiền" in text.lower()
+    # 3️ HÓA ĐƠN MUA (AP)
+    Intent("ap_invoice_detail", ("ap_invoice", "detail"), get_ap_invoice_detail,
+           params={"invoice_id": "invoice_id"}),
+    Intent("ap_invoice_status", ("ap_invoice",), get_ap_invoice_status,
+           params={"invoice_id": "invoice_id"}),
 
+    # 4️ CÔNG NỢ NHÀ CUNG CẤP
+    Intent("supplier_payable", ("payable",), get_supplier_payable_summary,
+           params={"partner_id": "partner_id"}),
 
-def is_journal_query(text: str):
-    return "bút toán" in text.lower() or "nhật ký kế toán" in text.lower()
+    # 5️ THU – CHI
+    Intent("cash_transaction", ("cash",), get_cash_transaction,
+           params={"transaction_id": "number"}),
+    Intent("cash_flow_history", ("cash",), get_cash_flow_history),
 
+    # 6️ KẾ TOÁN
+    Intent("journal_entry_detail", ("journal",), get_journal_entry_detail,
+           params={"entry_id": "number"}),
+    Intent("journal_entries", ("journal",), get_journal_entries),
+    Intent("account_balance", ("account_balance",), get_account_balance,
+           params={"account_id": "account_id"}),
 
-def is_account_balance_query(text: str):
-    return "số dư tài khoản" in text.lower()
+    # 7️ KỲ KẾ TOÁN
+    Intent("current_fiscal_period", ("fiscal", "current"), get_current_fiscal_period),
+    Intent("fiscal_periods", ("fiscal",), get_fiscal_periods),
 
+    # 8️ GIẢI THÍCH HẠCH TOÁN
+    Intent("posting_rule", ("posting_rule",), explain_posting_rule,
+           params={"event_code": "event_code"}),
+]
 
-def is_fiscal_query(text: str):
-    return "kỳ kế toán" in text.lower()
+REGISTRY = IntentRegistry(KEYWORD_GROUPS, INTENTS, EXTRACTORS)
 
 
-def is_posting_rule_query(text: str):
-    return "hạch toán" in text.lower() or "ghi nhận" in text.lower()
+def match_groups(text: str) -> set:
+    return REGISTRY.match_groups(text)
 
 
 # =====================================================
 # ROUTER FINANCE
 # =====================================================
 
-def finance_router(query: str):
+def finance_router(query: str, intent: str | None = None):
     """
     Finance Router
-    Trả về dict hoặc None
+    Trả về (tên intent, dict) hoặc (None, None)
     """
-
-    q = query.lower()
-
-    # =========================
-    # 1️ HÓA ĐƠN BÁN (AR)
-    # =========================
-    if is_ar_invoice_query(q):
-        invoice_id = extract_invoice_code(query) or extract_number(query)
-        if invoice_id:
-            if "chi tiết" in q:
-                return get_ar_invoice_detail(invoice_id)
-            return get_ar_invoice_status(invoice_id)
-
-    # =========================
-    # 2️ CÔNG NỢ KHÁCH HÀNG
-    # =========================
-    if is_receivable_query(q):
-        partner_id = extract_partner_id(query)
-        if partner_id:
-            return get_customer_receivable_summary(partner_id)
-
-    # =========================
-    # 3️ HÓA ĐƠN MUA (AP)
-    # =========================
-    if is_ap_invoice_query(q):
-        invoice_id = extract_invoice_code(query) or extract_number(query)
-        if invoice_id:
-            if "chi tiết" in q:
-                return get_ap_invoice_detail(invoice_id)
-            return get_ap_invoice_status(invoice_id)
-
-    # =========================
-    # 4️ CÔNG NỢ NHÀ CUNG CẤP
-    # =========================
-    if is_payable_query(q):
-        partner_id = extract_partner_id(query)
-        if partner_id:
-            return get_supplier_payable_summary(partner_id)
-
-    # =========================
-    # 5️ THU – CHI
-    # =========================
-    if is_cash_query(q):
-        tx_id = extract_number(query)
-        if tx_id:
-            return get_cash_transaction(tx_id)
-        return get_cash_flow_history()
-
-    # =========================
-    # 6️ KẾ TOÁN
-    # =========================
-    if is_journal_query(q):
-        entry_id = extract_number(query)
-        if entry_id:
-            return get_journal_entry_detail(entry_id)
-        return get_journal_entries()
-
-    if is_account_balance_query(q):
-        account_id = extract_account_id(query)
-        if account_id:
-            return get_account_balance(account_id)
-
-    # =========================
-    # 7️ KỲ KẾ TOÁN
-    # =========================
-    if is_fiscal_query(q):
-        if "hiện tại" in q:
-            return get_current_fiscal_period()
-        return get_fiscal_periods()
-
-    # =========================
-    # 8️ GIẢI THÍCH HẠCH TOÁN
-    # =========================
-    if is_posting_rule_query(q):
-        event_code = extract_event_code(query)
-        if event_code:
-            return explain_posting_rule(event_code)
-        
-
-    # =========================
-    # FALLBACK
-    # =========================
-    return None
+    return REGISTRY.run(query, intent)
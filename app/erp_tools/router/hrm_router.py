@@ -1,6 +1,7 @@
-import re
 from datetime import datetime
 
+from app.erp_tools.router.intent_registry import Intent, IntentRegistry
+
 from app.erp_tools.modules.hrm.tools import (
     get_employee_profile,
     get_employee_department,
@@ -16,83 +17,94 @@ from app.erp_tools.modules.hrm.tools import (
 )
 
 # =====================================================
-# ENTITY
+# KEYWORD (biên dịch 1 lần thành automaton)
 # =====================================================
-def extract_month_year(text: str):
-    month = None
-    year = datetime.now().year
+KEYWORD_GROUPS = {
+    "profile": ["hồ sơ", "thông tin nhân viên"],
+    "department": ["phòng"],
+    "position": ["chức vụ", "vị trí"],
+    "today_attendance": ["hôm nay", "check in"],
+    "attendance_history": ["lịch sử chấm công", "chấm công"],
+    "late_ot": ["đi muộn", "tăng ca", "ot"],
+    "work_shift": ["ca làm"],
+    "contract": ["hợp đồng"],
+    "salary_history": ["lịch sử lương"],
+    "payslip_detail": ["chi tiết lương"],
+    "payslip": ["lương"],
+}
 
-    m = re.search(r"tháng\s*(\d{1,2})", text.lower())
-    y = re.search(r"năm\s*(\d{4})", text.lower())
+# =====================================================
+# ENTITY
+# "tháng N" / "năm YYYY" có sẵn từ lần quét chung; không nói năm -> năm nay
+# =====================================================
+EXTRACTORS = {
+    "year": lambda e: datetime.now().year,
+}
 
-    if m:
-        month = int(m.group(1))
-    if y:
-        year = int(y.group(1))
 
-    return month, year
+# =====================================================
+# TOOL GHÉP
+# =====================================================
+def get_payslip_with_details(employee_id: int, month: int, year: int):
+    payslip = get_payslip(employee_id, month, year)
+    if payslip and isinstance(payslip, dict):
+        return {
+            "summary": payslip,
+            "details": get_payslip_detail(payslip["id"])
+        }
+    return payslip
 
 
 # =====================================================
-# RULE
+# INTENT (thứ tự = ưu tiên)
 # =====================================================
-def hrm_router(
-    query: str,
-    employee_id: int = 1
-):
-    q = query.lower()
+_EMPLOYEE = ("employee_id",)
+_PERIOD = {"month": "month", "year": "year"}
 
+INTENTS = [
     # 1️ HỒ SƠ
-    if "hồ sơ" in q or "thông tin nhân viên" in q:
-        return get_employee_profile(employee_id)
+    Intent("employee_profile", ("profile",), get_employee_profile, context=_EMPLOYEE),
 
     # 2️ PHÒNG BAN
-    if "phòng" in q:
-        return get_employee_department(employee_id)
+    Intent("employee_department", ("department",), get_employee_department, context=_EMPLOYEE),
 
     # 3️ CHỨC VỤ
-    if "chức vụ" in q or "vị trí" in q:
-        return get_employee_position(employee_id)
+    Intent("employee_position", ("position",), get_employee_position, context=_EMPLOYEE),
 
     # 4️ CHẤM CÔNG HÔM NAY
-    if "hôm nay" in q or "check in" in q:
-        return get_today_attendance(employee_id)
+    Intent("today_attendance", ("today_attendance",), get_today_attendance, context=_EMPLOYEE),
 
     # 5️ LỊCH SỬ CHẤM CÔNG
-    if "lịch sử chấm công" in q:
-        return get_attendance_history(employee_id)
+    Intent("attendance_history", ("attendance_history",), get_attendance_history, context=_EMPLOYEE),
 
     # 6️ ĐI MUỘN / OT
-    if "đi muộn" in q or "tăng ca" in q or "ot" in q:
-        month, year = extract_month_year(q)
-        if month:
-            return get_late_ot_summary(employee_id, month, year)
+    Intent("late_ot_summary", ("late_ot",), get_late_ot_summary,
+           params=_PERIOD, context=_EMPLOYEE),
 
     # 7️ CA LÀM
-    if "ca làm" in q:
-        return get_work_shift(employee_id)
+    Intent("work_shift", ("work_shift",), get_work_shift, context=_EMPLOYEE),
 
     # 8️ HỢP ĐỒNG
-    if "hợp đồng" in q:
-        return get_labor_contract(employee_id)
+    Intent("labor_contract", ("contract",), get_labor_contract, context=_EMPLOYEE),
 
     # 9️ LƯƠNG
-    if "lịch sử lương" in q:
-        return get_salary_history(employee_id)
-
-    if "chi tiết lương" in q:
-        month, year = extract_month_year(q)
-        if month:
-            payslip = get_payslip(employee_id, month, year)
-            if payslip and isinstance(payslip, dict):
-                return {
-                    "summary": payslip,
-                    "details": get_payslip_detail(payslip["id"])
-                }
-
-    if "lương" in q:
-        month, year = extract_month_year(q)
-        if month:
-            return get_payslip(employee_id, month, year)
-
-    return None
+    Intent("salary_history", ("salary_history",), get_salary_history, context=_EMPLOYEE),
+    Intent("payslip_detail", ("payslip_detail",), get_payslip_with_details,
+           params=_PERIOD, context=_EMPLOYEE),
+    Intent("payslip", ("payslip",), get_payslip,
+           params=_PERIOD, context=_EMPLOYEE),
+]
+
+REGISTRY = IntentRegistry(KEYWORD_GROUPS, INTENTS, EXTRACTORS)
+
+
+# =====================================================
+# RULE
+# =====================================================
+def hrm_router(
+    query: str,
+    employee_id: int = 1,
+    intent: str | None = None
+):
+    # (tên intent, kết quả) hoặc (None, None)
+    return REGISTRY.run(query, intent, employee_id=employee_id)
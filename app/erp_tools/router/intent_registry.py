@@ -0,0 +1,294 @@
+# app/erp_tools/router/intent_registry.py
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from app.core.text_normalize import fold_text, normalize
+from app.erp_tools.router.keyword_automaton import KeywordMatcher
+
+# =====================================================
+# ENTITY: 1 regex gộp, biên dịch 1 lần, quét câu hỏi 1 lần
+# =====================================================
+
+# Nhãn đứng trước một số -> tên entity ("đơn hàng 12" -> order_id=12)
+NUMBER_LABELS = {
+    "đơn hàng": "order_id",
+    "sản phẩm": "product_id",
+    "tài khoản": "account_id",
+    "khách hàng": "partner_id",
+    "đối tác": "partner_id",
+    "nhà cung cấp": "partner_id",
+    "tháng": "month",
+    "năm": "year",
+    "hãng": "brand_id",
+    "kệ": "bin_id",
+    "bin": "bin_id",
+    "kiểm kê": "stocktake_id",
+}
+
+# Tên entity -> cách gọi cho người dùng / prompt (báo thiếu thông tin)
+ENTITY_LABELS = {
+    "order_id": "mã đơn hàng",
+    "product_id": "mã sản phẩm",
+    "product_keyword": "tên sản phẩm",
+    "account_id": "số tài khoản",
+    "partner_id": "mã khách hàng / nhà cung cấp",
+    "invoice_id": "số hoá đơn",
+    "month": "tháng",
+    "year": "năm",
+    "brand_id": "mã hãng",
+    "bin_id": "mã kệ",
+    "warehouse": "kho",
+    "stocktake_id": "đợt kiểm kê",
+    "code": "mã chứng từ",
+    "po_code": "mã đơn mua (VD: PO-001)",
+    "po_id": "đơn mua",
+    "pr_code": "mã yêu cầu mua (VD: PR-001)",
+    "gr_code": "mã phiếu nhập (VD: GR-001)",
+    "gi_code": "mã phiếu xuất (VD: GI-001)",
+    "token": "mã SKU / mã voucher",
+    "rating": "số sao",
+    "event_code": "mã nghiệp vụ (event)",
+    "number": "số",
+}
+
+
+def describe_missing(names: list[str]) -> str:
+    """
+    ["gr_code", "warehouse"] -> "Không xác định được mã phiếu nhập (VD: GR-001), kho":
+    không đưa tên entity nội bộ vào prompt / câu trả lời.
+    """
+    labels = dict.fromkeys(ENTITY_LABELS.get(name, "thông tin cần thiết") for name in names)
+    return f"Không xác định được {', '.join(labels)}"
+
+
+# Câu hỏi được quét ở dạng không dấu -> nhãn cũng so ở dạng không dấu
+_FOLDED_LABELS = {fold_text(label): name for label, name in NUMBER_LABELS.items()}
+
+_LABEL_ALTERNATION = "|".join(
+    re.escape(label) for label in sorted(_FOLDED_LABELS, key=len, reverse=True)
+)
+
+# Thứ tự nhánh = thứ tự ưu tiên khi nhiều nhánh cùng khớp tại 1 vị trí
+ENTITY_PATTERN = re.compile(
+    "|".join([
+        # "đơn hàng 12", "tháng 3", "khách hàng 5"...
+        rf"(?P<label>{_LABEL_ALTERNATION})\s*(?P<label_num>\d+)",
+        # Mã chứng từ: PO-001, GR-002, AR-003, AR003
+        r"\b(?P<code_prefix>[A-Za-z]{2,3})(?P<code_sep>[-_ ]?)(?P<code_num>\d+)\b",
+        # "5 sao"
+        r"\b(?P<rating>[1-5])\s*sao\b",
+        # "event SALE_INVOICE"
+        r"\bevent\s*(?P<event>[A-Za-z0-9_]+)",
+        # SKU / mã voucher (IPHONE-15, SALE10, sale10): >= 4 ký tự,
+        # viết HOA hoặc có lẫn chữ số — "voucher", "dell" không tính
+        r"\b(?P<token>(?=[A-Za-z0-9\-]{4})"
+        r"(?:[A-Za-z][A-Za-z\-]*\d[A-Za-z0-9\-]*|(?-i:[A-Z][A-Z0-9\-]*)))(?![\w\-])",
+        r"\b(?P<number>\d+)\b",
+    ]),
+    re.IGNORECASE
+)
+
+
+def scan_entities(text: str) -> Dict[str, Any]:
+    """
+    Quét câu hỏi (đã bỏ dấu, giữ nguyên hoa/thường) MỘT lần, trả về các entity
+    tìm thấy. Mỗi entity giữ giá trị xuất hiện đầu tiên.
+    """
+    found: Dict[str, Any] = {}
+
+    def put(name: str, value: Any):
+        if name not in found:
+            found[name] = value
+
+    for m in ENTITY_PATTERN.finditer(text):
+        kind = m.lastgroup
+
+        if m.group("label") is not None:
+            value = int(m.group("label_num"))
+            name = _FOLDED_LABELS[m.group("label").lower()]
+            if name == "month" and not 1 <= value <= 12:
+                continue
+            if name == "year" and len(m.group("label_num")) != 4:
+                continue
+            put(name, value)
+            put("number", value)
+
+        elif m.group("code_prefix") is not None:
+            prefix = m.group("code_prefix").upper()
+            num = m.group("code_num")
+            if m.group("code_sep") == "-":
+                code = f"{prefix}-{num}"
+                put("code", code)
+                put(f"{prefix.lower()}_code", code)
+            if prefix in ("AR", "AP"):
+                put("invoice_id", int(num))
+            if m.group("code_sep") != " " and len(m.group(0)) >= 4:
+                put("token", m.group(0).upper())
+            put("number", int(num))
+
+        elif kind == "rating":
+            put("rating", int(m.group("rating")))
+            put("number", int(m.group("rating")))
+
+        elif kind == "event":
+            put("event_code", m.group("event").upper())
+
+        elif kind == "token":
+            put("token", m.group("token").upper())
+
+        elif kind == "number":
+            put("number", int(m.group("number")))
+
+    return found
+
+
+class Entities(dict):
+    """
+    Entity của 1 câu hỏi: quét sẵn bằng ENTITY_PATTERN; entity dẫn xuất
+    (tên kho, từ khoá sản phẩm...) chỉ tính khi intent cần tới, rồi cache lại.
+    Truy cập bằng entities[name]; không có -> None.
+    """
+
+    def __init__(self, text: str, extractors: Dict[str, Callable[["Entities"], Any]]):
+        normalized = normalize(text)
+        super().__init__(scan_entities(normalized.cased))
+        self.text = text
+        self.folded = normalized.folded
+        self.accented = normalized.accented
+        self._extractors = extractors
+
+    def __missing__(self, name: str):
+        extractor = self._extractors.get(name)
+        value = extractor(self) if extractor else None
+        self[name] = value
+        return value
+
+
+# =====================================================
+# INTENT
+# =====================================================
+@dataclass
+class Intent:
+    """
+    Khai báo 1 intent:
+    - groups  : các nhóm keyword phải khớp đủ
+    - excludes: nhóm keyword mà nếu khớp thì bỏ qua intent
+    - tool    : hàm được gọi; params = {tham số của tool: tên entity bắt buộc}
+    - optional: như params nhưng không bắt buộc (thiếu thì dùng mặc định của tool)
+    - context : tham số lấy từ ngữ cảnh request (employee_id, user_id...)
+    """
+    name: str
+    groups: tuple[str, ...]
+    tool: Optional[Callable[..., Any]] = None
+    params: Dict[str, str] = field(default_factory=dict)
+    optional: Dict[str, str] = field(default_factory=dict)
+    context: tuple[str, ...] = ()
+    excludes: tuple[str, ...] = ()
+    domain: str = ""
+    confidence: float = 0.95
+
+
+@dataclass
+class IntentMatch:
+    intent: Optional[Intent]
+    entities: Entities
+    # Intent đầu tiên khớp keyword nhưng thiếu entity (để báo lỗi rõ ràng)
+    incomplete: Optional[Intent] = None
+    missing: list[str] = field(default_factory=list)
+
+
+class IntentRegistry:
+    """
+    Danh sách intent theo thứ tự ưu tiên + bảng keyword của 1 module.
+    Keyword biên dịch 1 lần thành automaton; mỗi câu hỏi:
+    1 lần duyệt keyword + 1 lần quét entity, sau đó chọn intent đầu tiên
+    có đủ nhóm keyword và đủ entity bắt buộc.
+    """
+
+    def __init__(
+        self,
+        keyword_groups: Dict[str, list[str]],
+        intents: list[Intent],
+        extractors: Optional[Dict[str, Callable[[Entities], Any]]] = None
+    ):
+        unknown = {g for i in intents for g in i.groups + i.excludes} - set(keyword_groups)
+        if unknown:
+            raise ValueError(f"Intent dùng nhóm keyword chưa khai báo: {sorted(unknown)}")
+
+        self.keyword_groups = keyword_groups
+        self.intents = intents
+        self.extractors = extractors or {}
+        self._matcher = KeywordMatcher(
+            (keyword, group)
+            for group, keywords in keyword_groups.items()
+            for keyword in keywords
+        )
+
+    def match_groups(self, text: str) -> set:
+        # "tồn kho" / "ton kho" / "TỒN KHO" khớp như nhau
+        return self._matcher.payloads(normalize(text))
+
+    def _candidates(self, hits: set):
+        for intent in self.intents:
+            if all(g in hits for g in intent.groups) and not any(g in hits for g in intent.excludes):
+                yield intent
+
+    def classify(self, text: str) -> Optional[Intent]:
+        """
+        Chỉ dựa vào keyword (không cần entity).
+        """
+        hits = self.match_groups(text)
+        return next(self._candidates(hits), None) if hits else None
+
+    def resolve(self, text: str, intent: Optional[str] = None) -> IntentMatch:
+        """
+        intent: tên intent đã chọn sẵn (router ngữ nghĩa) -> bỏ qua keyword,
+        chỉ xét các intent cùng tên (theo thứ tự ưu tiên) và entity của chúng.
+        """
+        entities = Entities(text, self.extractors)
+        result = IntentMatch(intent=None, entities=entities)
+
+        if intent is not None:
+            candidates = (i for i in self.intents if i.name == intent)
+        else:
+            hits = self.match_groups(text)
+            if not hits:
+                return result
+            candidates = self._candidates(hits)
+
+        for candidate in candidates:
+            missing = [e for e in candidate.params.values() if entities[e] is None]
+            if not missing:
+                result.intent = candidate
+                return result
+            if result.incomplete is None:
+                result.incomplete, result.missing = candidate, missing
+
+        return result
+
+    def call(self, match: IntentMatch, **context) -> Any:
+        intent = match.intent
+        kwargs = {param: match.entities[entity] for param, entity in intent.params.items()}
+        for param, entity in intent.optional.items():
+            if match.entities[entity] is not None:
+                kwargs[param] = match.entities[entity]
+        kwargs.update({name: context[name] for name in intent.context})
+        return intent.tool(**kwargs)
+
+    def run(self, text: str, intent: Optional[str] = None, **context) -> tuple[Optional[str], Any]:
+        """
+        Như dispatch nhưng trả kèm tên intent đã chọn (để dựng câu trả lời
+        theo mẫu). (None, None) = không có intent nào đủ điều kiện.
+        """
+        match = self.resolve(text, intent)
+        if match.intent is None or match.intent.tool is None:
+            return None, None
+        return match.intent.name, self.call(match, **context)
+
+    def dispatch(self, text: str, intent: Optional[str] = None, **context) -> Any:
+        """
+        Chọn intent và gọi tool. None = không có intent nào đủ điều kiện.
+        """
+        return self.run(text, intent, **context)[1]
@@ -0,0 +1,146 @@
+# app/erp_tools/router/keyword_automaton.py
+
+import re
+from collections import deque
+from typing import Any, Iterable, Iterator
+
+from app.core.text_normalize import AMBIGUOUS_FOLDED_WORDS, NormalizedText, normalize_text
+
+# Một "từ" = chuỗi chữ cái liên tiếp (tiếng Việt có dấu vẫn là chữ cái).
+# Số và dấu câu là ranh giới: "ar-001", "ar001", "po." đều tách ra "ar" / "po".
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+
+class KeywordAutomaton:
+    """
+    Máy Aho–Corasick trên TỪ: tìm tất cả keyword (cụm 1..n từ) xuất hiện trong
+    câu chỉ với 1 lần duyệt, thay cho hàng chục phép `k in text`.
+
+    - Chạy trên dãy từ thay vì từng ký tự: câu hỏi ~10–20 từ nên số bước
+      ít hơn nhiều, và chỉ khớp trọn từ ("po" không khớp trong "report",
+      "ot" không khớp "robot").
+    - Mỗi keyword gắn với 1 payload (VD: (domain, trọng số), intent);
+      một keyword có thể xuất hiện nhiều lần với payload khác nhau.
+    - So khớp nguyên văn: caller tự chuẩn hoá keyword lẫn câu hỏi
+      (app/core/text_normalize.py).
+    """
+
+    def __init__(self, keywords: Iterable[tuple[str, Any]]):
+        # Trie theo từ: goto[state][word] -> state; outputs[state] = [(số từ, payload)]
+        self._goto: list[dict[str, int]] = [{}]
+        self._outputs: list[list[tuple[int, Any]]] = [[]]
+        self._fail: list[int] = [0]
+        self.size = 0
+
+        for keyword, payload in keywords:
+            words = WORD_PATTERN.findall(keyword)
+            if not words:
+                continue
+            self._add(words, payload)
+            self.size += 1
+
+        self._build_failure_links()
+
+    def _add(self, words: list[str], payload: Any):
+        state = 0
+        for word in words:
+            nxt = self._goto[state].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][word] = nxt
+                self._goto.append({})
+                self._outputs.append([])
+                self._fail.append(0)
+            state = nxt
+        self._outputs[state].append((len(words), payload))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self._goto[state].items():
+                queue.append(nxt)
+
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(word, 0)
+                self._fail[nxt] = target if target != nxt else 0
+
+                # Gộp output của trạng thái fail -> lúc tìm không phải lần ngược
+                self._outputs[nxt] = self._outputs[nxt] + self._outputs[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, int, Any]]:
+        """
+        Yield (từ bắt đầu, từ kết thúc (exclusive), payload) cho mỗi keyword khớp.
+        Vị trí tính theo chỉ số từ trong câu.
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+
+        for i, word in enumerate(WORD_PATTERN.findall(text)):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+
+            for length, payload in outputs[state]:
+                yield i - length + 1, i + 1, payload
+
+    def find_all(self, text: str) -> list[tuple[int, int, Any]]:
+        return list(self.iter_matches(text))
+
+    def payloads(self, text: str) -> set:
+        """
+        Tập payload có ít nhất 1 keyword khớp (dùng thay cho `any(k in text ...)`).
+        """
+        return {payload for _, _, payload in self.iter_matches(text)}
+
+
+class KeywordMatcher:
+    """
+    2 automaton trên cùng bảng keyword: dạng có dấu và dạng không dấu.
+    Câu hỏi gõ có dấu -> so đúng dấu, cộng thêm dạng không dấu cho những từ
+    gõ thiếu dấu ("ton kho ở Hà Nội"); gõ không dấu -> so không dấu.
+    Keyword 1 từ mà dạng không dấu đa nghĩa (AMBIGUOUS_FOLDED_WORDS: "hãng" ~
+    "hàng") chỉ khớp khi gõ đúng dấu. Keyword cũng được mở rộng viết tắt
+    như câu hỏi ("ncc" = "nhà cung cấp").
+    """
+
+    def __init__(self, keywords: Iterable[tuple[str, Any]]):
+        exact, folded, accented = [], [], []
+        for keyword, payload in keywords:
+            normalized = normalize_text(keyword)
+            exact.append((normalized.lower, payload))
+            if WORD_PATTERN.findall(normalized.folded) in _AMBIGUOUS_KEYWORDS:
+                continue
+            folded.append((normalized.folded, payload))
+            if normalized.accented:
+                accented.append((normalized.folded, payload))
+
+        self._exact = KeywordAutomaton(exact)
+        self._folded = KeywordAutomaton(folded)
+        # Câu có dấu: keyword không dấu sẵn (kho, sku...) đã khớp ở _exact
+        self._folded_accented = KeywordAutomaton(accented)
+        self.size = self._exact.size
+
+    def iter_matches(self, text: NormalizedText) -> Iterator[tuple[int, int, Any]]:
+        if not text.accented:
+            yield from self._folded.iter_matches(text.folded)
+            return
+
+        yield from self._exact.iter_matches(text.lower)
+
+        # Câu gõ lẫn có dấu / không dấu: keyword có dấu được so dạng không dấu
+        # trên các từ gõ không dấu (không trùng với kết quả so đúng dấu ở trên)
+        plain = text.plain_words
+        if not any(plain):
+            return
+        for match in self._folded_accented.iter_matches(text.folded):
+            if all(plain[match[0]:match[1]]):
+                yield match
+
+    def payloads(self, text: NormalizedText) -> set:
+        return {payload for _, _, payload in self.iter_matches(text)}
+
+
+_AMBIGUOUS_KEYWORDS = [[word] for word in AMBIGUOUS_FOLDED_WORDS]
@@ -1,4 +1,7 @@
-import re
+from functools import partial
+
+from app.core.executors import run_parallel
+from app.erp_tools.router.intent_registry import Intent, IntentRegistry
 
 from app.erp_tools.modules.sales_crm.tools import (
     get_order_status,
@@ -15,146 +18,100 @@ from app.erp_tools.modules.sales_crm.tools import (
 )
 
 # =====================================================
-# ENTITY EXTRACT
+# KEYWORD
+# Bảng keyword theo nhóm, biên dịch 1 lần thành automaton
 # =====================================================
-def extract_order_id(text: str):
-    match = re.search(r"đơn hàng\s*(\d+)", text.lower())
-    return int(match.group(1)) if match else None
-
-
-def extract_product_id(text: str):
-    match = re.search(r"sản phẩm\s*(\d+)", text.lower())
-    return int(match.group(1)) if match else None
-
-
-def extract_voucher_code(text: str):
-    match = re.search(r"\b[A-Z0-9]{4,}\b", text.upper())
-    return match.group(0) if match else None
-
-
-def extract_rating(text: str):
-    match = re.search(r"(\d)\s*sao", text.lower())
-    return int(match.group(1)) if match else None
+KEYWORD_GROUPS = {
+    "detail": ["chi tiết"],
+    "order": ["đơn hàng"],
+    "purchase_history": ["lịch sử mua", "đã mua", "mua những gì"],
+    "payment": ["thanh toán"],
+    "voucher": ["voucher", "mã"],
+    "voucher_preview": ["còn bao nhiêu tiền", "sau khi áp", "giảm còn", "áp voucher"],
+    "profile": ["thông tin tài khoản", "thông tin của tôi"],
+    "product": ["sản phẩm"],
+    "brand": ["hãng"],
+    "review": ["đánh giá"],
+}
 
 
 # =====================================================
-# RULE CHECK
+# TOOL GHÉP
 # =====================================================
-def is_order_detail_query(text: str):
-    return "chi tiết" in text and "đơn hàng" in text
-
-
-def is_order_status_query(text: str):
-    return "đơn hàng" in text
-
-
-def is_purchase_history_query(text: str):
-    return any(k in text for k in [
-        "lịch sử mua", "đã mua", "mua những gì"
-    ])
-
-
-def is_payment_query(text: str):
-    return "thanh toán" in text
-
-
-def is_voucher_query(text: str):
-    return "voucher" in text or "mã" in text
-
-
-def is_voucher_preview_query(text: str):
-    return any(k in text for k in [
-        "còn bao nhiêu tiền",
-        "sau khi áp",
-        "giảm còn",
-        "áp voucher"
-    ])
-
-
-def is_profile_query(text: str):
-    return "thông tin tài khoản" in text or "thông tin của tôi" in text
-
+def get_product_overview(product_id: int):
+    return run_parallel({
+        "info": partial(get_product_info, product_id),
+        "variants": partial(get_product_variants, product_id),
+        "reviews": partial(get_product_reviews, product_id),
+    })
 
-def is_product_query(text: str):
-    return "sản phẩm" in text
 
-
-def is_brand_query(text: str):
-    return "hãng" in text
-
-
-def is_review_query(text: str):
-    return "đánh giá" in text
+def create_chatbot_review(product_id: int, user_id: int, rating: int):
+    return create_review(
+        product_id=product_id,
+        user_id=user_id,
+        content="Đánh giá từ chatbot",
+        rating=rating
+    )
 
 
 # =====================================================
-# SALE & CRM ROUTER
+# INTENT (thứ tự = ưu tiên)
+# order_id / product_id / brand_id ("đơn hàng 12", "sản phẩm 3", "hãng 1"),
+# rating ("5 sao") và mã voucher (token) có sẵn từ lần quét entity chung
 # =====================================================
-def sale_crm_router(
-    query: str,
-    user_id: int = 1  # demo hardcode
-):
-    q = query.lower()
-
+INTENTS = [
     # 1️ CHI TIẾT ĐƠN HÀNG
-    if is_order_detail_query(q):
-        order_id = extract_order_id(q)
-        if order_id:
-            return get_order_detail(order_id)
+    Intent("order_detail", ("detail", "order"), get_order_detail,
+           params={"order_id": "order_id"}),
 
     # 2️ TRẠNG THÁI ĐƠN HÀNG
-    if is_order_status_query(q):
-        order_id = extract_order_id(q)
-        if order_id:
-            return get_order_status(order_id, user_id)
+    Intent("order_status", ("order",), get_order_status,
+           params={"order_id": "order_id"}, context=("user_id",)),
 
     # 3️ LỊCH SỬ MUA
-    if is_purchase_history_query(q):
-        return get_purchase_history(user_id)
+    Intent("purchase_history", ("purchase_history",), get_purchase_history,
+           context=("user_id",)),
 
     # 4️ TRẠNG THÁI THANH TOÁN
-    if is_payment_query(q):
-        order_id = extract_order_id(q)
-        if order_id:
-            return get_payment_status(order_id)
+    Intent("payment_status", ("payment",), get_payment_status,
+           params={"payment_id": "order_id"}),
 
     # 5️ VOUCHER – KIỂM TRA
-    if is_voucher_query(q) and not is_voucher_preview_query(q):
-        code = extract_voucher_code(query)
-        if code:
-            return check_voucher_valid(code)
+    Intent("voucher_check", ("voucher",), check_voucher_valid,
+           params={"code": "token"}, excludes=("voucher_preview",)),
 
     # 6 THÔNG TIN KHÁCH HÀNG
-    if is_profile_query(q):
-        return get_customer_profile(user_id)
+    Intent("customer_profile", ("profile",), get_customer_profile,
+           context=("user_id",)),
 
     # 7 SẢN PHẨM
-    if is_product_query(q):
-        product_id = extract_product_id(q)
-        if product_id:
-            return {
-                "info": get_product_info(product_id),
-                "variants": get_product_variants(product_id),
-                "reviews": get_product_reviews(product_id)
-            }
+    Intent("product_overview", ("product",), get_product_overview,
+           params={"product_id": "product_id"}),
 
     # 8 SẢN PHẨM THEO HÃNG
-    if is_brand_query(q):
-        # demo đơn giản: user hỏi “sản phẩm của hãng 1”
-        match = re.search(r"hãng\s*(\d+)", q)
-        if match:
-            return get_products_by_brand(int(match.group(1)))
+    Intent("products_by_brand", ("brand",), get_products_by_brand,
+           params={"brand_id": "brand_id"}),
 
     # 9 ĐÁNH GIÁ SẢN PHẨM
-    if is_review_query(q):
-        product_id = extract_product_id(q)
-        rating = extract_rating(q)
-        if product_id and rating:
-            return create_review(
-                product_id=product_id,
-                user_id=user_id,
-                content="Đánh giá từ chatbot",
-                rating=rating
-            )
-
-    return None
+    Intent("create_review", ("review",), create_chatbot_review,
+           params={"product_id": "product_id", "rating": "rating"}, context=("user_id",)),
+]
+
+REGISTRY = IntentRegistry(KEYWORD_GROUPS, INTENTS)
+
+
+def match_groups(text: str) -> set:
+    return REGISTRY.match_groups(text)
+
+
+# =====================================================
+# SALE & CRM ROUTER
+# =====================================================
+def sale_crm_router(
+    query: str,
+    user_id: int = 1,  # demo hardcode
+    intent: str | None = None
+):
+    # (tên intent, kết quả) hoặc (None, None)
+    return REGISTRY.run(query, intent, user_id=user_id)
@@ -0,0 +1,244 @@
+# app/erp_tools/router/semantic_router.py
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from app.config import settings
+from app.core.embedder import MODEL_NAME, encode_dense, get_embedding_model
+from app.erp_tools.router.finance_router import REGISTRY as FINANCE_REGISTRY
+from app.erp_tools.router.hrm_router import REGISTRY as HRM_REGISTRY
+from app.erp_tools.router.sale_crm_router import REGISTRY as SALE_CRM_REGISTRY
+from app.erp_tools.router.supply_chain_router import REGISTRY as SUPPLY_CHAIN_REGISTRY
+from app.rag.retriever import QUERY_INSTRUCTION, get_query_embedding
+
+# =====================================================
+# ROUTER NGỮ NGHĨA (tầng 2, sau keyword)
+# Câu hỏi không khớp keyword nào ("kho còn mấy cái ip15?") -> so embedding
+# câu hỏi với ma trận câu mẫu của mọi intent ở 4 module bằng 1 phép nhân
+# ma trận. Embedding câu hỏi lấy qua cache của retriever nên nếu sau đó
+# vẫn rơi về RAG thì RAG không phải nhúng lại.
+# Ma trận câu mẫu: dựng 1 lần (lúc khởi động) rồi lưu ra đĩa.
+# =====================================================
+
+REGISTRIES = {
+    "finance": FINANCE_REGISTRY,
+    "hrm": HRM_REGISTRY,
+    "sale_crm": SALE_CRM_REGISTRY,
+    "supply_chain": SUPPLY_CHAIN_REGISTRY,
+}
+
+# domain -> tên intent -> câu mẫu (diễn đạt khác keyword của router)
+# Intent ghi dữ liệu (create_review) không có ở đây: chỉ chạy khi khớp keyword
+PROTOTYPES: dict[str, dict[str, list[str]]] = {
+    "finance": {
+        "ar_invoice_detail": ["Xem các dòng hàng trong hoá đơn xuất cho khách AR-001"],
+        "ar_invoice_status": ["Hoá đơn xuất cho khách AR-001 đã thu tiền chưa?"],
+        "customer_receivable": ["Khách hàng 5 đang nợ mình bao nhiêu?",
+                                "Khách 3 còn thiếu tiền chưa trả không?"],
+        "ap_invoice_detail": ["Xem các dòng hàng trong hoá đơn nhà cung cấp gửi AP-001"],
+        "ap_invoice_status": ["Hoá đơn đầu vào AP-001 đã trả tiền chưa?"],
+        "supplier_payable": ["Mình còn nợ nhà cung cấp 2 bao nhiêu tiền?",
+                             "Tổng tiền chưa trả cho đối tác 4"],
+        "cash_transaction": ["Xem phiếu thu tiền của đơn hàng 12"],
+        "cash_flow_history": ["Dòng tiền vào ra gần đây", "Lịch sử nộp và rút tiền quỹ"],
+        "journal_entry_detail": ["Định khoản của đơn hàng 12 gồm những dòng nào?"],
+        "journal_entries": ["Các chứng từ kế toán ghi sổ gần đây"],
+        "account_balance": ["Tài khoản 111 còn bao nhiêu tiền?", "Số dư TK 131 hiện giờ"],
+        "current_fiscal_period": ["Đang ở kỳ khoá sổ nào?"],
+        "fiscal_periods": ["Danh sách các kỳ khoá sổ trong năm"],
+        "posting_rule": ["Nghiệp vụ event SALE_INVOICE ghi nợ có tài khoản nào?"],
+    },
+    "hrm": {
+        "employee_profile": ["Cho tôi xem lý lịch của tôi", "Thông tin cá nhân của tôi trên hệ thống"],
+        "employee_department": ["Tôi làm ở bộ phận nào?", "Tôi thuộc phòng ban gì?"],
+        "employee_position": ["Chức danh hiện tại của tôi là gì?"],
+        "today_attendance": ["Sáng nay tôi đã quẹt thẻ vào làm chưa?", "Hôm nay tôi điểm danh chưa?"],
+        "attendance_history": ["Các ngày tôi đi làm gần đây", "Bảng công những ngày trước của tôi"],
+        "late_ot_summary": ["Tháng 3 tôi đến trễ mấy lần, làm thêm giờ bao nhiêu?"],
+        "work_shift": ["Tôi làm giờ hành chính hay ca đêm?", "Lịch trực của tôi thế nào?"],
+        "labor_contract": ["Giao kèo lao động của tôi còn hạn đến khi nào?"],
+        "salary_history": ["Mức thu nhập của tôi đã thay đổi thế nào qua các năm?"],
+        "payslip_detail": ["Tháng 3 tôi được cộng trừ những khoản gì trong bảng thu nhập?"],
+        "payslip": ["Tháng 3 tôi nhận được bao nhiêu tiền?", "Thu nhập tháng 5 của tôi"],
+    },
+    "sale_crm": {
+        "order_detail": ["Đơn hàng 12 gồm những món gì?"],
+        "order_status": ["Đơn 12 của tôi giao tới đâu rồi?", "Đơn hàng 12 đã ship chưa?"],
+        "purchase_history": ["Trước giờ tôi đặt những món gì?", "Các lần mua sắm trước của tôi"],
+        "payment_status": ["Đơn 12 tôi trả tiền xong chưa?"],
+        "voucher_check": ["Code giảm giá SALE10 còn dùng được không?"],
+        "customer_profile": ["Xem tài khoản khách hàng của tôi"],
+        "product_overview": ["Sản phẩm 3 có những phiên bản nào, khách nhận xét ra sao?"],
+        "products_by_brand": ["Thương hiệu 1 có những mặt hàng nào?"],
+    },
+    "supply_chain": {
+        "get_low_stock_products": ["Mặt hàng nào sắp cạn, cần đặt thêm?", "Những món gần hết trong kho"],
+        "get_overstock_products": ["Mặt hàng nào đang để kho quá nhiều?"],
+        "get_dead_stock_products": ["Hàng nào nằm kho lâu không bán được?"],
+        "get_inventory_transaction_logs": ["Sản phẩm 3 đã nhập xuất những lần nào?"],
+        "get_inventory_stock_by_sku": ["Mã IPHONE-15 còn mấy cái?"],
+        "get_stock_by_warehouse": ["Kho Hà Nội đang chứa những gì?", "Ở kho Hồ Chí Minh còn bao nhiêu máy?"],
+        "get_stock_by_bin": ["Ngăn kệ 2 đang để hàng gì?"],
+        "get_all_stock_summary": ["Toàn bộ hàng trong các kho hiện có bao nhiêu?"],
+        "get_inventory_stock": ["iPhone 15 còn hàng không?", "Còn bao nhiêu cái Dell XPS?"],
+        "get_goods_receipt_status": ["Phiếu nhận hàng GR-001 xử lý xong chưa?"],
+        "get_goods_receipt_detail": ["Phiếu nhận hàng GR-001 gồm những món gì?"],
+        "get_goods_receipts_by_po": ["Đơn mua 2 đã nhận về những đợt hàng nào?"],
+        "get_goods_receipts_by_supplier": ["Nhà cung cấp 2 đã giao những lô hàng nào?"],
+        "get_recent_goods_receipts": ["Các lô hàng mới về gần đây"],
+        "get_goods_issue_status": ["Phiếu giao hàng GI-001 đã đi chưa?"],
+        "get_goods_issue_detail": ["Phiếu giao hàng GI-001 gồm những món gì?"],
+        "get_goods_issues_by_reference": ["Đơn SO-001 đã xuất những phiếu nào?"],
+        "get_purchase_order_status": ["Đơn đặt hàng nhà cung cấp PO-001 tới đâu rồi?",
+                                      "PO-001 đã được duyệt chưa?"],
+        "get_po_receiving_progress": ["Đơn mua 2 đã nhận được bao nhiêu phần trăm hàng?"],
+        "get_purchase_request_status": ["Đề xuất mua PR-001 được duyệt chưa?"],
+        "get_open_purchase_requests": ["Các đề xuất mua đang chờ xử lý"],
+        "get_supplier_profile": ["Thông tin liên hệ của đối tác cung ứng SUP-001"],
+        "rank_suppliers_by_performance": ["Bên cung ứng nào giao hàng đúng hẹn nhất?"],
+        "get_stocktake_status": ["Đợt đếm hàng ST-001 xong chưa?"],
+        "get_stock_variance_report": ["Đợt đếm hàng 2 lệch bao nhiêu so với sổ sách?"],
+        "get_stocktake_detail": ["Kết quả đợt đếm hàng 2"],
+    },
+}
+
+
+@dataclass(frozen=True)
+class SemanticRoute:
+    domain: str
+    intent: str
+    score: float
+
+
+def _validate_prototypes():
+    for domain, intents in PROTOTYPES.items():
+        known = {i.name for i in REGISTRIES[domain].intents if i.tool is not None}
+        unknown = set(intents) - known
+        if unknown:
+            raise ValueError(f"Câu mẫu cho intent không có tool ({domain}): {sorted(unknown)}")
+
+
+_validate_prototypes()
+
+
+class SemanticRouter:
+    """
+    Ma trận câu mẫu (n_câu x dim, đã chuẩn hoá) + vị trí câu đầu tiên của
+    từng intent. route(): 1 phép nhân ma trận - vector, lấy điểm cao nhất
+    của mỗi intent (np.maximum.reduceat), chọn intent cao nhất.
+    """
+
+    def __init__(self, labels: list[tuple[str, str]], offsets: np.ndarray, matrix: np.ndarray):
+        self.labels = labels
+        self.offsets = offsets
+        self.matrix = matrix
+
+    def scores(self, embedding) -> np.ndarray:
+        query = np.asarray(embedding, dtype=self.matrix.dtype)
+        return np.maximum.reduceat(self.matrix @ query, self.offsets)
+
+    def route(self, embedding, min_score: Optional[float] = None) -> Optional[SemanticRoute]:
+        """
+        None = không intent nào đủ giống (điểm < SEMANTIC_ROUTER_MIN_SCORE).
+        """
+        if min_score is None:
+            min_score = settings.SEMANTIC_ROUTER_MIN_SCORE
+
+        scores = self.scores(embedding)
+        best = int(np.argmax(scores))
+        if scores[best] < min_score:
+            return None
+
+        domain, intent = self.labels[best]
+        return SemanticRoute(domain, intent, float(scores[best]))
+
+
+def _prototype_rows() -> tuple[list[tuple[str, str]], list[int], list[str]]:
+    labels, offsets, texts = [], [], []
+    for domain, intents in PROTOTYPES.items():
+        for intent, examples in intents.items():
+            labels.append((domain, intent))
+            offsets.append(len(texts))
+            texts.extend(examples)
+    return labels, offsets, texts
+
+
+def _fingerprint(texts: list[str], labels: list[tuple[str, str]]) -> str:
+    # Đổi model / backend / instruction / câu mẫu -> dựng lại ma trận
+    payload = json.dumps(
+        [f"{MODEL_NAME}:{settings.EMBEDDING_BACKEND}", QUERY_INSTRUCTION, labels, texts],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _default_cache_path() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    return os.path.join(project_root, "cache", "intent_prototypes.npz")
+
+
+def _load_matrix(path: str, fingerprint: str, rows: int) -> Optional[np.ndarray]:
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["fingerprint"]) != fingerprint or data["matrix"].shape[0] != rows:
+                return None
+            return data["matrix"]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _save_matrix(path: str, fingerprint: str, matrix: np.ndarray):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Ghi ra file tạm rồi đổi tên: worker khác không đọc phải file ghi dở
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, matrix=matrix, fingerprint=np.array(fingerprint))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ Không lưu được ma trận câu mẫu intent: {e}")
+
+
+def build_semantic_router() -> SemanticRouter:
+    """
+    Đọc ma trận câu mẫu từ đĩa; chưa có / đã lỗi thời -> nhúng lại rồi lưu.
+    Câu mẫu được nhúng cùng QUERY_INSTRUCTION như câu hỏi thật.
+    """
+    labels, offsets, texts = _prototype_rows()
+    fingerprint = _fingerprint(texts, labels)
+    path = settings.SEMANTIC_ROUTER_CACHE_PATH or _default_cache_path()
+
+    matrix = _load_matrix(path, fingerprint, len(texts))
+    if matrix is None:
+        print(f"🧭 Đang nhúng {len(texts)} câu mẫu cho {len(labels)} intent...")
+        embeddings = encode_dense(get_embedding_model(), [QUERY_INSTRUCTION + t for t in texts])
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        _save_matrix(path, fingerprint, matrix)
+
+    return SemanticRouter(labels, np.asarray(offsets, dtype=np.intp), matrix)
+
+
+_lock = threading.Lock()
+_router: Optional[SemanticRouter] = None
+
+
+def get_semantic_router() -> SemanticRouter:
+    global _router
+    if _router is None:
+        with _lock:
+            if _router is None:
+                _router = build_semantic_router()
+    return _router
+
+
+def semantic_route(question: str) -> Optional[SemanticRoute]:
+    """
+    Blocking (nhúng câu hỏi nếu cache chưa có) -> chạy trên pool "retrieval".
+    """
+    return get_semantic_router().route(get_query_embedding(question))
@@ -1,137 +1,265 @@
 # app/erp_tools/modules/supply_chain/router/supply_chain.py
 
 import re
+from functools import partial
 from typing import Dict
 
+from app.core.executors import run_parallel
+from app.erp_tools.router.intent_registry import Entities, Intent, IntentRegistry
+from app.erp_tools.modules.supply_chain import tools
+from app.erp_tools.modules.supply_chain.name_index import get_name_indexes
 
-def supply_chain_router(message: str) -> Dict:
-    text = message.lower()
-
-    # --------------------------------------------------
+# --------------------------------------------------
+# BẢNG KEYWORD: nhóm -> các keyword
+# (một keyword có thể thuộc nhiều nhóm)
+# --------------------------------------------------
+KEYWORD_GROUPS: Dict[str, list[str]] = {
     # A. INVENTORY – TỒN KHO
-    # --------------------------------------------------
-    if any(k in text for k in [
-        "tồn kho", "còn hàng", "hết hàng", "số lượng", "tồn"
-    ]):
-        if any(k in text for k in ["sku", "mã"]):
-            return _result("inventory", "get_inventory_stock_by_sku", 0.95)
-        if any(k in text for k in ["kho", "warehouse"]):
-            return _result("inventory", "get_stock_by_warehouse", 0.95)
-        if any(k in text for k in ["kệ", "bin", "vị trí"]):
-            return _result("inventory", "get_stock_by_bin", 0.95)
-        if any(k in text for k in ["tổng", "toàn hệ thống"]):
-            return _result("inventory", "get_all_stock_summary", 0.95)
-        return _result("inventory", "get_inventory_stock", 0.90)
-    
-    if "kho" in text and any(k in text for k in ["bao nhiêu", "còn"]):
-        return {
-            "domain": "inventory",
-            "intent": "get_stock_by_warehouse",
-            "confidence": 0.8
-        }
+    "inventory": ["tồn kho", "còn hàng", "hết hàng", "số lượng", "tồn"],
+    "sku": ["sku", "mã"],
+    "warehouse": ["kho", "warehouse"],
+    "bin": ["kệ", "bin", "vị trí"],
+    "summary": ["tổng", "toàn hệ thống"],
+    "how_much": ["bao nhiêu", "còn"],
 
-    # --------------------------------------------------
     # B. INVENTORY ANALYTICS
-    # --------------------------------------------------
-    if any(k in text for k in [
-        "sắp hết", "cảnh báo", "thiếu hàng"
-    ]):
-        return _result("inventory", "get_low_stock_products", 0.95)
-
-    if any(k in text for k in [
-        "tồn nhiều", "dư thừa", "overstock"
-    ]):
-        return _result("inventory", "get_overstock_products", 0.95)
+    "low_stock": ["sắp hết", "cảnh báo", "thiếu hàng"],
+    "overstock": ["tồn nhiều", "dư thừa", "overstock"],
+    "dead_stock": ["không bán", "lâu không xuất", "dead stock"],
 
-    if any(k in text for k in [
-        "không bán", "lâu không xuất", "dead stock"
-    ]):
-        return _result("inventory", "get_dead_stock_products", 0.95)
-
-    # --------------------------------------------------
     # C. GOODS RECEIPT – NHẬP KHO
-    # --------------------------------------------------
-    if any(k in text for k in [
-        "nhập kho", "phiếu nhập", "gr"
-    ]):
-        if any(k in text for k in ["trạng thái", "xong chưa"]):
-            return _result("inbound", "get_goods_receipt_status", 0.95)
-        if any(k in text for k in ["chi tiết", "gồm", "sản phẩm"]):
-            return _result("inbound", "get_goods_receipt_detail", 0.95)
-        if any(k in text for k in ["po", "đơn mua"]):
-            return _result("inbound", "get_goods_receipts_by_po", 0.95)
-        if any(k in text for k in ["nhà cung cấp", "ncc"]):
-            return _result("inbound", "get_goods_receipts_by_supplier", 0.95)
-        return _result("inbound", "get_recent_goods_receipts", 0.90)
+    "goods_receipt": ["nhập kho", "phiếu nhập", "gr"],
+    "gr_status": ["trạng thái", "xong chưa"],
+    "gr_detail": ["chi tiết", "gồm", "sản phẩm"],
+    "gr_by_po": ["po", "đơn mua"],
+    "gr_by_supplier": ["nhà cung cấp", "ncc"],
 
-    # --------------------------------------------------
     # D. GOODS ISSUE – XUẤT KHO
-    # --------------------------------------------------
-    if any(k in text for k in [
-        "xuất kho", "phiếu xuất", "gi"
-    ]):
-        if any(k in text for k in ["trạng thái"]):
-            return _result("outbound", "get_goods_issue_status", 0.95)
-        if any(k in text for k in ["chi tiết", "sản phẩm"]):
-            return _result("outbound", "get_goods_issue_detail", 0.95)
-        if any(k in text for k in ["bán", "nội bộ", "chuyển"]):
-            return _result("outbound", "get_goods_issues_by_type", 0.90)
-        if any(k in text for k in ["đơn", "so", "hr"]):
-            return _result("outbound", "get_goods_issues_by_reference", 0.90)
+    "goods_issue": ["xuất kho", "phiếu xuất", "gi"],
+    "gi_detail": ["chi tiết", "sản phẩm"],
+    "gi_by_type": ["bán", "nội bộ", "chuyển"],
+    "gi_by_reference": ["đơn", "so", "hr"],
 
-    # --------------------------------------------------
     # E. PROCUREMENT – MUA HÀNG
-    # --------------------------------------------------
-    if any(k in text for k in [
-        "đơn mua", "po", "mua hàng"
-    ]):
-        if any(k in text for k in ["trạng thái"]):
-            return _result("procurement", "get_purchase_order_status", 0.95)
-        if any(k in text for k in ["chi tiết"]):
-            return _result("procurement", "get_purchase_order_detail", 0.95)
-        if any(k in text for k in ["chưa xong", "đang mở"]):
-            return _result("procurement", "get_open_purchase_orders", 0.95)
-        if any(k in text for k in ["đã nhập bao nhiêu", "tiến độ"]):
-            return _result("procurement", "get_po_receiving_progress", 0.95)
-
-    if any(k in text for k in [
-        "yêu cầu mua", "pr"
-    ]):
-        if any(k in text for k in ["trạng thái"]):
-            return _result("procurement", "get_purchase_request_status", 0.95)
-        return _result("procurement", "get_open_purchase_requests", 0.90)
+    "purchase_order": ["đơn mua", "po", "mua hàng"],
+    "po_open": ["chưa xong", "đang mở"],
+    "po_progress": ["đã nhập bao nhiêu", "tiến độ"],
+    "purchase_request": ["yêu cầu mua", "pr"],
 
-    # --------------------------------------------------
     # F. SUPPLIER – NHÀ CUNG CẤP
-    # --------------------------------------------------
-    if any(k in text for k in [
-        "nhà cung cấp", "ncc", "supplier"
-    ]):
-        if any(k in text for k in ["thông tin", "profile"]):
-            return _result("supplier", "get_supplier_profile", 0.95)
-        if any(k in text for k in ["xếp hạng", "tốt nhất"]):
-            return _result("supplier", "rank_suppliers_by_performance", 0.95)
-        return _result("supplier", "get_supplier_purchase_history", 0.90)
+    "supplier": ["nhà cung cấp", "ncc", "supplier"],
+    "supplier_profile": ["thông tin", "profile"],
+    "supplier_rank": ["xếp hạng", "tốt nhất"],
 
-    # --------------------------------------------------
     # G. AUDIT / LOG
-    # --------------------------------------------------
-    if any(k in text for k in [
-        "log", "lịch sử", "biến động"
-    ]):
-        return _result("audit", "get_inventory_transaction_logs", 0.95)
+    "audit": ["log", "lịch sử", "biến động"],
 
-    # --------------------------------------------------
     # H. STOCKTAKE – KIỂM KÊ
-    # --------------------------------------------------
-    if any(k in text for k in [
-        "kiểm kê", "stocktake"
-    ]):
-        if any(k in text for k in ["trạng thái"]):
-            return _result("stocktake", "get_stocktake_status", 0.95)
-        if any(k in text for k in ["chênh lệch"]):
-            return _result("stocktake", "get_stock_variance_report", 0.95)
-        return _result("stocktake", "get_stocktake_detail", 0.90)
+    "stocktake": ["kiểm kê", "stocktake"],
+    "variance": ["chênh lệch"],
+
+    # Dùng chung
+    "status": ["trạng thái"],
+    "detail": ["chi tiết"],
+}
+
+# --------------------------------------------------
+# ENTITY DẪN XUẤT (chỉ tính khi intent cần)
+# --------------------------------------------------
+# "kho ha noi" -> "ha noi" (câu đã bỏ dấu); "tồn kho" / "nhập kho" / "xuất kho" không phải tên kho
+_WAREHOUSE_PATTERN = re.compile(r"(?<!ton )(?<!nhap )(?<!xuat )\bkho\s+([a-z\s]+)")
+
+_PRODUCT_KEYWORD_PATTERN = re.compile(
+    r"(iphone\s*\d+|dell\s*xps\s*\d*|[A-Z0-9\-]{4,})",
+    re.IGNORECASE
+)
+
+_PRODUCT_NAME_PATTERN = re.compile(r"(iphone\s*\d+|dell\s*xps\s*\d*)", re.IGNORECASE)
+
+
+def extract_warehouse_name(entities: Entities) -> str | None:
+    # Ưu tiên kho có tên / viết tắt nằm trong câu ("kho hà nội", "ha noi", "hn")
+    warehouses = get_name_indexes().warehouses
+    matched = warehouses.find_in_text(entities.folded)
+    if matched:
+        return warehouses.display[matched[0]]
+
+    # Fallback: lấy sau chữ "kho"
+    match = _WAREHOUSE_PATTERN.search(entities.folded)
+    if match:
+        return match.group(1).strip().title()
+
+    return None
+
+
+def extract_product_keyword(entities: Entities) -> str | None:
+    """
+    Ưu tiên keyword người dùng nói:
+    - iPhone 15
+    - Dell XPS
+    - SKU
+    """
+    if not entities.accented:
+        # Câu gõ không dấu: "nhieu", "hang"... cũng là từ >= 4 chữ cái
+        # -> ngoài tên sản phẩm chỉ nhận mã viết HOA / có chữ số
+        match = _PRODUCT_NAME_PATTERN.search(entities.text)
+        return match.group(1) if match else entities["token"]
+
+    match = _PRODUCT_KEYWORD_PATTERN.search(entities.text)
+    return match.group(1) if match else None
+
+
+EXTRACTORS = {
+    "warehouse": extract_warehouse_name,
+    "product_keyword": extract_product_keyword,
+    # PO-001 -> 1; "po 12" -> 12
+    "po_id": lambda e: e["number"],
+    "stocktake_id": lambda e: e["number"],
+}
+
+
+# --------------------------------------------------
+# TOOL GHÉP (1 intent -> nhiều tool độc lập, chạy song song)
+# --------------------------------------------------
+def get_po_receiving_overview(po_id: int):
+    return run_parallel({
+        "receiving_progress": partial(tools.get_po_receiving_progress, po_id),
+        "missing_items": partial(tools.get_received_vs_ordered_quantity, po_id),
+    })
+
+
+def get_inventory_overview(product_id: int | None = None, keyword: str | None = None):
+    # get_stock_alerts() tách thành từng truy vấn để chạy song song với truy vấn tồn kho
+    results = run_parallel({
+        "inventory": (
+            partial(tools.get_inventory_stock_by_keyword, keyword)
+            if keyword else partial(tools.get_inventory_stock, product_id)
+        ),
+        "low_stock": tools.get_low_stock_products,
+        "dead_stock": tools.get_dead_stock_products,
+    })
+    return {
+        "inventory": results["inventory"],
+        "alerts": {
+            "low_stock": results["low_stock"],
+            "dead_stock": results["dead_stock"],
+        }
+    }
+
+
+def get_warehouse_stock(warehouse: str, product: str | None = None):
+    if product:
+        return tools.get_stock_by_warehouse_and_product(warehouse, product)
+    return tools.get_stock_by_warehouse(warehouse)
+
+
+def get_purchase_order(po_code: str):
+    return {"purchase_order": tools.get_purchase_order_status(po_code)}
+
+
+def get_inventory_logs(product_id: int):
+    return {"inventory_logs": tools.get_inventory_transaction_logs(product_id)}
+
+
+# --------------------------------------------------
+# INTENT theo thứ tự ưu tiên: Intent cụ thể đứng trước intent chung
+# của cùng mảng; domain/confidence dùng cho kết quả phân loại.
+# tool=None: đã nhận diện được nhưng chưa có tool tương ứng.
+# --------------------------------------------------
+def _intent(groups, domain, name, confidence, tool=None, **kwargs) -> Intent:
+    return Intent(name, groups, tool, domain=domain, confidence=confidence, **kwargs)
+
+
+INTENTS: list[Intent] = [
+    # B. Analytics đứng trước A: "sắp hết hàng" / "tồn nhiều" chứa cả keyword tồn kho
+    _intent(("low_stock",), "inventory", "get_low_stock_products", 0.95, tools.get_low_stock_products),
+    _intent(("overstock",), "inventory", "get_overstock_products", 0.95, tools.get_overstock_products),
+    _intent(("dead_stock",), "inventory", "get_dead_stock_products", 0.95, tools.get_dead_stock_products),
+
+    # G. Audit cũng đứng trước A: "lịch sử biến động tồn kho" là hỏi nhật ký
+    _intent(("audit",), "audit", "get_inventory_transaction_logs", 0.95, get_inventory_logs,
+            params={"product_id": "product_id"}),
+
+    # A. Tồn kho
+    _intent(("inventory", "sku"), "inventory", "get_inventory_stock_by_sku", 0.95,
+            tools.get_inventory_stock_by_sku, params={"sku": "token"}),
+    _intent(("inventory", "warehouse"), "inventory", "get_stock_by_warehouse", 0.95,
+            get_warehouse_stock, params={"warehouse": "warehouse"},
+            optional={"product": "product_keyword"}),
+    _intent(("inventory", "bin"), "inventory", "get_stock_by_bin", 0.95,
+            tools.get_stock_by_bin, params={"bin_id": "bin_id"}),
+    _intent(("inventory", "summary"), "inventory", "get_all_stock_summary", 0.95,
+            tools.get_all_stock_summary),
+    _intent(("inventory",), "inventory", "get_inventory_stock", 0.90,
+            get_inventory_overview, params={"keyword": "product_keyword"}),
+    _intent(("inventory",), "inventory", "get_inventory_stock", 0.90,
+            get_inventory_overview, params={"product_id": "product_id"}),
+    _intent(("warehouse", "how_much"), "inventory", "get_stock_by_warehouse", 0.8,
+            get_warehouse_stock, params={"warehouse": "warehouse"},
+            optional={"product": "product_keyword"}),
+
+    # C. Nhập kho
+    _intent(("goods_receipt", "gr_status"), "inbound", "get_goods_receipt_status", 0.95,
+            tools.get_goods_receipt_status, params={"gr_code": "gr_code"}),
+    _intent(("goods_receipt", "gr_detail"), "inbound", "get_goods_receipt_detail", 0.95,
+            tools.get_goods_receipt_detail, params={"gr_code": "gr_code"}),
+    _intent(("goods_receipt", "gr_by_po"), "inbound", "get_goods_receipts_by_po", 0.95,
+            tools.get_goods_receipts_by_po, params={"po_id": "po_id"}),
+    _intent(("goods_receipt", "gr_by_supplier"), "inbound", "get_goods_receipts_by_supplier", 0.95,
+            tools.get_goods_receipts_by_supplier, params={"supplier_id": "partner_id"}),
+    _intent(("goods_receipt",), "inbound", "get_recent_goods_receipts", 0.90,
+            tools.get_recent_goods_receipts),
+
+    # D. Xuất kho
+    _intent(("goods_issue", "status"), "outbound", "get_goods_issue_status", 0.95,
+            tools.get_goods_issue_status, params={"gi_code": "gi_code"}),
+    _intent(("goods_issue", "gi_detail"), "outbound", "get_goods_issue_detail", 0.95,
+            tools.get_goods_issue_detail, params={"gi_code": "gi_code"}),
+    _intent(("goods_issue", "gi_by_type"), "outbound", "get_goods_issues_by_type", 0.90),
+    _intent(("goods_issue", "gi_by_reference"), "outbound", "get_goods_issues_by_reference", 0.90,
+            tools.get_goods_issues_by_reference, params={"ref": "code"}),
+
+    # E. Mua hàng
+    _intent(("purchase_order", "status"), "procurement", "get_purchase_order_status", 0.95,
+            get_purchase_order, params={"po_code": "po_code"}),
+    _intent(("purchase_order", "detail"), "procurement", "get_purchase_order_detail", 0.95),
+    _intent(("purchase_order", "po_open"), "procurement", "get_open_purchase_orders", 0.95),
+    _intent(("purchase_order", "po_progress"), "procurement", "get_po_receiving_progress", 0.95,
+            get_po_receiving_overview, params={"po_id": "po_id"}),
+    _intent(("purchase_request", "status"), "procurement", "get_purchase_request_status", 0.95,
+            tools.get_purchase_request_status, params={"pr_code": "pr_code"}),
+    _intent(("purchase_request",), "procurement", "get_open_purchase_requests", 0.90,
+            tools.get_open_purchase_requests),
+
+    # F. Nhà cung cấp
+    _intent(("supplier", "supplier_profile"), "supplier", "get_supplier_profile", 0.95,
+            tools.get_supplier_profile, params={"supplier_code": "code"}),
+    _intent(("supplier", "supplier_rank"), "supplier", "rank_suppliers_by_performance", 0.95,
+            tools.rank_suppliers_by_performance),
+    _intent(("supplier",), "supplier", "get_supplier_purchase_history", 0.90),
+
+    # H. Kiểm kê
+    _intent(("stocktake", "status"), "stocktake", "get_stocktake_status", 0.95,
+            tools.get_stocktake_status, params={"stocktake_code": "code"}),
+    _intent(("stocktake", "variance"), "stocktake", "get_stock_variance_report", 0.95,
+            tools.get_stock_variance_report, params={"stocktake_id": "stocktake_id"}),
+    _intent(("stocktake",), "stocktake", "get_stocktake_detail", 0.90,
+            tools.get_stocktake_detail, params={"stocktake_id": "stocktake_id"}),
+]
+
+# Biên dịch 1 lần lúc import
+REGISTRY = IntentRegistry(KEYWORD_GROUPS, INTENTS, EXTRACTORS)
+
+
+def supply_chain_router(message: str) -> Dict:
+    """
+    Phân loại câu hỏi (chỉ theo keyword): tìm tất cả nhóm keyword trong
+    1 lần duyệt, rồi lấy intent đầu tiên (theo ưu tiên) có đủ nhóm.
+    """
+    intent = REGISTRY.classify(message)
+
+    if intent is not None:
+        return _result(intent.domain, intent.name, intent.confidence)
 
     # --------------------------------------------------
     # DEFAULT
@@ -0,0 +1,185 @@
+# app/erp_tools/tool_cache.py
+
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from app.config import settings
+
+# =====================================================
+# CACHE KẾT QUẢ TOOL ERP (TTL + giới hạn số entry + invalidate theo tag)
+# Dành cho tool đọc dữ liệu ít thay đổi (tồn kho tổng hợp, kỳ kế toán...):
+# cùng tham số trong TTL -> trả kết quả cũ, không chạy lại SQL.
+# Đường ghi (VD: create_review) gọi invalidate(tag) để xoá entry liên quan.
+# Kết quả được lưu ở dạng chỉ đọc (tuple / FrozenDict) vì mọi lượt chat dùng chung.
+# =====================================================
+
+
+class FrozenDict(dict):
+    """
+    dict chỉ đọc: vẫn là dict (json, str() trong prompt như cũ) nhưng không sửa được.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Kết quả tool đã cache là chỉ đọc")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __ior__(self, other):
+        self._readonly()
+
+
+def freeze(value: Any) -> Any:
+    # Row của SQLAlchemy vốn bất biến; entity ORM -> dict theo cột (không giữ object gắn session)
+    if getattr(value, "_mapping", None) is not None:
+        return value
+    mapper = getattr(value, "__mapper__", None)
+    if mapper is not None:
+        return FrozenDict({attr.key: getattr(value, attr.key) for attr in mapper.column_attrs})
+    if isinstance(value, dict):
+        return FrozenDict({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class ToolCache:
+    def __init__(self, name: str, ttl: float, max_items: int, tags: tuple[str, ...]):
+        self.name = name
+        self.ttl = ttl
+        self.max_items = max_items
+        self.tags = tags
+
+        self._lock = threading.Lock()
+        # key -> (hết hạn lúc, kết quả)
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        # Tăng mỗi lần invalidate: kết quả đọc TRƯỚC khi ghi không được lưu lại
+        self.generation = 0
+        # Lần invalidate gần nhất: ngay sau khi ghi, replica có thể chưa kịp cập nhật
+        self._invalidated_at = float("-inf")
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Thời gian chạy trung bình khi miss -> ước lượng thời gian DB tiết kiệm được
+        self.miss_seconds = 0.0
+
+    def get(self, key: tuple) -> tuple[bool, Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: tuple, value: Any, seconds: float, generation: int):
+        with self._lock:
+            self.miss_seconds += seconds
+            if generation != self.generation:
+                return
+            # Đọc từ replica trong TOOL_CACHE_WRITE_GRACE_SECONDS sau khi ghi có thể
+            # còn là dữ liệu cũ -> trả cho lượt này nhưng không lưu (tránh giữ cả TTL)
+            if time.monotonic() - self._invalidated_at < settings.TOOL_CACHE_WRITE_GRACE_SECONDS:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+            self._invalidated_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            avg_miss_ms = self.miss_seconds / self.misses * 1000 if self.misses else 0.0
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "avg_miss_ms": avg_miss_ms,
+                "saved_ms": avg_miss_ms * self.hits,
+            }
+
+
+_CACHES: dict[str, ToolCache] = {}
+
+
+def cached_tool(ttl: float, max_items: int = 256, tags: tuple[str, ...] = ()):
+    """
+    Decorator cache kết quả tool theo tham số (đã điền giá trị mặc định,
+    nên f() và f(limit=6) dùng chung entry).
+
+        @cached_tool(ttl=60, tags=("supply_chain.stock",))
+        def get_all_stock_summary(): ...
+
+    Tắt toàn bộ bằng TOOL_CACHE_ENABLED=false.
+    """
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        # app.erp_tools.modules.supply_chain.tools.f -> "supply_chain.f"
+        module = fn.__module__.split(".")
+        name = f"{module[-2] if len(module) > 1 else module[0]}.{fn.__name__}"
+        cache = ToolCache(name, ttl, max_items, tags)
+        _CACHES[name] = cache
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not settings.TOOL_CACHE_ENABLED:
+                return fn(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments.items())
+
+            hit, value = cache.get(key)
+            if hit:
+                return value
+
+            generation = cache.generation
+            start = time.perf_counter()
+            value = freeze(fn(*args, **kwargs))
+            cache.put(key, value, time.perf_counter() - start, generation)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def invalidate(*tags: str):
+    """
+    Xoá cache của mọi tool gắn 1 trong các tag (gọi từ đường ghi dữ liệu).
+    """
+    for cache in _CACHES.values():
+        if any(tag in cache.tags for tag in tags):
+            cache.clear()
+
+
+def clear_all():
+    for cache in _CACHES.values():
+        cache.clear()
+
+
+def get_tool_cache_metrics() -> dict:
+    return {name: cache.stats() for name, cache in _CACHES.items()}
@@ -2,6 +2,13 @@
 
 from fastapi import FastAPI
 from app.routers import chat  # <<< 1. IMPORT ROUTER MỚI
+from app.core.vectorstore import check_vectorstore_health, shutdown_vectorstore
+from app.config import settings
+from app.core.executors import get_executor, shutdown_executors
+from app.db.engine_factory import dispose_engines, get_pool_metrics
+from app.erp_tools.router.semantic_router import get_semantic_router
+from app.erp_tools.tool_cache import get_tool_cache_metrics
+from app.rag.reranker import get_reranker_model
 
 app = FastAPI(title="ERP Chatbot AI")
 
@@ -12,6 +19,36 @@ app.include_router(chat.router, prefix="/api", tags=["Chat"])  # <<< 2. GẮN RO
 # (Trong tương lai, bạn sẽ thêm router 'auth' (đăng nhập) ở đây)
 
 
+@app.on_event("startup")
+def on_startup():
+    # Nạp / dựng ma trận câu mẫu intent ở nền, không chặn khởi động
+    if settings.SEMANTIC_ROUTER_ENABLED:
+        get_executor("retrieval").submit(get_semantic_router)
+    # Nạp cross-encoder trước request đầu tiên
+    if settings.RERANK_ENABLED:
+        get_executor("retrieval").submit(get_reranker_model)
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    shutdown_executors()
+    shutdown_vectorstore()
+    dispose_engines()
+
+
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the ERP Chatbot AI API"}
\ No newline at end of file
+    return {"message": "Welcome to the ERP Chatbot AI API"}
+
+
+@app.get("/health")
+def health_check():
+    return {"vectorstore": check_vectorstore_health()}
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "db_pools": get_pool_metrics(),
+        "tool_cache": get_tool_cache_metrics()
+    }
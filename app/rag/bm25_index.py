@@ -0,0 +1,221 @@
+# app/rag/bm25_index.py
+
+import os
+import re
+import json
+import math
+import time
+import shutil
+from collections import Counter
+
+import numpy as np
+
+from app.core.text_normalize import fold_text, normalize
+from app.core.vectorstore import CHROMA_DB_PATH, get_vector_collection
+from app.rag.index_loader import ReloadingIndex
+
+# Index BM25 lưu cạnh ChromaDB, postings dạng .npy để mở bằng memory-map
+BM25_INDEX_DIR = os.path.join(CHROMA_DB_PATH, "bm25")
+
+# Đổi cách tách token -> tăng số này; index dựng bằng tokenizer cũ không được dùng
+# (1: NFC + chữ thường; 2: dạng không dấu + mở rộng viết tắt của text_normalize)
+TOKENIZER_VERSION = 2
+
+# Giữ nguyên mã nghiệp vụ như PO-001, TK-1121, 33.1 thành 1 token
+_TOKEN_RE = re.compile(r"[^\W_]+(?:[-./][^\W_]+)*")
+_CODE_SPLIT_RE = re.compile(r"[-./]")
+
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Tách token cho BM25 trên dạng không dấu, chữ thường ("hóa đơn" và "hoa don"
+    là cùng term). Token dạng mã (PO-001) được giữ nguyên và tách thêm từng phần (po, 001).
+    """
+    return _split_terms(fold_text(text))
+
+
+def _split_terms(folded: str) -> list[str]:
+    tokens = _TOKEN_RE.findall(folded)
+    codes = [tok for tok in tokens if "-" in tok or "." in tok or "/" in tok]
+    for tok in codes:
+        tokens.extend(_CODE_SPLIT_RE.split(tok))
+    return tokens
+
+
+class BM25Index:
+    """
+    Index BM25 dạng CSR:
+    - vocab          : term -> (offset, df)
+    - postings_doc   : int32, chỉ số document của từng posting
+    - postings_tf    : float32, tần suất term trong document
+    - doc_len        : float32, độ dài từng document
+    - ids            : chunk_id tương ứng với chỉ số document
+    """
+
+    def __init__(self, ids, vocab, postings_doc, postings_tf, doc_len, tokenizer=TOKENIZER_VERSION):
+        self.ids = ids
+        self.vocab = vocab
+        self.postings_doc = postings_doc
+        self.postings_tf = postings_tf
+        self.doc_len = doc_len
+        self.num_docs = len(ids)
+        self.avgdl = float(doc_len.mean()) if self.num_docs else 0.0
+        self.tokenizer = tokenizer
+
+    # =============================
+    # BUILD / SAVE / LOAD
+    # =============================
+    @classmethod
+    def build(cls, ids: list[str], documents: list[str]) -> "BM25Index":
+        term_ids: dict[str, int] = {}
+        p_term, p_doc, p_tf = [], [], []
+        doc_len = np.zeros(len(ids), dtype=np.float32)
+
+        for doc_idx, text in enumerate(documents):
+            counts = Counter(tokenize(text or ""))
+            doc_len[doc_idx] = sum(counts.values())
+            for term, tf in counts.items():
+                p_term.append(term_ids.setdefault(term, len(term_ids)))
+                p_doc.append(doc_idx)
+                p_tf.append(tf)
+
+        # Gom posting theo term (stable sort giữ thứ tự document tăng dần)
+        p_term = np.asarray(p_term, dtype=np.int32)
+        order = np.argsort(p_term, kind="stable")
+        postings_doc = np.asarray(p_doc, dtype=np.int32)[order]
+        postings_tf = np.asarray(p_tf, dtype=np.float32)[order]
+
+        df = np.bincount(p_term, minlength=len(term_ids))
+        offsets = np.concatenate(([0], np.cumsum(df)[:-1])) if len(df) else df
+        vocab = {
+            term: (int(offsets[tid]), int(df[tid]))
+            for term, tid in term_ids.items()
+        }
+
+        return cls(list(ids), vocab, postings_doc, postings_tf, doc_len)
+
+    def save(self, index_dir: str = BM25_INDEX_DIR):
+        """
+        Ghi ra thư mục tạm rồi đổi tên, để tiến trình đang đọc không thấy index dở dang.
+        """
+        tmp_dir = index_dir + ".tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        np.save(os.path.join(tmp_dir, "postings_doc.npy"), self.postings_doc)
+        np.save(os.path.join(tmp_dir, "postings_tf.npy"), self.postings_tf)
+        np.save(os.path.join(tmp_dir, "doc_len.npy"), self.doc_len)
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {"tokenizer": self.tokenizer, "ids": self.ids, "vocab": self.vocab},
+                f,
+                ensure_ascii=False
+            )
+
+        if os.path.isdir(index_dir):
+            old_dir = index_dir + ".old"
+            if os.path.isdir(old_dir):
+                shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(index_dir, old_dir)
+            os.replace(tmp_dir, index_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, index_dir)
+
+    @classmethod
+    def load(cls, index_dir: str = BM25_INDEX_DIR) -> "BM25Index":
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            ids=meta["ids"],
+            vocab={t: tuple(v) for t, v in meta["vocab"].items()},
+            postings_doc=np.load(os.path.join(index_dir, "postings_doc.npy"), mmap_mode="r"),
+            postings_tf=np.load(os.path.join(index_dir, "postings_tf.npy"), mmap_mode="r"),
+            doc_len=np.load(os.path.join(index_dir, "doc_len.npy")),
+            tokenizer=meta.get("tokenizer", 1),
+        )
+
+    # =============================
+    # SEARCH
+    # =============================
+    def search(self, query: str, top_k: int = 10) -> list[tuple[str, float]]:
+        """
+        Trả về [(chunk_id, score)] theo điểm BM25 giảm dần.
+        """
+        if not self.num_docs:
+            return []
+
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        matched = False
+
+        # Câu hỏi đã được router chuẩn hoá -> lấy lại từ cache của normalize()
+        for term in set(_split_terms(normalize(query).folded)):
+            entry = self.vocab.get(term)
+            if entry is None:
+                continue
+            offset, df = entry
+            docs = self.postings_doc[offset:offset + df]
+            tf = self.postings_tf[offset:offset + df]
+
+            idf = math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+            norm = K1 * (1 - B + B * self.doc_len[docs] / self.avgdl)
+            scores[docs] += idf * tf * (K1 + 1) / (tf + norm)
+            matched = True
+
+        if not matched:
+            return []
+
+        k = min(top_k, self.num_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+def build_bm25_index_from_collection(page_size: int = 5000) -> BM25Index:
+    """
+    Dựng lại index BM25 từ toàn bộ chunk trong ChromaDB và lưu xuống đĩa.
+    Gọi sau mỗi lần nạp dữ liệu.
+    """
+    t0 = time.perf_counter()
+    collection = get_vector_collection()
+
+    ids, documents = [], []
+    offset = 0
+    while True:
+        page = collection.get(include=["documents"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        offset += len(page["ids"])
+
+    index = BM25Index.build(ids, documents)
+    index.save()
+    _BM25_INDEX.clear()
+
+    print(
+        f"Đã dựng index BM25: {index.num_docs} chunks, {len(index.vocab)} terms "
+        f"trong {time.perf_counter() - t0:.2f}s"
+    )
+    return index
+
+
+def _load_bm25_index() -> BM25Index | None:
+    index = BM25Index.load()
+    if index.tokenizer != TOKENIZER_VERSION:
+        print("Index BM25 dựng bằng tokenizer cũ, cần dựng lại; tạm chỉ dùng dense retrieval.")
+        return None
+    return index
+
+
+# Load (mmap) 1 lần; ingestion ở process khác dựng lại index -> tự nạp bản mới
+_BM25_INDEX = ReloadingIndex(os.path.join(BM25_INDEX_DIR, "meta.json"), _load_bm25_index)
+
+
+def get_bm25_index() -> BM25Index | None:
+    """
+    None = chưa có index / index dựng bằng tokenizer cũ -> chỉ dùng dense retrieval.
+    """
+    return _BM25_INDEX.get()
@@ -0,0 +1,65 @@
+# app/rag/index_loader.py
+
+import os
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Chưa đọc lần nào / vừa clear(): khác mọi kết quả của _stat(), kể cả None
+_UNKNOWN = object()
+
+
+class ReloadingIndex(Generic[T]):
+    """
+    Giữ index (BM25, lexical weights) đã load trong process, tự nạp lại khi
+    meta.json trên đĩa đổi: ingestion chạy ở process khác (scripts/embed_runner.py)
+    ghi index mới bằng cách thay cả thư mục, nên server không cần restart.
+
+    Chỉ stat meta.json tối đa 1 lần / check_interval giây.
+    """
+
+    def __init__(self, meta_path: str, load: Callable[[], Optional[T]], check_interval: float = 1.0):
+        self.meta_path = meta_path
+        self._load = load
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._signature = _UNKNOWN
+        self._checked_at = float("-inf")
+
+    def _stat(self):
+        try:
+            st = os.stat(self.meta_path)
+        except FileNotFoundError:
+            return None
+        # Thư mục index bị thay nguyên khối -> inode đổi dù mtime trùng
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def get(self) -> Optional[T]:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._value
+
+        with self._lock:
+            if now - self._checked_at >= self.check_interval:
+                signature = self._stat()
+                if signature != self._signature:
+                    try:
+                        self._value = self._load() if signature is not None else None
+                        self._signature = signature
+                    except (OSError, ValueError) as e:
+                        # Đọc trúng lúc đang thay thư mục index -> giữ bản cũ, lần sau thử lại
+                        print(f"Chưa nạp lại được index {self.meta_path}: {e}")
+                self._checked_at = time.monotonic()
+            return self._value
+
+    def clear(self):
+        """
+        Lần get() sau đọc lại từ đĩa (gọi ngay sau khi dựng index trong cùng process).
+        """
+        with self._lock:
+            self._signature = _UNKNOWN
+            self._checked_at = float("-inf")
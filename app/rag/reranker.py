@@ -0,0 +1,135 @@
+# app/rag/reranker.py
+
+import time
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from sentence_transformers import CrossEncoder
+
+from app.config import settings
+from app.core.embedder import resolve_device
+from app.core.embedding_cache import normalize_question
+
+
+_model_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)  # Chỉ tải cross-encoder 1 lần
+def _load_reranker_model() -> CrossEncoder:
+    device = resolve_device(settings.EMBEDDING_DEVICE)
+    print(f"Đang tải mô hình rerank: {settings.RERANK_MODEL} (device={device})...")
+    model = CrossEncoder(settings.RERANK_MODEL, device=device, max_length=512)
+    print("Tải mô hình rerank thành công.")
+    return model
+
+
+def get_reranker_model() -> CrossEncoder:
+    # Khởi động nạp sẵn ở nền (main.py) có thể trùng request đầu tiên -> chỉ tải 1 lần
+    with _model_lock:
+        return _load_reranker_model()
+
+
+class Reranker:
+    """
+    Rerank candidate bằng cross-encoder, gọi model 1 lần theo batch.
+
+    - Cache điểm theo (câu hỏi đã chuẩn hoá, chunk_id): chỉ chấm các cặp chưa có.
+    - Latency budget: ước lượng thời gian chấm dựa trên trung bình trượt ms/cặp;
+      nếu thời gian đã dùng + ước lượng vượt budget thì bỏ qua rerank.
+    """
+
+    def __init__(self, budget_ms: float, cache_items: int, batch_size: int = 32):
+        self.budget_ms = budget_ms
+        self.cache_items = cache_items
+        self.batch_size = batch_size
+
+        self._cache: "OrderedDict[tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Ước lượng ban đầu, được cập nhật sau mỗi lần chạy thật
+        self.ms_per_pair = 5.0
+
+        self.calls = 0
+        self.skipped = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def rerank(
+        self,
+        query: str,
+        ids: list[str],
+        documents: list[str],
+        started_at: float | None = None
+    ) -> list[tuple[int, float]] | None:
+        """
+        Trả về [(vị trí trong ids, điểm)] đã sắp xếp giảm dần,
+        hoặc None nếu bỏ qua vì vượt latency budget.
+        `started_at` (time.perf_counter) = thời điểm bắt đầu xử lý request.
+        """
+        if not ids:
+            return []
+
+        key_query = normalize_question(query)
+        scores: dict[int, float] = {}
+        pending: list[int] = []
+
+        with self._lock:
+            for i, doc_id in enumerate(ids):
+                cached = self._cache.get((key_query, doc_id))
+                if cached is None:
+                    pending.append(i)
+                else:
+                    self._cache.move_to_end((key_query, doc_id))
+                    scores[i] = cached
+            self.cache_hits += len(scores)
+            self.cache_misses += len(pending)
+
+        if pending:
+            elapsed_ms = (time.perf_counter() - started_at) * 1000 if started_at else 0.0
+            estimate_ms = self.ms_per_pair * len(pending)
+            if elapsed_ms + estimate_ms > self.budget_ms:
+                with self._lock:
+                    self.skipped += 1
+                    # Giảm dần ước lượng để không bị kẹt ở trạng thái "luôn bỏ qua"
+                    self.ms_per_pair *= 0.95
+                return None
+
+            # Tải model (lần đầu, vài giây) không tính vào ms/cặp
+            model = get_reranker_model()
+            t0 = time.perf_counter()
+            new_scores = model.predict(
+                [(query, documents[i]) for i in pending],
+                batch_size=self.batch_size
+            )
+            spent_ms = (time.perf_counter() - t0) * 1000
+
+            with self._lock:
+                # Trung bình trượt để ước lượng chi phí lần sau
+                self.ms_per_pair = 0.8 * self.ms_per_pair + 0.2 * (spent_ms / len(pending))
+                for i, score in zip(pending, new_scores):
+                    scores[i] = float(score)
+                    self._cache[(key_query, ids[i])] = float(score)
+                while len(self._cache) > self.cache_items:
+                    self._cache.popitem(last=False)
+
+        self.calls += 1
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+    def stats(self) -> dict:
+        total = self.cache_hits + self.cache_misses
+        return {
+            "calls": self.calls,
+            "skipped": self.skipped,
+            "cache_hit_rate": self.cache_hits / total if total else 0.0,
+            "ms_per_pair": self.ms_per_pair,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_reranker() -> Reranker:
+    return Reranker(
+        budget_ms=settings.RERANK_BUDGET_MS,
+        cache_items=settings.RERANK_CACHE_ITEMS,
+        batch_size=settings.RERANK_BATCH_SIZE
+    )
@@ -1,33 +1,230 @@
 # app/rag/retriever.py
 
+import threading
+import time
+from collections import OrderedDict
+
 from app.core.vectorstore import get_vector_collection
-from app.core.embedder import embed_texts  # Import hàm embed_texts
+from app.config import settings
+from app.core.embedder import supports_sparse
+from app.core.embedding_batcher import embed_query, embed_query_with_sparse  # Gom batch với các request đồng thời
+from app.core.embedding_cache import get_query_embedding_cache, normalize_question
+from app.rag.bm25_index import get_bm25_index
+from app.rag.sparse_index import LEXICAL_METADATA_KEY, get_lexical_index
+from app.rag.reranker import get_reranker
+
+# Model BAAI/bge-m3 yêu cầu thêm instruction này vào TRƯỚC câu hỏi khi tìm kiếm
+QUERY_INSTRUCTION = "Represent this sentence for searching relevant passages: "
+
+
+# Lexical weights của câu hỏi (backend 'flag_m3'), khoá = câu hỏi đã chuẩn hoá;
+# dense vector đi kèm nằm trong cache embedding chung
+_query_weights: "OrderedDict[str, dict[str, float]]" = OrderedDict()
+_query_weights_lock = threading.Lock()
+
+
+def _use_lexical() -> bool:
+    return settings.LEXICAL_RERANK and supports_sparse() and get_lexical_index() is not None
+
+
+def get_query_embedding(query: str) -> list[float]:
+    """
+    Lấy embedding của câu hỏi: ưu tiên cache, chỉ chạy model khi cache miss.
+    Có lexical rerank: cache miss thì chạy 1 lần forward lấy luôn lexical weights,
+    để router ngữ nghĩa + RAG của cùng câu hỏi chỉ tốn 1 lần forward.
+    """
+    if not settings.EMBED_CACHE_ENABLED:
+        return embed_query(QUERY_INSTRUCTION + query)
+
+    cache = get_query_embedding_cache()
+    if _use_lexical():
+        vec = cache.get(QUERY_INSTRUCTION, query)
+        return vec if vec is not None else get_query_embedding_with_sparse(query)[0]
+
+    return cache.get_or_compute(QUERY_INSTRUCTION, query, embed_query)
+
+
+def get_query_embedding_with_sparse(query: str) -> tuple[list[float], dict[str, float]]:
+    """
+    Dense vector + lexical weights của câu hỏi, qua cache: dense ghi vào cache
+    embedding chung, lexical weights giữ trong LRU RAM (EMBED_CACHE_MEMORY_ITEMS).
+    """
+    key = normalize_question(query)
+    with _query_weights_lock:
+        weights = _query_weights.get(key)
+        if weights is not None:
+            _query_weights.move_to_end(key)
+
+    cache = get_query_embedding_cache() if settings.EMBED_CACHE_ENABLED else None
+    if weights is not None and cache is not None:
+        vec = cache.get(QUERY_INSTRUCTION, query)
+        if vec is not None:
+            return vec, weights
+
+    vec, weights = embed_query_with_sparse(QUERY_INSTRUCTION + query)
+    if cache is not None:
+        cache.put(QUERY_INSTRUCTION, query, vec)
+        with _query_weights_lock:
+            _query_weights[key] = weights
+            while len(_query_weights) > settings.EMBED_CACHE_MEMORY_ITEMS:
+                _query_weights.popitem(last=False)
+    return vec, weights
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[tuple[str, float]]:
+    """
+    Gộp nhiều danh sách xếp hạng: score(d) = sum(1 / (k + rank_i(d))).
+    """
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+
+def _lexical_rerank(result: dict, lexical, query_weights: dict, n_results: int) -> dict:
+    """
+    Second-stage: điểm = cosine(dense) + w * lexical_score(BGE-M3).
+    Với vector đã normalize, khoảng cách L2^2 của Chroma d = 2 - 2*cos.
+    """
+    ids = result.get("ids", [[]])[0]
+    if not ids:
+        return result
+
+    dense_scores = [1.0 - d / 2.0 for d in result.get("distances", [[]])[0]]
+    lexical_scores = lexical.score(query_weights, ids)
+    weight = settings.LEXICAL_RERANK_WEIGHT
+
+    scored = sorted(
+        range(len(ids)),
+        key=lambda i: dense_scores[i] + weight * lexical_scores[i],
+        reverse=True
+    )[:n_results]
+
+    reranked = {
+        key: [[result[key][0][i] for i in scored]]
+        for key in ("ids", "documents", "metadatas", "distances")
+        if result.get(key)
+    }
+    reranked["scores"] = [[dense_scores[i] + weight * lexical_scores[i] for i in scored]]
+    return reranked
+
+
+def _dense_search(collection, query: str, n_results: int) -> dict:
+    lexical = get_lexical_index() if settings.LEXICAL_RERANK else None
+
+    if lexical is not None and supports_sparse():
+        # Dense + lexical weights trong cùng 1 lần forward, không tốn thêm model
+        query_embedding, query_weights = get_query_embedding_with_sparse(query)
+        n_candidates = max(n_results, settings.RETRIEVAL_CANDIDATES)
+
+        print(f"Đang truy vấn Chroma (dense + lexical) với câu hỏi: '{query}'")
+        result = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_candidates
+        )
+        return _lexical_rerank(result, lexical, query_weights, n_results)
+
+    # Nhúng câu hỏi đã có instruction (qua cache + micro-batcher)
+    query_embedding = get_query_embedding(query)
+
+    print(f"Đang truy vấn Chroma với câu hỏi: '{query}'")
+    return collection.query(
+        query_embeddings=[query_embedding],
+        n_results=n_results
+    )
+
+
+def _strip_lexical_metadata(result: dict) -> dict:
+    """
+    Lexical weights chỉ dùng nội bộ, không trả ra ngoài cùng metadata.
+    """
+    for metas in result.get("metadatas") or []:
+        for meta in metas or []:
+            if meta:
+                meta.pop(LEXICAL_METADATA_KEY, None)
+    return result
+
+
+def _hybrid_search(collection, query: str, n_results: int) -> dict:
+    n_candidates = max(n_results, settings.RETRIEVAL_CANDIDATES)
+
+    dense = _dense_search(collection, query, n_candidates)
+    dense_ids = dense.get("ids", [[]])[0]
+
+    bm25 = get_bm25_index()
+    sparse_ids = [doc_id for doc_id, _ in bm25.search(query, n_candidates)] if bm25 else []
+
+    # Không có index BM25 / không khớp term nào thì RRF giữ nguyên thứ tự dense
+    fused = reciprocal_rank_fusion([dense_ids, sparse_ids], k=settings.RRF_K)[:n_results]
+    fused_ids = [doc_id for doc_id, _ in fused]
+
+    # Lấy nội dung: ưu tiên từ kết quả dense, phần còn lại (chỉ BM25 tìm thấy) lấy từ Chroma
+    docs = dict(zip(dense_ids, dense.get("documents", [[]])[0]))
+    metas = dict(zip(dense_ids, dense.get("metadatas", [[]])[0]))
+    missing = [doc_id for doc_id in fused_ids if doc_id not in docs]
+    if missing:
+        extra = collection.get(ids=missing, include=["documents", "metadatas"])
+        docs.update(zip(extra["ids"], extra["documents"]))
+        metas.update(zip(extra["ids"], extra["metadatas"]))
+
+    fused = [(doc_id, score) for doc_id, score in fused if doc_id in docs]
+    return {
+        "ids": [[doc_id for doc_id, _ in fused]],
+        "documents": [[docs[doc_id] for doc_id, _ in fused]],
+        "metadatas": [[metas[doc_id] for doc_id, _ in fused]],
+        "scores": [[score for _, score in fused]],
+    }
+
+
+def _cross_encoder_rerank(query: str, result: dict, n_results: int, started_at: float) -> dict:
+    """
+    Chấm lại candidate bằng cross-encoder. Nếu vượt latency budget thì giữ thứ tự cũ.
+    """
+    ids = result.get("ids", [[]])[0]
+    docs = result.get("documents", [[]])[0]
+
+    ranked = get_reranker().rerank(query, ids, docs, started_at=started_at)
+    if ranked is None:
+        print("Bỏ qua rerank do vượt latency budget.")
+        return {
+            key: [vals[0][:n_results]]
+            for key, vals in result.items()
+            if key in ("ids", "documents", "metadatas", "distances", "scores") and vals
+        }
+
+    ranked = ranked[:n_results]
+    reranked = {
+        key: [[result[key][0][i] for i, _ in ranked]]
+        for key in ("ids", "documents", "metadatas", "distances")
+        if result.get(key)
+    }
+    reranked["scores"] = [[score for _, score in ranked]]
+    return reranked
+
 
 def query_vectorstore(query: str, n_results: int = 3) -> dict:
     """
     Nhận một câu hỏi (string), thêm instruction, nhúng nó, và truy vấn ChromaDB.
+    Ở chế độ 'hybrid', kết quả dense được gộp với BM25 bằng Reciprocal Rank Fusion
+    để bắt được các mã chính xác (PO-001, số tài khoản, số điều luật...).
+    Nếu bật RERANK_ENABLED: lấy RERANK_CANDIDATES candidate rồi chấm lại bằng cross-encoder.
     """
+    started_at = time.perf_counter()
     try:
         collection = get_vector_collection()
-        
-        # --- SỬA LỖI SEARCH SAI ---
-        # Model BAAI/bge-m3 yêu cầu thêm instruction này vào TRƯỚC
-        # câu hỏi khi tìm kiếm (query) để có kết quả chính xác.
-        instruction = "Represent this sentence for searching relevant passages: "
-        query_with_instruction = instruction + query
-        
-        # 1. Nhúng câu hỏi đã có instruction
-        # Hàm embed_texts mong đợi một danh sách, nên ta truyền [query_with_instruction]
-        query_embedding = embed_texts([query_with_instruction])[0] # Lấy vector đầu tiên
-        
-        # 2. Truy vấn ChromaDB
-        print(f"Đang truy vấn Chroma với câu hỏi: '{query_with_instruction}'")
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
-        )
-        
-        return results
+
+        n_fetch = max(n_results, settings.RERANK_CANDIDATES) if settings.RERANK_ENABLED else n_results
+
+        if settings.RETRIEVAL_MODE == "hybrid":
+            result = _hybrid_search(collection, query, n_fetch)
+        else:
+            result = _dense_search(collection, query, n_fetch)
+        result = _strip_lexical_metadata(result)
+
+        if settings.RERANK_ENABLED:
+            result = _cross_encoder_rerank(query, result, n_results, started_at)
+        return result
         
     except Exception as e:
         print(f"Lỗi khi truy vấn vector store: {e}")
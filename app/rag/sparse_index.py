@@ -0,0 +1,149 @@
+# app/rag/sparse_index.py
+
+import os
+import json
+import time
+import shutil
+
+import numpy as np
+
+from app.core.vectorstore import CHROMA_DB_PATH, get_vector_collection
+from app.rag.index_loader import ReloadingIndex
+
+# Inverted index cho lexical weights của BGE-M3, lưu cạnh ChromaDB
+LEXICAL_INDEX_DIR = os.path.join(CHROMA_DB_PATH, "lexical")
+
+# Tên field metadata trong Chroma chứa lexical weights (JSON) của chunk
+LEXICAL_METADATA_KEY = "lexical_weights"
+
+
+class LexicalWeightIndex:
+    """
+    Inverted index dạng CSR cho lexical weights (token_id -> trọng số):
+    - vocab          : token_id -> (offset, df)
+    - postings_doc   : int32, chỉ số document
+    - postings_weight: float16, trọng số của token trong document
+    - ids            : chunk_id tương ứng với chỉ số document
+
+    Điểm lexical của BGE-M3 = tổng q_w(t) * d_w(t) trên các token chung.
+    """
+
+    def __init__(self, ids, vocab, postings_doc, postings_weight):
+        self.ids = ids
+        self.vocab = vocab
+        self.postings_doc = postings_doc
+        self.postings_weight = postings_weight
+        self.num_docs = len(ids)
+        self.id_to_idx = {doc_id: i for i, doc_id in enumerate(ids)}
+
+    @classmethod
+    def build(cls, ids: list[str], weights: list[dict[str, float]]) -> "LexicalWeightIndex":
+        token_ids: dict[str, int] = {}
+        p_token, p_doc, p_weight = [], [], []
+
+        for doc_idx, doc_weights in enumerate(weights):
+            for token, w in doc_weights.items():
+                p_token.append(token_ids.setdefault(token, len(token_ids)))
+                p_doc.append(doc_idx)
+                p_weight.append(w)
+
+        p_token = np.asarray(p_token, dtype=np.int32)
+        order = np.argsort(p_token, kind="stable")
+        postings_doc = np.asarray(p_doc, dtype=np.int32)[order]
+        postings_weight = np.asarray(p_weight, dtype=np.float16)[order]
+
+        df = np.bincount(p_token, minlength=len(token_ids))
+        offsets = np.concatenate(([0], np.cumsum(df)[:-1])) if len(df) else df
+        vocab = {
+            token: (int(offsets[tid]), int(df[tid]))
+            for token, tid in token_ids.items()
+        }
+        return cls(list(ids), vocab, postings_doc, postings_weight)
+
+    def save(self, index_dir: str = LEXICAL_INDEX_DIR):
+        tmp_dir = index_dir + ".tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        np.save(os.path.join(tmp_dir, "postings_doc.npy"), self.postings_doc)
+        np.save(os.path.join(tmp_dir, "postings_weight.npy"), self.postings_weight)
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "vocab": self.vocab}, f)
+
+        old_dir = index_dir + ".old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.isdir(index_dir):
+            os.replace(index_dir, old_dir)
+        os.replace(tmp_dir, index_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, index_dir: str = LEXICAL_INDEX_DIR) -> "LexicalWeightIndex":
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            ids=meta["ids"],
+            vocab={t: tuple(v) for t, v in meta["vocab"].items()},
+            postings_doc=np.load(os.path.join(index_dir, "postings_doc.npy"), mmap_mode="r"),
+            postings_weight=np.load(os.path.join(index_dir, "postings_weight.npy"), mmap_mode="r"),
+        )
+
+    def score(self, query_weights: dict[str, float], doc_ids: list[str]) -> list[float]:
+        """
+        Điểm lexical cho một tập candidate (second-stage), theo đúng thứ tự doc_ids.
+        """
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for token, q_w in query_weights.items():
+            entry = self.vocab.get(token)
+            if entry is None:
+                continue
+            offset, df = entry
+            docs = self.postings_doc[offset:offset + df]
+            scores[docs] += q_w * self.postings_weight[offset:offset + df].astype(np.float32)
+
+        return [
+            float(scores[self.id_to_idx[doc_id]]) if doc_id in self.id_to_idx else 0.0
+            for doc_id in doc_ids
+        ]
+
+
+def build_lexical_index_from_collection(page_size: int = 5000) -> LexicalWeightIndex | None:
+    """
+    Dựng lại inverted index từ lexical weights đã lưu trong metadata của Chroma.
+    Bỏ qua nếu collection không có lexical weights (backend không phải 'flag_m3').
+    """
+    t0 = time.perf_counter()
+    collection = get_vector_collection()
+
+    ids, weights = [], []
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        for doc_id, meta in zip(page["ids"], page["metadatas"]):
+            raw = (meta or {}).get(LEXICAL_METADATA_KEY)
+            if raw:
+                ids.append(doc_id)
+                weights.append(json.loads(raw))
+        offset += len(page["ids"])
+
+    if not ids:
+        return None
+
+    index = LexicalWeightIndex.build(ids, weights)
+    index.save()
+    _LEXICAL_INDEX.clear()
+
+    print(
+        f"Đã dựng index lexical weights: {index.num_docs} chunks, {len(index.vocab)} tokens "
+        f"trong {time.perf_counter() - t0:.2f}s"
+    )
+    return index
+
+
+# Ingestion ở process khác dựng lại index -> tự nạp bản mới
+_LEXICAL_INDEX = ReloadingIndex(os.path.join(LEXICAL_INDEX_DIR, "meta.json"), LexicalWeightIndex.load)
+
+
+def get_lexical_index() -> LexicalWeightIndex | None:
+    return _LEXICAL_INDEX.get()
@@ -1,6 +1,7 @@
 # app/routers/chat.py
 
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from app.db.schemas.chat_schema import ChatRequest, ChatResponse
 from app.services import chat_service
 
@@ -8,13 +9,32 @@ from app.services import chat_service
 router = APIRouter()
 
 @router.post("/chat", response_model=ChatResponse)
-def handle_chat_endpoint(request: ChatRequest):
+async def handle_chat_endpoint(request: ChatRequest):
     """
     Endpoint chính để xử lý chat của người dùng.
+    Endpoint async: chờ LLM / DB không chiếm thread của worker.
     """
     # 1. Nhận ChatRequest (chứa câu hỏi)
     # 2. Gọi service để xử lý
-    response = chat_service.handle_chat_message(request)
+    response = await chat_service.handle_chat_message(request)
     
     # 3. Trả về ChatResponse
-    return response
\ No newline at end of file
+    return response
+
+@router.post("/chat/stream")
+async def handle_chat_stream_endpoint(request: ChatRequest):
+    """
+    Giống /chat nhưng stream câu trả lời bằng Server-Sent Events.
+    Frame đầu ("meta") chứa sources / action_data, sau đó là các frame "token",
+    kết thúc bằng "done" (câu trả lời đầy đủ, đã lưu lịch sử).
+    """
+    # Router / tools / retrieval chạy trước khi gửi header: lỗi -> HTTP 500 thường
+    stream = await chat_service.stream_chat_message(request)
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # tắt buffer của nginx để token tới ngay
+        }
+    )
@@ -0,0 +1,185 @@
+# app/services/answer_templates.py
+
+from datetime import date, datetime
+from typing import Any, Callable, Optional
+
+from app.config import settings
+
+# =====================================================
+# CÂU TRẢ LỜI THEO MẪU (KHÔNG GỌI LLM)
+# Kết quả ERP đơn giản và chắc chắn (trạng thái PO, tồn kho 1 sản phẩm,
+# phiếu lương, trạng thái hoá đơn, số dư tài khoản) -> điền thẳng vào câu
+# mẫu, trả lời trong vài ms. Mẫu trả None (kết quả nhiều phần / không đúng
+# dạng) -> vẫn gửi Gemini như cũ.
+# Bật / tắt theo từng intent: settings.TEMPLATED_ANSWER_INTENTS.
+# =====================================================
+
+PO_STATUS_LABELS = {
+    "DRAFT": "đang ở trạng thái nháp, chưa được duyệt",
+    "APPROVED": "đã được duyệt, chưa nhận hàng",
+    "PARTIAL_RECEIVED": "đã nhận một phần hàng",
+    "COMPLETED": "đã nhận đủ hàng",
+    "CANCELLED": "đã bị huỷ",
+}
+
+PAYMENT_STATUS_LABELS = {
+    "UNPAID": "chưa thanh toán",
+    "PARTIAL": "đã thanh toán một phần",
+    "PAID": "đã thanh toán đủ",
+}
+
+PAYSLIP_STATUS_LABELS = {
+    "DRAFT": "bản nháp, chưa chốt",
+    "FINAL": "đã chốt",
+}
+
+
+# =============================
+# ĐỊNH DẠNG
+# =============================
+def format_money(value: Any) -> str:
+    # 12500000 -> "12.500.000 đ"
+    return f"{float(value or 0):,.0f}".replace(",", ".") + " đ"
+
+
+def format_quantity(value: Any) -> str:
+    number = float(value or 0)
+    return f"{number:,.0f}".replace(",", ".") if number.is_integer() else f"{number:g}"
+
+
+def format_date(value: Any) -> Optional[str]:
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%d/%m/%Y")
+    return str(value) if value else None
+
+
+def _label(labels: dict[str, str], status: Any) -> str:
+    return labels.get(status, f"đang ở trạng thái {status}")
+
+
+# =============================
+# MẪU THEO INTENT
+# Nhận action_data (dict, xem as_action_data); None = để LLM trả lời
+# =============================
+def render_purchase_order_status(data: dict) -> Optional[str]:
+    po = data.get("purchase_order")
+    if not po:
+        return "Không tìm thấy đơn mua hàng này."
+    return f"Đơn mua hàng {po['po_code']} {_label(PO_STATUS_LABELS, po['status'])}."
+
+
+def render_stock_by_sku(data: dict) -> Optional[str]:
+    if "quantity" not in data:
+        return "Chưa có dữ liệu tồn kho cho mã SKU này."
+    return (
+        f"Sản phẩm {data['product_name']} (SKU {data['sku']}) "
+        f"hiện còn {format_quantity(data['quantity'])} trong kho."
+    )
+
+
+def render_inventory_stock(data: dict) -> Optional[str]:
+    inventory = data.get("inventory")
+    if isinstance(inventory, dict):
+        inventory = [inventory]
+    if not inventory:
+        return "Chưa có dữ liệu tồn kho cho sản phẩm này."
+    if len(inventory) > 1:
+        # Nhiều sản phẩm khớp từ khoá -> để LLM tổng hợp
+        return None
+
+    item = inventory[0]
+    name = item["product_name"]
+    answer = f"Sản phẩm {name} hiện còn {format_quantity(item['quantity'])} trong kho."
+
+    # Chỉ nói "sắp hết hàng" khi sản phẩm nằm trong low_stock (cùng quy ước với prompt)
+    alerts = data.get("alerts") or {}
+    low_stock = alerts.get("low_stock") or []
+    dead_stock = alerts.get("dead_stock") or []
+    if not isinstance(low_stock, list) or not isinstance(dead_stock, list):
+        # Tool cảnh báo lỗi / quá hạn ({"error": ...}) -> không khẳng định được, để LLM trả lời
+        return None
+
+    low = next((p for p in low_stock if p.get("product_name") == name), None)
+    if low is not None:
+        answer += (
+            f" Sản phẩm đang sắp hết hàng (dưới mức tồn tối thiểu "
+            f"{format_quantity(low['min_stock_level'])})."
+        )
+    if any(p.get("product_name") == name for p in dead_stock):
+        answer += " Sản phẩm nằm trong danh sách lâu không xuất kho."
+    return answer
+
+
+def render_payslip(data: dict) -> Optional[str]:
+    if "net_salary" not in data:
+        return None
+    return (
+        f"Phiếu lương tháng {data['month']}/{data['year']} của bạn: "
+        f"lương gộp {format_money(data['gross_salary'])}, "
+        f"thực nhận {format_money(data['net_salary'])} "
+        f"({_label(PAYSLIP_STATUS_LABELS, data['status'])})."
+    )
+
+
+def _render_invoice(data: dict, kind: str, paid_key: str, paid_label: str) -> Optional[str]:
+    if "payment_status" not in data:
+        return None
+    answer = (
+        f"Hoá đơn {kind} số {data['invoice_id']} "
+        f"{_label(PAYMENT_STATUS_LABELS, data['payment_status'])}: "
+        f"tổng {format_money(data['total_amount'])}, "
+        f"{paid_label} {format_money(data[paid_key])}."
+    )
+    due_date = format_date(data.get("due_date"))
+    if due_date and data["payment_status"] != "PAID":
+        answer += f" Hạn thanh toán: {due_date}."
+    return answer
+
+
+def render_ar_invoice_status(data: dict) -> Optional[str]:
+    return _render_invoice(data, "bán", "received_amount", "đã thu")
+
+
+def render_ap_invoice_status(data: dict) -> Optional[str]:
+    return _render_invoice(data, "mua", "paid_amount", "đã trả")
+
+
+def render_account_balance(data: dict) -> Optional[str]:
+    if "balance" not in data:
+        return None
+    return f"Số dư tài khoản {data['account_id']} hiện là {format_money(data['balance'])}."
+
+
+# Tên intent (trong registry của các router) -> mẫu
+ANSWER_TEMPLATES: dict[str, Callable[[dict], Optional[str]]] = {
+    "get_purchase_order_status": render_purchase_order_status,
+    "get_inventory_stock_by_sku": render_stock_by_sku,
+    "get_inventory_stock": render_inventory_stock,
+    "payslip": render_payslip,
+    "ar_invoice_status": render_ar_invoice_status,
+    "ap_invoice_status": render_ap_invoice_status,
+    "account_balance": render_account_balance,
+}
+
+
+def render_answer(intent: Optional[str], data: dict) -> Optional[str]:
+    """
+    Câu trả lời dựng sẵn cho kết quả của intent, hoặc None nếu cần LLM
+    (intent không có mẫu / đang tắt, hoặc kết quả phức tạp).
+    """
+    if intent not in settings.TEMPLATED_ANSWER_INTENTS:
+        return None
+
+    template = ANSWER_TEMPLATES.get(intent)
+    if template is None:
+        return None
+
+    # Tool báo không có dữ liệu ({"message": "Chưa có bảng lương tháng này"})
+    if set(data) == {"message"}:
+        return data["message"]
+
+    try:
+        return template(data)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        # Kết quả không đúng dạng mẫu mong đợi -> để LLM xử lý
+        return None
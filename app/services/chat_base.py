@@ -0,0 +1,124 @@
+# app/services/chat_base.py
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.llm import generate_text, generate_text_async, stream_text_async
+from app.db.schemas.chat_schema import ChatRequest, ChatResponse, ChatStreamMeta, RAGSource
+from app.services.chat_history import save_history, save_history_async
+
+
+@dataclass
+class PreparedChat:
+    """
+    Kết quả của bước chuẩn bị (router / tools / retrieval) trước khi gọi LLM:
+    prompt đã dựng sẵn + dữ liệu trả kèm câu trả lời.
+    answer: câu trả lời đã dựng theo mẫu (answer_templates) -> không gọi LLM.
+    """
+    response_type: str
+    prompt: str
+    model_name: str
+    temperature: float = 0.1
+    sources: list[RAGSource] = field(default_factory=list)
+    action_data: dict[str, Any] | None = None
+    answer: str | None = None
+
+    def meta(self) -> ChatStreamMeta:
+        return ChatStreamMeta(
+            response_type=self.response_type,
+            sources=self.sources,
+            action_data=self.action_data
+        )
+
+    def to_response(self, answer: str) -> ChatResponse:
+        return ChatResponse(
+            answer=answer,
+            response_type=self.response_type,
+            sources=self.sources,
+            action_data=self.action_data
+        )
+
+
+def _to_plain(value: Any) -> Any:
+    # Row của SQLAlchemy (tools supply chain trả về Row) -> dict
+    mapping = getattr(value, "_mapping", None)
+    if mapping is not None:
+        return {k: _to_plain(v) for k, v in mapping.items()}
+    # Entity ORM (db.query(GoodsReceipt)...) -> dict theo cột
+    mapper = getattr(value, "__mapper__", None)
+    if mapper is not None:
+        return {attr.key: _to_plain(getattr(value, attr.key)) for attr in mapper.column_attrs}
+    if isinstance(value, dict):
+        return {k: _to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(v) for v in value]
+    return value
+
+
+def as_action_data(erp_result: Any) -> dict[str, Any]:
+    """
+    Dữ liệu ERP (dict, list hoặc Row) -> action_data của ChatResponse.
+    """
+    plain = _to_plain(erp_result)
+    if isinstance(plain, dict):
+        return plain
+    return {"items": plain}
+
+
+def complete_chat(request: ChatRequest, prepared: PreparedChat) -> ChatResponse:
+    answer = prepared.answer
+    if answer is None:
+        answer = generate_text(prepared.prompt, prepared.model_name, prepared.temperature)
+    save_history(request.session_id, request.question, answer)
+    return prepared.to_response(answer)
+
+
+async def complete_chat_async(request: ChatRequest, prepared: PreparedChat) -> ChatResponse:
+    answer = prepared.answer
+    if answer is None:
+        answer = await generate_text_async(prepared.prompt, prepared.model_name, prepared.temperature)
+    await save_history_async(request.session_id, request.question, answer)
+    return prepared.to_response(answer)
+
+
+# =============================
+# SERVER-SENT EVENTS
+# =============================
+def sse_event(event: str, data: Any) -> str:
+    payload = json.dumps(jsonable_encoder(data), ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def stream_chat_async(request: ChatRequest, prepared: PreparedChat) -> AsyncIterator[str]:
+    """
+    Stream câu trả lời dạng SSE:
+    - "meta"  : response_type + sources (RAG) / action_data (ERP), gửi ngay
+    - "token" : từng đoạn text của LLM (câu trả lời theo mẫu: 1 token duy nhất)
+    - "done"  : câu trả lời đầy đủ (đã lưu vào bảng chats)
+    - "error" : lỗi khi gọi LLM / lưu lịch sử (header 200 đã gửi, không đổi được mã lỗi)
+    """
+    yield sse_event("meta", prepared.meta())
+
+    if prepared.answer is not None:
+        answer = prepared.answer
+        yield sse_event("token", {"text": answer})
+    else:
+        parts: list[str] = []
+        try:
+            async for text in stream_text_async(prepared.prompt, prepared.model_name, prepared.temperature):
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+        except Exception as e:
+            yield sse_event("error", {"message": str(e)})
+            return
+        answer = "".join(parts)
+
+    try:
+        await save_history_async(request.session_id, request.question, answer)
+    except Exception as e:
+        yield sse_event("error", {"message": str(e)})
+        return
+    yield sse_event("done", {"answer": answer})
@@ -1,19 +1,17 @@
 # app/services/chat_finance.py
-import google.generativeai as genai
-from sqlalchemy.orm import Session
-
 from app.config import settings
-from app.db.database import SessionLocal
+from app.core.executors import run_blocking
+from app.db.unit_of_work import run_in_unit_of_work
 from app.db.schemas.chat_schema import ChatRequest, ChatResponse
-from app.db.models.chat_model import Chat
+from app.services.answer_templates import render_answer
+from app.services.chat_base import PreparedChat, as_action_data, complete_chat, complete_chat_async
 
 from app.erp_tools.router.finance_router import finance_router
 
 # =============================
 # CONFIG LLM
 # =============================
-genai.configure(api_key=settings.GOOGLE_API_KEY)
-llm = genai.GenerativeModel("gemini-2.5-flash-lite")
+LLM_MODEL = settings.LLM_MODEL_FINANCE or settings.LLM_MODEL
 
 # =============================
 # FINANCE CONTROL PROMPT
@@ -44,60 +42,70 @@ YÊU CẦU TRẢ LỜI:
 - Không quá 3 câu
 """
 
-# =============================
-# SAVE CHAT HISTORY
-# =============================
-def save_history(db: Session, sid: str, q: str, a: str):
-    db.add(Chat(
-        session_id=sid,
-        question=q,
-        answer=a
-    ))
-    db.commit()
-
 # =============================
 # MAIN HANDLER
 # =============================
+def _prepare(request: ChatRequest, erp_result, intent: str | None = None) -> PreparedChat:
+    action_data = as_action_data(erp_result)
+    return PreparedChat(
+        response_type="ERP_FINANCE",
+        prompt=build_finance_prompt(
+            request.question,
+            erp_result
+        ),
+        model_name=LLM_MODEL,
+        temperature=0.1,
+        action_data=action_data,
+        answer=render_answer(intent, action_data)
+    )
+
+
+def _out_of_scope_response() -> ChatResponse:
+    return ChatResponse(
+        answer="❌ Câu hỏi không thuộc nghiệp vụ Tài chính – Kế toán.",
+        response_type="OUT_OF_SCOPE",
+        sources=[]
+    )
+
+
 def handle_chat_finance(request: ChatRequest) -> ChatResponse:
-    chat_db = SessionLocal()
-
-    try:
-        erp_result = finance_router(
-            query=request.question
-        )
-
-        if erp_result is not None:
-            prompt = build_finance_prompt(
-                request.question,
-                erp_result
-            )
-
-            answer = llm.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.1
-                )
-            ).text
-
-            save_history(
-                chat_db,
-                request.session_id,
-                request.question,
-                answer
-            )
-
-            return ChatResponse(
-                answer=answer,
-                response_type="ERP_FINANCE",
-                sources=[]
-            )
-
-        # 3️⃣ OUT OF SCOPE
-        return ChatResponse(
-            answer="❌ Câu hỏi không thuộc nghiệp vụ Tài chính – Kế toán.",
-            response_type="OUT_OF_SCOPE",
-            sources=[]
-        )
-
-    finally:
-        chat_db.close()
+    matched, erp_result = run_in_unit_of_work(
+        finance_router,
+        query=request.question
+    )
+
+    if erp_result is None:
+        return _out_of_scope_response()
+
+    return complete_chat(request, _prepare(request, erp_result, matched))
+
+
+async def prepare_chat_finance_async(
+    request: ChatRequest,
+    intent: str | None = None
+) -> PreparedChat | None:
+    """
+    Chạy router + tools (blocking, trên pool "db") trong 1 unit of work.
+    None = ngoài nghiệp vụ.
+    """
+    matched, erp_result = await run_blocking(
+        "db",
+        run_in_unit_of_work,
+        finance_router,
+        query=request.question,
+        intent=intent
+    )
+
+    if erp_result is None:
+        return None
+
+    return _prepare(request, erp_result, matched)
+
+
+async def handle_chat_finance_async(request: ChatRequest) -> ChatResponse:
+    prepared = await prepare_chat_finance_async(request)
+
+    if prepared is None:
+        return _out_of_scope_response()
+
+    return await complete_chat_async(request, prepared)
@@ -0,0 +1,45 @@
+# app/services/chat_history.py
+
+from app.core.executors import run_blocking
+from app.db.database import SessionLocal
+from app.db.models.chat_model import Chat
+
+
+def load_history(session_id: str, limit: int = 5) -> str:
+    """
+    Lấy `limit` lượt hỏi–đáp gần nhất của session (cũ -> mới), dạng text cho prompt.
+    """
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Chat)
+            .filter(Chat.session_id == session_id)
+            .order_by(Chat.timestamp.desc())
+            .limit(limit)
+            .all()
+        )
+        rows.reverse()
+        return "\n".join([f"{r.question}\n{r.answer}" for r in rows])
+    finally:
+        db.close()
+
+
+def save_history(session_id: str, question: str, answer: str):
+    db = SessionLocal()
+    try:
+        db.add(Chat(
+            session_id=session_id,
+            question=question,
+            answer=answer
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def load_history_async(session_id: str, limit: int = 5) -> str:
+    return await run_blocking("db", load_history, session_id, limit)
+
+
+async def save_history_async(session_id: str, question: str, answer: str):
+    await run_blocking("db", save_history, session_id, question, answer)
@@ -1,45 +1,23 @@
 # app/services/chat_rag.py
-import google.generativeai as genai
-from sqlalchemy.orm import Session
+import asyncio
 
 from app.config import settings
-from app.db.database import SessionLocal
-from app.db.schemas.chat_schema import ChatRequest, ChatResponse, RAGSource, ChatMessage
-from app.db.models.chat_model import Chat
+from app.core.executors import run_blocking
+from app.db.schemas.chat_schema import ChatRequest, ChatResponse, RAGSource
 from app.rag.retriever import query_vectorstore
+from app.services.chat_base import PreparedChat, complete_chat, complete_chat_async
+from app.services.chat_history import load_history, load_history_async
 
 # =============================
 # CONFIG LLM
 # =============================
-genai.configure(api_key=settings.GOOGLE_API_KEY)
-llm = genai.GenerativeModel("gemini-2.5-flash-lite")
+LLM_MODEL = settings.LLM_MODEL_RAG or settings.LLM_MODEL
 
 # =============================
-def load_history(db: Session, sid: str, limit=5):
-    rows = (
-        db.query(Chat)
-        .filter(Chat.session_id == sid)
-        .order_by(Chat.timestamp.desc())
-        .limit(limit)
-        .all()
-    )
-    rows.reverse()
-    return "\n".join([f"{r.question}\n{r.answer}" for r in rows])
-
-# =============================
-def handle_chat_rag(request: ChatRequest) -> ChatResponse:
-    chat_db = SessionLocal()
-
-    try:
-        history = load_history(chat_db, request.session_id)
-
-        result = query_vectorstore(request.question, n_results=3)
-        docs = result.get("documents", [[]])[0]
-        metas = result.get("metadatas", [[]])[0]
+def build_rag_prompt(question: str, history: str, docs: list[str]) -> str:
+    context = "\n\n".join(docs)
 
-        context = "\n\n".join(docs)
-
-        prompt = f"""
+    return f"""
 Bạn là trợ lý tư vấn ERP.
 
 LỊCH SỬ:
@@ -49,41 +27,59 @@ TÀI LIỆU:
 {context}
 
 CÂU HỎI:
-{request.question}
+{question}
 
 Trả lời bằng tiếng Việt.
 """
 
-        answer = llm.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.2
-            )
-        ).text
-
-        chat_db.add(Chat(
-            session_id=request.session_id,
-            question=request.question,
-            answer=answer
-        ))
-        chat_db.commit()
-
-        sources = [
-            RAGSource(
-                doc_id=i,
-                title=metas[i].get("source", "Không rõ"),
-                content=docs[i],
-                source=metas[i].get("source", "Không rõ"),
-                score=None
-            )
-            for i in range(len(docs))
-        ]
-
-        return ChatResponse(
-            answer=answer,
-            response_type="RAG",
-            sources=sources
+
+def build_sources(result: dict) -> list[RAGSource]:
+    docs = result.get("documents", [[]])[0]
+    metas = result.get("metadatas", [[]])[0]
+    scores = (result.get("scores") or [[]])[0]
+
+    return [
+        RAGSource(
+            doc_id=i,
+            title=metas[i].get("source", "Không rõ"),
+            content=docs[i],
+            source=metas[i].get("source", "Không rõ"),
+            score=scores[i] if i < len(scores) else None
         )
+        for i in range(len(docs))
+    ]
+
+
+def _prepare(request: ChatRequest, history: str, result: dict) -> PreparedChat:
+    docs = result.get("documents", [[]])[0]
+
+    return PreparedChat(
+        response_type="RAG",
+        prompt=build_rag_prompt(request.question, history, docs),
+        model_name=LLM_MODEL,
+        temperature=0.2,
+        sources=build_sources(result)
+    )
+
+# =============================
+def handle_chat_rag(request: ChatRequest) -> ChatResponse:
+    history = load_history(request.session_id)
+    result = query_vectorstore(request.question, n_results=3)
+
+    return complete_chat(request, _prepare(request, history, result))
+
+
+async def prepare_chat_rag_async(request: ChatRequest) -> PreparedChat:
+    """
+    Lịch sử chat (pool "db") và retrieval (pool "retrieval") chạy song song.
+    """
+    history, result = await asyncio.gather(
+        load_history_async(request.session_id),
+        run_blocking("retrieval", query_vectorstore, request.question, n_results=3)
+    )
+    return _prepare(request, history, result)
+
 
-    finally:
-        chat_db.close()
+async def handle_chat_rag_async(request: ChatRequest) -> ChatResponse:
+    prepared = await prepare_chat_rag_async(request)
+    return await complete_chat_async(request, prepared)
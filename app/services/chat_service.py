@@ -0,0 +1,64 @@
+# app/services/chat_service.py
+
+from typing import AsyncIterator
+
+from app.config import settings
+from app.core.executors import run_blocking
+from app.db.schemas.chat_schema import ChatRequest, ChatResponse
+from app.erp_tools.router.domain_classifier import classify_domain
+from app.erp_tools.router.semantic_router import semantic_route
+from app.services.chat_base import PreparedChat, complete_chat_async, stream_chat_async
+from app.services.chat_finance import prepare_chat_finance_async
+from app.services.chat_hrm import prepare_chat_hrm_async
+from app.services.chat_sale_crm import prepare_chat_sale_crm_async
+from app.services.chat_supply_chain import prepare_chat_supply_chain_async
+from app.services.chat_rag import prepare_chat_rag_async
+
+# Nghiệp vụ (kết quả của classify_domain) -> bước chuẩn bị tương ứng
+ERP_PREPARERS = {
+    "finance": prepare_chat_finance_async,
+    "hrm": prepare_chat_hrm_async,
+    "sale_crm": prepare_chat_sale_crm_async,
+    "supply_chain": prepare_chat_supply_chain_async,
+}
+
+
+async def prepare_chat_message(request: ChatRequest) -> PreparedChat:
+    """
+    Phân loại câu hỏi tại chỗ (keyword automaton, không gọi LLM) rồi chỉ chạy
+    router của nghiệp vụ đó. Keyword không xử lý được -> router ngữ nghĩa
+    (embedding câu hỏi vào cache, RAG dùng lại) -> RAG.
+    """
+    prepare = ERP_PREPARERS.get(classify_domain(request.question))
+    if prepare is not None:
+        prepared = await prepare(request)
+        if prepared is not None:
+            return prepared
+
+    if settings.SEMANTIC_ROUTER_ENABLED:
+        route = await run_blocking("retrieval", semantic_route, request.question)
+        if route is not None:
+            prepared = await ERP_PREPARERS[route.domain](request, intent=route.intent)
+            if prepared is not None:
+                return prepared
+
+    return await prepare_chat_rag_async(request)
+
+
+async def handle_chat_message(request: ChatRequest) -> ChatResponse:
+    """
+    Toàn bộ đường đi là async: không giữ thread nào trong lúc chờ Gemini.
+    """
+    prepared = await prepare_chat_message(request)
+    return await complete_chat_async(request, prepared)
+
+
+async def stream_chat_message(request: ChatRequest) -> AsyncIterator[str]:
+    """
+    Giống handle_chat_message nhưng trả về các frame SSE (xem stream_chat_async).
+    Bước chuẩn bị (router / tools / retrieval) chạy xong TRƯỚC khi trả về stream:
+    lỗi ở bước này thành lỗi HTTP thường, không làm stream 200 đứt giữa chừng
+    mà không có frame "error".
+    """
+    prepared = await prepare_chat_message(request)
+    return stream_chat_async(request, prepared)
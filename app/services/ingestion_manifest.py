@@ -0,0 +1,149 @@
+# app/services/ingestion_manifest.py
+
+import os
+import hashlib
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+
+from app.core.vectorstore import CHROMA_DB_PATH
+
+# Manifest nằm trong thư mục chroma_db: xoá chroma_db thì manifest cũng mất
+# và lần nạp sau sẽ tự động là full rebuild.
+DEFAULT_MANIFEST_PATH = os.path.join(CHROMA_DB_PATH, "ingestion_manifest.sqlite")
+
+
+def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class FileRecord:
+    path: str
+    file_hash: str
+    size: int
+    mtime: float
+    chunks: dict = field(default_factory=dict)  # chunk_id -> chunk_hash
+
+
+class IngestionManifest:
+    """
+    Ghi lại hash nội dung của từng file và từng chunk đã nạp vào ChromaDB.
+
+    - files : path (tương đối) -> file_hash, size, mtime
+    - chunks: chunk_id -> path, chunk_hash
+    - meta  : cờ của các bước chạy 1 lần (VD: đã dọn chunk ID kiểu cũ)
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                file_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_chunks_path ON chunks (path);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    # =============================
+    # READ
+    # =============================
+    def get_file(self, path: str) -> FileRecord | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, file_hash, size, mtime FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        return FileRecord(*row) if row else None
+
+    def all_files(self) -> dict[str, FileRecord]:
+        with self._lock:
+            rows = self._conn.execute("SELECT path, file_hash, size, mtime FROM files").fetchall()
+        return {r[0]: FileRecord(*r) for r in rows}
+
+    def get_chunk_ids(self, path: str) -> set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE path = ?", (path,)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def get_meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # =============================
+    # WRITE
+    # =============================
+    def save_file(self, record: FileRecord):
+        """
+        Ghi (thay thế) bản ghi của một file cùng toàn bộ chunk của nó.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE path = ?", (record.path,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, file_hash, size, mtime) VALUES (?, ?, ?, ?)",
+                (record.path, record.file_hash, record.size, record.mtime)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, path, chunk_hash) VALUES (?, ?, ?)",
+                [(cid, record.path, h) for cid, h in record.chunks.items()]
+            )
+            self._conn.commit()
+
+    def touch_file(self, path: str, size: int, mtime: float):
+        """
+        File không đổi nội dung nhưng mtime thay đổi (ví dụ copy lại).
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE files SET size = ?, mtime = ? WHERE path = ?", (size, mtime, path)
+            )
+            self._conn.commit()
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+            self._conn.commit()
+
+    def remove_file(self, path: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM files")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
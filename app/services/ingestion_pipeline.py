@@ -0,0 +1,481 @@
+# app/services/ingestion_pipeline.py
+
+import os
+import json
+import queue
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+
+from app.core.vectorstore import get_vector_collection, reset_vector_collection
+from app.core.embedder import embed_texts, encode_with_sparse, supports_sparse
+from app.rag.processor import load_and_split_pdf
+from app.rag.bm25_index import build_bm25_index_from_collection, get_bm25_index
+from app.rag.sparse_index import LEXICAL_METADATA_KEY, build_lexical_index_from_collection
+from app.services.ingestion_manifest import IngestionManifest, FileRecord, hash_file, hash_text
+
+SUPPORTED_EXTENSIONS = (".pdf",)
+
+# Gốc kho tri thức: path trong manifest / chunk ID luôn tính tương đối từ đây,
+# dù nạp cả thư mục (embed_runner) hay từng file (ingest_pdf_to_chroma)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_KB_DIR = os.path.join(PROJECT_ROOT, "data", "knowledge_base")
+
+# Cờ trong manifest: đã dọn chunk nạp bằng ID kiểu cũ "{tên file}_chunk_{i}"
+LEGACY_PURGE_FLAG = "legacy_chunks_purged"
+
+_SENTINEL = object()
+
+
+@dataclass
+class StageStats:
+    """Thống kê cho một stage của pipeline."""
+    name: str
+    items: int = 0
+    batches: int = 0
+    busy_seconds: float = 0.0
+
+    def add(self, items: int, seconds: float):
+        self.items += items
+        self.batches += 1
+        self.busy_seconds += seconds
+
+    def summary(self, wall_seconds: float) -> str:
+        busy_rate = self.items / self.busy_seconds if self.busy_seconds else 0.0
+        wall_rate = self.items / wall_seconds if wall_seconds else 0.0
+        return (
+            f"{self.name:<8} | {self.items:7d} items | {self.batches:5d} batch "
+            f"| busy {self.busy_seconds:7.2f}s ({busy_rate:8.1f}/s) "
+            f"| wall {wall_rate:8.1f}/s"
+        )
+
+
+@dataclass
+class IngestionReport:
+    files: int = 0
+    skipped_files: int = 0
+    removed_files: int = 0
+    failed_files: list = field(default_factory=list)
+    new_chunks: int = 0
+    unchanged_chunks: int = 0
+    deleted_chunks: int = 0
+    wall_seconds: float = 0.0
+    stages: dict = field(default_factory=dict)
+
+    def print_summary(self):
+        print(f"--- Đã xử lý {self.files} file trong {self.wall_seconds:.2f}s ---")
+        print(
+            f"File không đổi: {self.skipped_files}, file đã xoá: {self.removed_files} | "
+            f"chunk mới: {self.new_chunks}, giữ nguyên: {self.unchanged_chunks}, "
+            f"đã xoá: {self.deleted_chunks}"
+        )
+        for stats in self.stages.values():
+            print(stats.summary(self.wall_seconds))
+        if self.failed_files:
+            print(f"File lỗi ({len(self.failed_files)}): {self.failed_files}")
+
+
+@dataclass
+class Chunk:
+    chunk_id: str
+    text: str
+    metadata: dict
+
+
+def iter_knowledge_base_files(root_dir: str):
+    """
+    Duyệt (đệ quy) thư mục kho tri thức, trả về đường dẫn các file hỗ trợ.
+    """
+    for dirpath, _, filenames in os.walk(root_dir):
+        for name in sorted(filenames):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def _parse_file(file_path: str, known_hash: str | None = None) -> tuple[str, list[str] | None, float, str]:
+    """
+    Chạy trong process con: băm nội dung file, nếu khác hash đã biết thì đọc + chia nhỏ.
+    Trả về chunks=None khi nội dung file không đổi.
+    """
+    t0 = time.perf_counter()
+    file_hash = hash_file(file_path)
+    if known_hash is not None and file_hash == known_hash:
+        return file_path, None, time.perf_counter() - t0, file_hash
+
+    chunks = load_and_split_pdf(file_path)
+    return file_path, chunks, time.perf_counter() - t0, file_hash
+
+
+def _put(q: queue.Queue, item, stop: threading.Event):
+    """
+    put() có kiểm tra tín hiệu dừng, tránh treo khi stage sau đã lỗi.
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _SENTINEL
+
+
+class IngestionPipeline:
+    """
+    Pipeline nạp dữ liệu dạng streaming:
+
+        [parse: process pool] -> chunk_queue -> [embed: batch] -> upsert_queue -> [upsert Chroma: batch]
+
+    Các hàng đợi có giới hạn nên bộ nhớ chỉ giữ vài batch tại một thời điểm,
+    không phụ thuộc kích thước kho tài liệu.
+
+    Khi có manifest, pipeline chạy incremental: file không đổi (size/mtime hoặc
+    hash nội dung) bị bỏ qua, chỉ chunk mới được embed, chunk biến mất bị xoá.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        workers: int | None = None,
+        embed_batch_size: int = 64,
+        upsert_batch_size: int = 256,
+        queue_size: int = 8,
+        manifest: IngestionManifest | None = None
+    ):
+        self.root_dir = root_dir
+        self.manifest = manifest
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+
+        self.chunk_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.upsert_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.stop = threading.Event()
+        self.errors: list[BaseException] = []
+
+        # Thay đổi chỉ được ghi vào manifest / xoá khỏi Chroma khi pipeline chạy thành công
+        self.file_updates: dict[str, FileRecord] = {}
+        self.file_touches: dict[str, tuple[int, float]] = {}
+        self.stale_chunk_ids: list[str] = []
+
+        self.report = IngestionReport(stages={
+            "parse": StageStats("parse"),
+            "embed": StageStats("embed"),
+            "upsert": StageStats("upsert"),
+        })
+
+    # =============================
+    # HOOKS
+    # =============================
+    def rel_path(self, file_path: str) -> str:
+        return os.path.relpath(file_path, self.root_dir).replace(os.sep, "/")
+
+    def make_chunks(self, file_path: str, texts: list[str], file_hash: str) -> list[Chunk]:
+        """
+        Chuyển kết quả parse thành các Chunk (ID + metadata) và chỉ trả về chunk cần embed.
+
+        ID = đường dẫn tương đối + hash nội dung chunk, nên chèn thêm một đoạn
+        vào giữa file không làm đổi ID của các chunk phía sau.
+        """
+        rel_path = self.rel_path(file_path)
+        stat = os.stat(file_path)
+
+        record = FileRecord(rel_path, file_hash, stat.st_size, stat.st_mtime)
+        chunks = []
+        seen: dict[str, int] = {}
+        for text in texts:
+            chunk_hash = hash_text(text)
+            n = seen.get(chunk_hash, 0)
+            seen[chunk_hash] = n + 1
+
+            chunk_id = f"{rel_path}_chunk_{chunk_hash[:16]}"
+            if n:
+                chunk_id += f"_{n}"
+            record.chunks[chunk_id] = chunk_hash
+            chunks.append(Chunk(
+                chunk_id=chunk_id,
+                text=text,
+                metadata={"source": os.path.basename(file_path), "path": rel_path}
+            ))
+
+        if self.manifest is None:
+            return chunks
+
+        old_ids = self.manifest.get_chunk_ids(rel_path)
+        if not old_ids:
+            # File chưa có trong manifest: dọn các chunk cũ (nếu có) cùng path trong Chroma
+            old_ids = set(get_vector_collection().get(where={"path": rel_path}, include=[])["ids"])
+
+        self.file_updates[rel_path] = record
+        self.stale_chunk_ids.extend(old_ids - record.chunks.keys())
+
+        new_chunks = [c for c in chunks if c.chunk_id not in old_ids]
+        self.report.unchanged_chunks += len(chunks) - len(new_chunks)
+        return new_chunks
+
+    def _known_hash(self, file_path: str) -> tuple[bool, str | None]:
+        """
+        Trả về (bỏ_qua, hash_đã_biết) dựa trên manifest.
+        Size + mtime khớp thì bỏ qua luôn, không cần đọc file.
+        """
+        if self.manifest is None:
+            return False, None
+
+        record = self.manifest.get_file(self.rel_path(file_path))
+        if record is None:
+            return False, None
+
+        stat = os.stat(file_path)
+        if stat.st_size == record.size and stat.st_mtime == record.mtime:
+            return True, record.file_hash
+        return False, record.file_hash
+
+    # =============================
+    # STAGES
+    # =============================
+    def _parse_stage(self, files: list[str]):
+        stats = self.report.stages["parse"]
+        max_in_flight = self.workers * 2
+
+        # 'spawn' thay vì fork: stage embed chạy song song trong thread có thể đang giữ lock của torch
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pending: dict = {}
+            file_iter = iter(files)
+
+            def submit_next() -> bool:
+                for path in file_iter:
+                    skip, known_hash = self._known_hash(path)
+                    if skip:
+                        self.report.files += 1
+                        self.report.skipped_files += 1
+                        continue
+                    pending[pool.submit(_parse_file, path, known_hash)] = path
+                    return True
+                return False
+
+            while len(pending) < max_in_flight and submit_next():
+                pass
+
+            while pending and not self.stop.is_set():
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    file_path = pending.pop(fut)
+                    submit_next()
+                    self.report.files += 1
+
+                    try:
+                        _, texts, seconds, file_hash = fut.result()
+                    except Exception as e:
+                        print(f"Lỗi khi parse file {file_path}: {e}")
+                        self.report.failed_files.append(file_path)
+                        continue
+
+                    if texts is None:
+                        # Nội dung không đổi, chỉ cập nhật size/mtime
+                        stat = os.stat(file_path)
+                        self.file_touches[self.rel_path(file_path)] = (stat.st_size, stat.st_mtime)
+                        self.report.skipped_files += 1
+                        continue
+
+                    stats.add(len(texts), seconds)
+                    if not texts:
+                        self.report.failed_files.append(file_path)
+                        continue
+
+                    chunks = self.make_chunks(file_path, texts, file_hash)
+                    self.report.new_chunks += len(chunks)
+                    if chunks:
+                        _put(self.chunk_queue, chunks, self.stop)
+
+            for fut in pending:
+                fut.cancel()
+
+        _put(self.chunk_queue, _SENTINEL, self.stop)
+
+    def _embed_stage(self):
+        stats = self.report.stages["embed"]
+        buffer: list[Chunk] = []
+        # Backend 'flag_m3': lấy luôn lexical weights trong cùng lần forward
+        with_sparse = supports_sparse()
+
+        def flush():
+            if not buffer:
+                return
+            batch = buffer[:self.embed_batch_size]
+            del buffer[:self.embed_batch_size]
+
+            t0 = time.perf_counter()
+            texts = [c.text for c in batch]
+            if with_sparse:
+                vectors, lexical = encode_with_sparse(texts)
+                for chunk, weights in zip(batch, lexical):
+                    chunk.metadata[LEXICAL_METADATA_KEY] = json.dumps(weights)
+            else:
+                vectors = embed_texts(texts)
+            stats.add(len(batch), time.perf_counter() - t0)
+            _put(self.upsert_queue, list(zip(batch, vectors)), self.stop)
+
+        while True:
+            item = _get(self.chunk_queue, self.stop)
+            if item is _SENTINEL:
+                break
+            buffer.extend(item)
+            while len(buffer) >= self.embed_batch_size:
+                flush()
+
+        while buffer and not self.stop.is_set():
+            flush()
+        _put(self.upsert_queue, _SENTINEL, self.stop)
+
+    def _upsert_stage(self):
+        stats = self.report.stages["upsert"]
+        collection = get_vector_collection()
+        buffer: list[tuple[Chunk, list[float]]] = []
+
+        def flush():
+            batch = buffer[:self.upsert_batch_size]
+            del buffer[:self.upsert_batch_size]
+
+            t0 = time.perf_counter()
+            collection.upsert(
+                ids=[c.chunk_id for c, _ in batch],
+                embeddings=[v for _, v in batch],
+                documents=[c.text for c, _ in batch],
+                metadatas=[c.metadata for c, _ in batch]
+            )
+            stats.add(len(batch), time.perf_counter() - t0)
+
+        while True:
+            item = _get(self.upsert_queue, self.stop)
+            if item is _SENTINEL:
+                break
+            buffer.extend(item)
+            while len(buffer) >= self.upsert_batch_size:
+                flush()
+
+        while buffer and not self.stop.is_set():
+            flush()
+
+    def _guard(self, target, *args):
+        try:
+            target(*args)
+        except BaseException as e:
+            self.errors.append(e)
+            self.stop.set()
+
+    # =============================
+    # RUN
+    # =============================
+    def run(self, files: list[str] | None = None) -> IngestionReport:
+        # Chỉ xoá file "biến mất" khỏi manifest khi quét toàn bộ thư mục
+        full_scan = files is None
+        if files is None:
+            files = list(iter_knowledge_base_files(self.root_dir))
+        print(f"--- Bắt đầu nạp {len(files)} file từ {self.root_dir} ({self.workers} worker) ---")
+
+        t0 = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._guard, args=(self._embed_stage,), name="ingest-embed"),
+            threading.Thread(target=self._guard, args=(self._upsert_stage,), name="ingest-upsert"),
+        ]
+        for t in threads:
+            t.start()
+
+        self._guard(self._parse_stage, files)
+
+        for t in threads:
+            t.join()
+        self.report.wall_seconds = time.perf_counter() - t0
+
+        if self.errors:
+            raise RuntimeError(f"Pipeline nạp dữ liệu bị lỗi: {self.errors[0]}") from self.errors[0]
+
+        if self.manifest is not None:
+            self._finalize(files, full_scan)
+            self.report.wall_seconds = time.perf_counter() - t0
+        return self.report
+
+    def _finalize(self, files: list[str], full_scan: bool):
+        """
+        Sau khi upsert xong: xoá chunk cũ, xoá file đã biến mất, ghi manifest.
+        """
+        collection = get_vector_collection()
+
+        on_disk = {self.rel_path(f) for f in files}
+        for rel_path in (self.manifest.all_files() if full_scan else {}):
+            if rel_path not in on_disk:
+                self.stale_chunk_ids.extend(self.manifest.get_chunk_ids(rel_path))
+                self.manifest.remove_file(rel_path)
+                self.report.removed_files += 1
+
+        if self.manifest.get_meta(LEGACY_PURGE_FLAG) is None:
+            self.stale_chunk_ids.extend(self._legacy_chunk_ids(collection))
+
+        for i in range(0, len(self.stale_chunk_ids), self.upsert_batch_size):
+            collection.delete(ids=self.stale_chunk_ids[i:i + self.upsert_batch_size])
+        self.manifest.set_meta(LEGACY_PURGE_FLAG, "1")
+        self.report.deleted_chunks = len(self.stale_chunk_ids)
+
+        for record in self.file_updates.values():
+            self.manifest.save_file(record)
+        for rel_path, (size, mtime) in self.file_touches.items():
+            self.manifest.touch_file(rel_path, size, mtime)
+
+
+    def _legacy_chunk_ids(self, collection) -> list[str]:
+        """
+        Chunk nạp trước khi có manifest (ID "{tên file}_chunk_{i}", metadata
+        không có "path") không bao giờ bị thay / xoá theo path -> dọn 1 lần.
+        """
+        legacy, offset = [], 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=self.upsert_batch_size, offset=offset)
+            if not page["ids"]:
+                return legacy
+            legacy += [
+                chunk_id for chunk_id, meta in zip(page["ids"], page["metadatas"])
+                if "path" not in (meta or {})
+            ]
+            offset += len(page["ids"])
+
+
+def rebuild_search_indexes():
+    """
+    Dựng lại các index phụ (BM25, lexical weights) từ nội dung hiện tại của Chroma.
+    """
+    build_bm25_index_from_collection()
+    build_lexical_index_from_collection()
+
+
+def ingest_directory(root_dir: str, full_rebuild: bool = False, **kwargs) -> IngestionReport:
+    """
+    Nạp kho tri thức trong thư mục vào ChromaDB.
+    Mặc định chạy incremental theo manifest; full_rebuild=True xoá collection và nạp lại từ đầu.
+    """
+    if full_rebuild:
+        reset_vector_collection()
+
+    manifest = IngestionManifest()
+    if full_rebuild:
+        manifest.clear()
+
+    try:
+        pipeline = IngestionPipeline(root_dir, manifest=manifest, **kwargs)
+        report = pipeline.run()
+    finally:
+        manifest.close()
+
+    report.print_summary()
+    # Chưa có index BM25 / index dựng bằng tokenizer cũ -> cũng dựng lại
+    if report.new_chunks or report.deleted_chunks or get_bm25_index() is None:
+        rebuild_search_indexes()
+    return report
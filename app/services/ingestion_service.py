@@ -1,48 +1,46 @@
 # app/services/ingestion_service.py
 
 import os
-from app.core.vectorstore import get_vector_collection
-# Import hàm embed_texts mới
-from app.core.embedder import embed_texts 
-from app.rag.processor import load_and_split_pdf
+from app.services.ingestion_manifest import IngestionManifest
+from app.services.ingestion_pipeline import DEFAULT_KB_DIR, IngestionPipeline, rebuild_search_indexes
 
-def ingest_pdf_to_chroma(file_path: str):
+def ingest_pdf_to_chroma(file_path: str, root_dir: str = DEFAULT_KB_DIR):
     """
-    Điều phối toàn bộ quy trình:
-    1. Đọc & Chia nhỏ PDF
-    2. Lấy Collection từ Chroma
-    3. Tạo Embeddings
-    4. Nạp dữ liệu vào Chroma
+    Nạp một file PDF vào Chroma (incremental theo manifest):
+    1. Băm nội dung file, bỏ qua nếu không đổi
+    2. Đọc & Chia nhỏ PDF
+    3. Chỉ tạo Embeddings cho chunk mới
+    4. Upsert chunk mới, xoá chunk đã biến mất
+    5. Dựng lại index BM25 / lexical weights
+
+    Path của file tính từ root_dir (gốc kho tri thức, giống embed_runner) để
+    nạp lẻ và nạp cả thư mục dùng chung 1 bản ghi manifest / chunk ID.
+    File nằm ngoài root_dir -> tính từ thư mục chứa file.
     """
     print(f"--- Bắt đầu quy trình nạp cho file: {file_path} ---")
-    
-    # 1. Đọc & Chia nhỏ
-    chunk_contents = load_and_split_pdf(file_path)
-    if not chunk_contents:
-        print("Không có nội dung để nạp. Dừng lại.")
-        return
 
-    # 2. Lấy Collection
-    collection = get_vector_collection()
-    
-    # 3. Tạo Embeddings (Sử dụng hàm mới)
-    print("Đang tạo embeddings cho các chunks...")
-    chunk_embeddings = embed_texts(chunk_contents)
-    print(f"Đã tạo {len(chunk_embeddings)} embeddings.")
+    if not os.path.exists(file_path):
+        print(f"LỖI: Không tìm thấy file {file_path}")
+        return
 
-    # 4. Chuẩn bị ID và Metadata
-    ids = [f"{os.path.basename(file_path)}_chunk_{i}" for i in range(len(chunk_contents))]
-    metadatas = [{"source": os.path.basename(file_path)} for _ in range(len(chunk_contents))]
+    file_path = os.path.abspath(file_path)
+    root_dir = os.path.abspath(root_dir)
+    if os.path.commonpath([file_path, root_dir]) != root_dir:
+        root_dir = os.path.dirname(file_path)
 
-    # 5. Nạp vào Chroma
-    print(f"Đang nạp {len(chunk_contents)} chunks vào ChromaDB...")
+    manifest = IngestionManifest()
     try:
-        collection.add(
-            embeddings=chunk_embeddings,  # Dùng embeddings đã tạo
-            documents=chunk_contents,
-            metadatas=metadatas,
-            ids=ids
+        pipeline = IngestionPipeline(
+            root_dir,
+            workers=1,
+            manifest=manifest
         )
+        report = pipeline.run(files=[file_path])
+        report.print_summary()
+        if report.new_chunks or report.deleted_chunks:
+            rebuild_search_indexes()
         print("--- Nạp dữ liệu thành công! ---")
     except Exception as e:
-        print(f"Lỗi khi nạp vào Chroma: {e}")
\ No newline at end of file
+        print(f"Lỗi khi nạp vào Chroma: {e}")
+    finally:
+        manifest.close()
@@ -0,0 +1,43 @@
+import sys
+import os
+
+# Cho phép import app/*
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from app.db.index_pack import apply_index_pack
+from app.db.finance_database import engine as FinanceEngine, FinanceBase
+from app.db.hrm_database import HRM_ENGINE, HrmBase
+from app.db.sale_crm_database import sale_crm_engine, SaleCrmBase
+from app.db.supply_chain_database import SupplyChainEngine, SupplyChainBase
+import app.erp_tools.modules.finance_accounting.models
+import app.erp_tools.modules.hrm.models
+import app.erp_tools.modules.sales_crm.models
+from app.erp_tools.modules.supply_chain.models import RETIRED_INDEXES as SUPPLY_CHAIN_RETIRED_INDEXES
+
+DATABASES = {
+    "finance": (FinanceEngine, FinanceBase, ()),
+    "hrm": (HRM_ENGINE, HrmBase, ()),
+    "sale_crm": (sale_crm_engine, SaleCrmBase, ()),
+    "supply_chain": (SupplyChainEngine, SupplyChainBase, SUPPLY_CHAIN_RETIRED_INDEXES),
+}
+
+
+def apply_all_index_packs():
+    """
+    Tạo bổ sung index khai báo trong model (index ghép...) cho database đã có
+    dữ liệu, xoá index đã bỏ. Chạy lại nhiều lần không sao: index đã có bị bỏ qua.
+    """
+    for name, (engine, base, retired) in DATABASES.items():
+        print(f"🚀 Đang tạo index cho {name}...")
+        created = apply_index_pack(engine, base.metadata, retired)
+        if created:
+            for index_name in created:
+                print(f"   + {index_name}")
+        else:
+            print("   (đã đủ index)")
+    print("✅ Hoàn tất index pack!")
+
+
+if __name__ == "__main__":
+    apply_all_index_packs()
@@ -0,0 +1,146 @@
+# scripts/bench_domain_classifier.py
+
+import sys
+import os
+import time
+from collections import Counter
+
+# Thao tác này giúp Python tìm thấy thư mục 'app'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+# -------------------------------------
+
+from app.core.text_normalize import fold_text
+from app.erp_tools.router.domain_classifier import (
+    DOMAIN_KEYWORDS,
+    DOMAIN_PRIORITY,
+    FALLBACK_DOMAIN,
+    classify_domain
+)
+
+ROUNDS = 2000
+
+# Bộ câu hỏi có nhãn (lấy từ scripts/test_* + câu hỏi thường gặp)
+LABELLED_QUESTIONS = [
+    # finance
+    ("Hóa đơn bán AR-001 đã thu tiền chưa?", "finance"),
+    ("Khách hàng 3 còn nợ bao nhiêu?", "finance"),
+    ("Hóa đơn mua AP-009 đã thanh toán chưa?", "finance"),
+    ("Hôm nay có giao dịch thu chi nào?", "finance"),
+    ("Kỳ kế toán hiện tại là tháng nào?", "finance"),
+    ("Công nợ nhà cung cấp 2 hiện là bao nhiêu?", "finance"),
+    ("Cho tôi xem bút toán 15", "finance"),
+    ("Số dư tài khoản 111 là bao nhiêu?", "finance"),
+    ("Chi tiết hóa đơn bán AR-004", "finance"),
+    ("Hạch toán event SALE_INVOICE thế nào?", "finance"),
+    # hrm
+    ("Thông tin nhân viên của tôi", "hrm"),
+    ("Tôi thuộc phòng ban nào?", "hrm"),
+    ("Chức vụ của tôi là gì?", "hrm"),
+    ("Hôm nay tôi có chấm công không?", "hrm"),
+    ("Lịch sử chấm công của tôi", "hrm"),
+    ("Lương tháng 1 năm 2026 của tôi", "hrm"),
+    ("Chi tiết lương tháng 1 năm 2026", "hrm"),
+    ("Tháng 3 tôi đi muộn mấy lần?", "hrm"),
+    ("Ca làm của tôi tuần này", "hrm"),
+    ("Hợp đồng lao động của tôi hết hạn khi nào?", "hrm"),
+    # sale_crm
+    ("Đơn hàng 1 đã giao chưa?", "sale_crm"),
+    ("Cho tôi xem chi tiết đơn hàng 1", "sale_crm"),
+    ("Tôi đã mua những gì?", "sale_crm"),
+    ("Mã SALE10 có dùng được không?", "sale_crm"),
+    ("Thông tin tài khoản của tôi", "sale_crm"),
+    ("Sản phẩm 1 có những phiên bản nào?", "sale_crm"),
+    ("Sản phẩm của hãng 2", "sale_crm"),
+    ("Đánh giá sản phẩm 3 được 5 sao", "sale_crm"),
+    ("Voucher GIAM50 còn hạn không?", "sale_crm"),
+    ("Đơn hàng 7 thanh toán chưa?", "sale_crm"),
+    # supply_chain
+    ("Đơn mua PO-001 đã nhập bao nhiêu % và còn thiếu gì?", "supply_chain"),
+    ("Sản phẩm 1 còn hàng không?", "supply_chain"),
+    ("Kho Hà Nội hiện còn bao nhiêu laptop Dell?", "supply_chain"),
+    ("Nhà cung cấp FPT có giao hàng đúng hạn không?", "supply_chain"),
+    ("Lịch sử biến động tồn kho của sản phẩm 1 là gì?", "supply_chain"),
+    ("Những sản phẩm nào sắp hết hàng?", "supply_chain"),
+    ("Trạng thái phiếu nhập GR-002", "supply_chain"),
+    ("Phiếu xuất GI-004 gồm những sản phẩm nào?", "supply_chain"),
+    ("Tồn kho SKU IPHONE-15", "supply_chain"),
+    ("Kết quả kiểm kê tháng này có chênh lệch không?", "supply_chain"),
+    ("Hàng nào lâu không xuất?", "supply_chain"),
+    ("Xếp hạng nhà cung cấp tốt nhất", "supply_chain"),
+    # rag
+    ("Quy trình nhập kho là gì?", "rag"),
+    ("Hướng dẫn tạo đơn mua trên hệ thống", "rag"),
+    ("ERP là gì?", "rag"),
+    ("Làm sao để phân quyền người dùng?", "rag"),
+    ("Chính sách đổi trả hàng như thế nào?", "rag"),
+    ("Giải thích khái niệm giá vốn hàng bán", "rag"),
+    ("Quy trình phê duyệt ngân sách dự án trong doanh nghiệp gồm những bước nào?", "rag"),
+    ("Xin chào", "rag"),
+]
+
+# Câu gõ không dấu / lẫn dấu dễ nhầm (từ không dấu đa nghĩa: hàng / hãng, gì / GI...)
+UNACCENTED_QUESTIONS = [
+    ("con bao nhieu hang iphone 15", "rag"),
+    ("erp la gi", "rag"),
+    ("ke toan la gi", "finance"),
+    ("so luong iphone 15 con bao nhieu", "supply_chain"),
+    ("ton kho ở Hà Nội", "supply_chain"),
+    ("luong thang 3 cua toi", "hrm"),
+    ("cham cong thang 3", "hrm"),
+    ("ma giam gia SALE10 con dung duoc khong", "sale_crm"),
+]
+
+
+def linear_classify(text: str) -> str:
+    """
+    Cách làm cũ: duyệt tuần tự `k in text` cho từng keyword (để so sánh tốc độ).
+    """
+    text = text.lower()
+    scores = {}
+    for domain, keywords in DOMAIN_KEYWORDS.items():
+        for keyword, weight in keywords.items():
+            if keyword in text:
+                scores[domain] = scores.get(domain, 0) + weight
+    if not scores:
+        return FALLBACK_DOMAIN
+    return max(DOMAIN_PRIORITY, key=lambda d: (scores.get(d, 0), -DOMAIN_PRIORITY.index(d)))
+
+
+def throughput(fn, questions: list[str]) -> float:
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        for q in questions:
+            fn(q)
+    return ROUNDS * len(questions) / (time.perf_counter() - t0)
+
+
+def run_benchmark():
+    questions = [q for q, _ in LABELLED_QUESTIONS]
+    num_keywords = sum(len(k) for k in DOMAIN_KEYWORDS.values())
+    print(f"{len(questions)} câu hỏi có nhãn, {num_keywords} keyword")
+
+    # Có dấu; bỏ dấu cả bộ; câu không dấu / lẫn dấu dễ nhầm
+    unaccented = [(fold_text(q), label) for q, label in LABELLED_QUESTIONS]
+    for name, labelled in (
+        ("có dấu", LABELLED_QUESTIONS),
+        ("bỏ dấu", unaccented),
+        ("dễ nhầm", UNACCENTED_QUESTIONS),
+    ):
+        errors = Counter()
+        for q, label in labelled:
+            predicted = classify_domain(q)
+            if predicted != label:
+                errors[(label, predicted)] += 1
+                print(f"  SAI: {q!r} -> {predicted} (đúng: {label})")
+
+        correct = len(labelled) - sum(errors.values())
+        print(f"Độ chính xác ({name}): {correct}/{len(labelled)} = {correct / len(labelled):.3f}")
+
+    for name, fn in (("automaton", classify_domain), ("linear `in`", linear_classify)):
+        qps = throughput(fn, questions)
+        print(f"{name:<12} | {qps:10.0f} câu/s | {1e6 / qps:6.2f} µs/câu")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,110 @@
+# scripts/bench_embedding_backend.py
+
+import sys
+import os
+import time
+import random
+
+import numpy as np
+
+# Thao tác này giúp Python tìm thấy thư mục 'app'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+# -------------------------------------
+
+from app.config import settings
+from app.core.embedder import load_embedding_model, encode_dense, SUPPORTED_BACKENDS
+from app.core.vectorstore import get_vector_collection
+
+INSTRUCTION = "Represent this sentence for searching relevant passages: "
+TOP_K = 5
+MAX_DOCS = 2000
+NUM_QUERIES = 100
+REFERENCE_BACKEND = "torch"
+
+
+def load_corpus() -> list[str]:
+    """
+    Lấy các chunk đã nạp trong ChromaDB làm corpus benchmark.
+    """
+    collection = get_vector_collection()
+    docs = collection.get(include=["documents"], limit=MAX_DOCS)["documents"]
+    return [d for d in docs if d]
+
+
+def build_queries(docs: list[str]) -> tuple[list[str], list[int]]:
+    """
+    Tạo câu hỏi từ đoạn đầu của các chunk ngẫu nhiên.
+    Nhãn đúng = chính chunk đó (dùng để đo hit@k).
+    """
+    rng = random.Random(42)
+    idx = rng.sample(range(len(docs)), min(NUM_QUERIES, len(docs)))
+    queries = [INSTRUCTION + docs[i][:120] for i in idx]
+    return queries, idx
+
+
+def encode(model, texts: list[str]) -> tuple[np.ndarray, float]:
+    t0 = time.perf_counter()
+    emb = encode_dense(model, texts, batch_size=32)
+    return np.asarray(emb, dtype=np.float32), time.perf_counter() - t0
+
+
+def top_k(q: np.ndarray, d: np.ndarray, k: int) -> np.ndarray:
+    scores = q @ d.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def run_benchmark():
+    docs = load_corpus()
+    if not docs:
+        print("Chưa có dữ liệu trong ChromaDB. Hãy chạy scripts/embed_runner.py trước.")
+        return
+
+    queries, labels = build_queries(docs)
+    print(f"Corpus: {len(docs)} chunks, {len(queries)} câu hỏi, top_k={TOP_K}")
+    print(f"Device: {settings.EMBEDDING_DEVICE}, threads: {settings.EMBEDDING_NUM_THREADS or 'mặc định'}")
+
+    reference = None
+    # fp32 chạy trước để làm mốc cho các backend còn lại
+    backends = [REFERENCE_BACKEND] + [b for b in SUPPORTED_BACKENDS if b != REFERENCE_BACKEND]
+    for backend in backends:
+        try:
+            model = load_embedding_model(
+                device=settings.EMBEDDING_DEVICE,
+                backend=backend,
+                num_threads=settings.EMBEDDING_NUM_THREADS
+            )
+        except Exception as e:
+            print(f"{backend:<11} | bỏ qua: {e}")
+            continue
+
+        # warm-up
+        encode_dense(model, queries[:4])
+
+        d_emb, d_time = encode(model, docs)
+        q_emb, q_time = encode(model, queries)
+        hits = top_k(q_emb, d_emb, TOP_K)
+
+        hit_at_k = np.mean([labels[i] in hits[i] for i in range(len(labels))])
+
+        # Recall so với top-k của torch fp32; không nạp được fp32 -> không có mốc so sánh
+        if backend == REFERENCE_BACKEND:
+            reference = hits
+        if reference is None:
+            recall = "recall: n/a (thiếu fp32)"
+        else:
+            overlap = np.mean([
+                len(set(hits[i]) & set(reference[i])) / TOP_K
+                for i in range(len(labels))
+            ])
+            recall = f"recall@{TOP_K} vs fp32 {overlap:.3f}"
+
+        print(
+            f"{backend:<11} | docs {len(docs) / d_time:7.1f}/s "
+            f"| query {len(queries) / q_time:7.1f}/s "
+            f"| hit@{TOP_K} {hit_at_k:.3f} | {recall}"
+        )
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,75 @@
+# scripts/bench_embedding_batcher.py
+
+import sys
+import os
+import time
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+# Thao tác này giúp Python tìm thấy thư mục 'app'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+# -------------------------------------
+
+from app.core.embedder import embed_texts, get_embedding_model
+from app.core.embedding_batcher import EmbeddingBatcher
+
+QUESTIONS = [
+    "Tồn kho iPhone 15 còn bao nhiêu?",
+    "Lương tháng 1 của tôi là bao nhiêu?",
+    "Quy trình duyệt đơn mua hàng như thế nào?",
+    "Chính sách nghỉ phép năm của công ty?",
+    "Hóa đơn bán AR-001 đã thu tiền chưa?",
+    "Cách hạch toán nhập kho hàng mua?",
+    "Kho Hà Nội còn bao nhiêu laptop Dell?",
+    "Quy định đi muộn bị trừ lương thế nào?",
+]
+
+CONCURRENCY = 32
+TOTAL_REQUESTS = 256
+
+
+def _run(embed_one) -> tuple[float, list[float]]:
+    latencies = []
+
+    def one(i: int):
+        t0 = time.perf_counter()
+        embed_one(QUESTIONS[i % len(QUESTIONS)])
+        latencies.append(time.perf_counter() - t0)
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        list(pool.map(one, range(TOTAL_REQUESTS)))
+    return time.perf_counter() - t_start, latencies
+
+
+def _report(name: str, elapsed: float, latencies: list[float]):
+    lat_ms = sorted(x * 1000 for x in latencies)
+    p50 = statistics.median(lat_ms)
+    p95 = lat_ms[int(len(lat_ms) * 0.95) - 1]
+    print(
+        f"{name:<12} | {TOTAL_REQUESTS / elapsed:8.1f} câu/s "
+        f"| p50 {p50:7.1f} ms | p95 {p95:7.1f} ms"
+    )
+
+
+def run_benchmark():
+    # Tải model trước để không tính thời gian load vào benchmark
+    get_embedding_model()
+    embed_texts(QUESTIONS)
+
+    print(f"Concurrency={CONCURRENCY}, tổng {TOTAL_REQUESTS} câu hỏi")
+
+    elapsed, lat = _run(lambda q: embed_texts([q])[0])
+    _report("từng câu", elapsed, lat)
+
+    for max_wait_ms in (2.0, 5.0, 10.0):
+        batcher = EmbeddingBatcher(max_batch_size=CONCURRENCY, max_wait_ms=max_wait_ms)
+        elapsed, lat = _run(batcher.embed)
+        _report(f"batch {max_wait_ms:g}ms", elapsed, lat)
+        print(f"{'':<12}   batch trung bình: {batcher.avg_batch_size:.1f} câu")
+        batcher.shutdown()
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,91 @@
+# scripts/bench_reranker.py
+
+import sys
+import os
+import time
+import random
+import statistics
+
+# Thao tác này giúp Python tìm thấy thư mục 'app'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+# -------------------------------------
+
+from app.config import settings
+from app.core.vectorstore import get_vector_collection
+from app.rag.retriever import _dense_search, _hybrid_search, _strip_lexical_metadata
+from app.rag.reranker import Reranker, get_reranker_model
+
+TOP_K = 3
+NUM_QUERIES = 100
+CANDIDATE_SIZES = (10, 20, 30)
+
+
+def build_queries() -> list[tuple[str, str]]:
+    """
+    Câu hỏi = một đoạn giữa chunk (không phải phần mở đầu), nhãn đúng = chunk_id đó.
+    """
+    collection = get_vector_collection()
+    page = collection.get(include=["documents"], limit=5000)
+    pairs = [(doc_id, doc) for doc_id, doc in zip(page["ids"], page["documents"]) if doc and len(doc) > 200]
+
+    rng = random.Random(7)
+    sample = rng.sample(pairs, min(NUM_QUERIES, len(pairs)))
+    return [(doc[80:200], doc_id) for doc_id, doc in sample]
+
+
+def search(collection, query: str, n: int) -> dict:
+    if settings.RETRIEVAL_MODE == "hybrid":
+        return _strip_lexical_metadata(_hybrid_search(collection, query, n))
+    return _strip_lexical_metadata(_dense_search(collection, query, n))
+
+
+def _report(name: str, hits: list[bool], latencies: list[float]):
+    lat_ms = sorted(x * 1000 for x in latencies)
+    p50 = statistics.median(lat_ms)
+    p95 = lat_ms[int(len(lat_ms) * 0.95) - 1]
+    print(
+        f"{name:<16} | hit@{TOP_K} {sum(hits) / len(hits):.3f} "
+        f"| p50 {p50:7.1f} ms | p95 {p95:7.1f} ms"
+    )
+
+
+def run_benchmark():
+    queries = build_queries()
+    if not queries:
+        print("Chưa có dữ liệu trong ChromaDB. Hãy chạy scripts/embed_runner.py trước.")
+        return
+
+    collection = get_vector_collection()
+    get_reranker_model()
+    for q, _ in queries[:3]:  # warm-up (embedding cache + model)
+        search(collection, q, max(CANDIDATE_SIZES))
+
+    print(f"{len(queries)} câu hỏi, chế độ retrieval: {settings.RETRIEVAL_MODE}")
+
+    hits, lat = [], []
+    for q, label in queries:
+        t0 = time.perf_counter()
+        ids = search(collection, q, TOP_K)["ids"][0]
+        lat.append(time.perf_counter() - t0)
+        hits.append(label in ids)
+    _report("không rerank", hits, lat)
+
+    for n in CANDIDATE_SIZES:
+        # Budget rất lớn + cache mới để đo chi phí rerank thật
+        reranker = Reranker(budget_ms=1e9, cache_items=0, batch_size=settings.RERANK_BATCH_SIZE)
+        hits, lat = [], []
+        for q, label in queries:
+            t0 = time.perf_counter()
+            result = search(collection, q, n)
+            ids = result["ids"][0]
+            ranked = reranker.rerank(q, ids, result["documents"][0], started_at=t0)
+            top = [ids[i] for i, _ in ranked[:TOP_K]]
+            lat.append(time.perf_counter() - t0)
+            hits.append(label in top)
+        _report(f"rerank top-{n}", hits, lat)
+        print(f"{'':<16}   ~{reranker.ms_per_pair:.2f} ms/cặp")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,148 @@
+# scripts/bench_semantic_router.py
+
+import sys
+import os
+import statistics
+
+# Thao tác này giúp Python tìm thấy thư mục 'app'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+# -------------------------------------
+
+import numpy as np
+
+from app.config import settings
+from app.erp_tools.router.semantic_router import get_semantic_router
+from app.rag.retriever import get_query_embedding
+
+# =====================================================
+# HIỆU CHỈNH SEMANTIC_ROUTER_MIN_SCORE
+# Điểm cosine cao nhất của từng câu hỏi với câu mẫu intent:
+# - câu hỏi ERP diễn đạt khác câu mẫu (keyword không bắt được) -> nên route đúng
+# - câu hỏi quy trình / kiến thức (RAG) và ngoài nghiệp vụ -> không được route
+# Ngưỡng gợi ý: thấp nhất mà không câu RAG nào bị route và không route sai
+# intent (trả nhầm dữ liệu ERP tệ hơn để RAG trả lời).
+# Điểm phụ thuộc model / backend embedding: đổi EMBEDDING_BACKEND -> chạy lại.
+# =====================================================
+
+# Không trùng câu mẫu trong PROTOTYPES
+ERP_QUESTIONS = [
+    # finance
+    ("Hoá đơn AR-002 khách đã chuyển khoản chưa?", "finance", "ar_invoice_status"),
+    ("Khách số 7 còn thiếu mình bao nhiêu?", "finance", "customer_receivable"),
+    ("Mình đang nợ đối tác 3 bao nhiêu?", "finance", "supplier_payable"),
+    ("Quỹ tiền mặt TK 111 còn lại bao nhiêu?", "finance", "account_balance"),
+    ("Kỳ khoá sổ hiện tại là kỳ nào?", "finance", "current_fiscal_period"),
+    # hrm
+    ("Sáng nay tôi vào làm lúc mấy giờ?", "hrm", "today_attendance"),
+    ("Tôi đang giữ chức danh gì trong công ty?", "hrm", "employee_position"),
+    ("Hợp đồng của tôi còn hiệu lực tới bao giờ?", "hrm", "labor_contract"),
+    ("Tháng 4 tôi được trả bao nhiêu tiền?", "hrm", "payslip"),
+    ("Tôi làm ca sáng hay ca tối?", "hrm", "work_shift"),
+    # sale_crm
+    ("Đơn 15 của tôi tới đâu rồi?", "sale_crm", "order_status"),
+    ("Tôi đã từng đặt những món nào?", "sale_crm", "purchase_history"),
+    ("Mã giảm giá GIAM20 còn xài được không?", "sale_crm", "voucher_check"),
+    ("Đơn 15 tôi thanh toán xong chưa?", "sale_crm", "payment_status"),
+    # supply_chain
+    ("Món nào gần cạn cần nhập thêm?", "supply_chain", "get_low_stock_products"),
+    ("Hàng nào tồn lâu không ai mua?", "supply_chain", "get_dead_stock_products"),
+    ("PO-003 đã được sếp duyệt chưa?", "supply_chain", "get_purchase_order_status"),
+    ("Lô hàng nào mới về kho gần đây?", "supply_chain", "get_recent_goods_receipts"),
+    ("Bên cung ứng nào đáng tin cậy nhất?", "supply_chain", "rank_suppliers_by_performance"),
+    ("Mã IPHONE-15 trong kho còn mấy chiếc?", "supply_chain", "get_inventory_stock_by_sku"),
+]
+
+# Phải rơi về RAG (quy trình, khái niệm) hoặc ngoài nghiệp vụ
+NON_ERP_QUESTIONS = [
+    "Quy trình nhập kho gồm những bước nào?",
+    "Hướng dẫn tạo đơn mua hàng trên hệ thống",
+    "Làm sao để duyệt đề xuất mua?",
+    "Cách tính lương tăng ca theo luật lao động",
+    "Chính sách đổi trả hàng như thế nào?",
+    "Giá vốn hàng bán là gì?",
+    "Thế nào là hàng tồn kho chậm luân chuyển?",
+    "Khi nào thì phải khoá sổ kế toán?",
+    "Quy định nghỉ phép năm của công ty",
+    "Phân quyền người dùng trong ERP thế nào?",
+    "ERP là gì?",
+    "Xin chào",
+    "Hôm nay thời tiết thế nào?",
+    "Viết giúp tôi một bài thơ về mùa thu",
+    "Giá vàng hôm nay bao nhiêu?",
+]
+
+THRESHOLDS = [round(t, 2) for t in np.arange(0.50, 0.951, 0.01)]
+
+
+def best_route(router, question: str) -> tuple[tuple[str, str], float]:
+    scores = router.scores(get_query_embedding(question))
+    best = int(np.argmax(scores))
+    return router.labels[best], float(scores[best])
+
+
+def sweep(erp_results: list[tuple[bool, float]], non_erp_scores: list[float]):
+    """
+    Mỗi ngưỡng -> (ngưỡng, số câu ERP route đúng, route sai intent, câu không phải ERP bị route).
+    """
+    rows = []
+    for threshold in THRESHOLDS:
+        correct = sum(ok and score >= threshold for ok, score in erp_results)
+        wrong = sum(not ok and score >= threshold for ok, score in erp_results)
+        false_routes = sum(score >= threshold for score in non_erp_scores)
+        rows.append((threshold, correct, wrong, false_routes))
+    return rows
+
+
+def suggest_threshold(rows) -> float:
+    # Ưu tiên không sai; trong các ngưỡng "sạch", lấy ngưỡng thấp nhất (route được nhiều nhất)
+    clean = [r for r in rows if r[2] == 0 and r[3] == 0]
+    if clean:
+        return clean[0][0]
+    return min(rows, key=lambda r: (r[2] + r[3], -r[1]))[0]
+
+
+def _summary(scores: list[float]) -> str:
+    if not scores:
+        return "(trống)"
+    return f"min {min(scores):.3f} | median {statistics.median(scores):.3f} | max {max(scores):.3f}"
+
+
+def run_benchmark():
+    router = get_semantic_router()
+    print(f"Backend: {settings.EMBEDDING_BACKEND} | {len(router.labels)} intent có câu mẫu")
+
+    print("\n--- Câu hỏi ERP ---")
+    erp_results = []
+    for question, domain, intent in ERP_QUESTIONS:
+        (got_domain, got_intent), score = best_route(router, question)
+        ok = (got_domain, got_intent) == (domain, intent)
+        erp_results.append((ok, score))
+        mark = "✓" if ok else f"✗ -> {got_domain}.{got_intent}"
+        print(f"  {score:.3f} {mark:<45} {question}")
+
+    print("\n--- Câu hỏi RAG / ngoài nghiệp vụ ---")
+    non_erp_scores = []
+    for question in NON_ERP_QUESTIONS:
+        (got_domain, got_intent), score = best_route(router, question)
+        non_erp_scores.append(score)
+        print(f"  {score:.3f} (gần nhất: {got_domain}.{got_intent}) {question}")
+
+    print("\nPhân bố điểm:")
+    print(f"  ERP route đúng : {_summary([s for ok, s in erp_results if ok])}")
+    print(f"  ERP sai intent : {_summary([s for ok, s in erp_results if not ok])}")
+    print(f"  Không phải ERP : {_summary(non_erp_scores)}")
+
+    rows = sweep(erp_results, non_erp_scores)
+    print("\nNgưỡng | ERP đúng | sai intent | RAG bị route")
+    for threshold, correct, wrong, false_routes in rows:
+        if round(threshold * 100) % 5 == 0 or threshold == settings.SEMANTIC_ROUTER_MIN_SCORE:
+            print(f"  {threshold:.2f} | {correct:>5}/{len(ERP_QUESTIONS)} | {wrong:>10} | {false_routes:>5}/{len(NON_ERP_QUESTIONS)}")
+
+    suggested = suggest_threshold(rows)
+    print(f"\nĐang dùng SEMANTIC_ROUTER_MIN_SCORE = {settings.SEMANTIC_ROUTER_MIN_SCORE}")
+    print(f"Gợi ý: SEMANTIC_ROUTER_MIN_SCORE = {suggested:.2f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
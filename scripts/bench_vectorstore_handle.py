@@ -0,0 +1,88 @@
+# scripts/bench_vectorstore_handle.py
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+import statistics
+
+import numpy as np
+import chromadb
+
+# Thao tác này giúp Python tìm thấy thư mục 'app'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+# -------------------------------------
+
+NUM_CHUNKS = 30000
+DIM = 1024          # Kích thước vector của BAAI/bge-m3
+NUM_QUERIES = 200
+ADD_BATCH = 5000
+COLLECTION = "bench_collection"
+
+
+def build_collection(path: str) -> np.ndarray:
+    """
+    Tạo collection tạm với NUM_CHUNKS vector ngẫu nhiên (đã normalize).
+    """
+    rng = np.random.default_rng(42)
+    vectors = rng.standard_normal((NUM_CHUNKS, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    client = chromadb.PersistentClient(path=path)
+    collection = client.get_or_create_collection(name=COLLECTION)
+    for start in range(0, NUM_CHUNKS, ADD_BATCH):
+        end = min(start + ADD_BATCH, NUM_CHUNKS)
+        collection.add(
+            ids=[f"chunk_{i}" for i in range(start, end)],
+            embeddings=vectors[start:end].tolist(),
+            documents=[f"Nội dung chunk {i}" for i in range(start, end)]
+        )
+    print(f"Đã tạo collection {NUM_CHUNKS} chunks tại {path}")
+    return vectors
+
+
+def _report(name: str, latencies: list[float]):
+    lat_ms = sorted(x * 1000 for x in latencies)
+    p50 = statistics.median(lat_ms)
+    p95 = lat_ms[int(len(lat_ms) * 0.95) - 1]
+    print(f"{name:<22} | p50 {p50:7.2f} ms | p95 {p95:7.2f} ms")
+
+
+def run_benchmark():
+    path = tempfile.mkdtemp(prefix="chroma_bench_")
+    try:
+        vectors = build_collection(path)
+        queries = vectors[:NUM_QUERIES].tolist()
+
+        # TRƯỚC: mỗi truy vấn mở client + lấy collection mới
+        before = []
+        for q in queries:
+            t0 = time.perf_counter()
+            client = chromadb.PersistentClient(path=path)
+            if hasattr(client, "clear_system_cache"):
+                client.clear_system_cache()
+                client = chromadb.PersistentClient(path=path)
+            collection = client.get_or_create_collection(name=COLLECTION)
+            collection.query(query_embeddings=[q], n_results=3)
+            before.append(time.perf_counter() - t0)
+
+        # SAU: dùng chung 1 client / collection
+        client = chromadb.PersistentClient(path=path)
+        collection = client.get_or_create_collection(name=COLLECTION)
+        collection.query(query_embeddings=[queries[0]], n_results=3)  # warm-up
+        after = []
+        for q in queries:
+            t0 = time.perf_counter()
+            collection.query(query_embeddings=[q], n_results=3)
+            after.append(time.perf_counter() - t0)
+
+        _report("client mới mỗi query", before)
+        _report("handle dùng chung", after)
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -2,32 +2,46 @@
 
 import sys
 import os
+import argparse
 
 # --- Thêm đường dẫn dự án vào sys.path ---
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 # -------------------------------------
 
-from app.services.ingestion_service import ingest_pdf_to_chroma
+from app.services.ingestion_pipeline import DEFAULT_KB_DIR, ingest_directory
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Nạp toàn bộ kho tri thức vào ChromaDB")
+    parser.add_argument("--dir", default=DEFAULT_KB_DIR, help="Thư mục kho tri thức")
+    parser.add_argument("--workers", type=int, default=None, help="Số process parse PDF")
+    parser.add_argument("--embed-batch", type=int, default=64, help="Số chunk mỗi lần embed")
+    parser.add_argument("--upsert-batch", type=int, default=256, help="Số chunk mỗi lần ghi Chroma")
+    parser.add_argument("--queue-size", type=int, default=8, help="Số batch tối đa trong mỗi hàng đợi")
+    parser.add_argument("--full", action="store_true", help="Xoá collection + manifest và nạp lại toàn bộ")
+    return parser.parse_args()
+
 
 def run_ingestion():
     """
     Chạy quy trình nạp dữ liệu cho tất cả file trong kho tri thức.
     """
-    
-    # TODO: Đảm bảo bạn có file PDF này
-    file_name = "a.pdf"
-    file_path = os.path.join(project_root, "data", "knowledge_base", file_name)
-    
-    if not os.path.exists(file_path):
-        print(f"LỖI: Không tìm thấy file {file_path}")
-        print("Hãy tạo file PDF mẫu trong 'data/knowledge_base/' để chạy.")
-        return
+    args = parse_args()
 
-    # Chạy service nạp dữ liệu
-    ingest_pdf_to_chroma(file_path)
+    if not os.path.isdir(args.dir):
+        print(f"LỖI: Không tìm thấy thư mục {args.dir}")
+        print("Hãy đặt các file PDF trong 'data/knowledge_base/' để chạy.")
+        return
 
-    # (Trong tương lai, bạn có thể lặp (loop) qua tất cả file trong thư mục)
+    ingest_directory(
+        args.dir,
+        full_rebuild=args.full,
+        workers=args.workers,
+        embed_batch_size=args.embed_batch,
+        upsert_batch_size=args.upsert_batch,
+        queue_size=args.queue_size
+    )
 
 if __name__ == "__main__":
-    run_ingestion()
\ No newline at end of file
+    run_ingestion()
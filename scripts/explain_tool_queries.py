@@ -0,0 +1,182 @@
+# scripts/explain_tool_queries.py
+"""
+Kiểm tra kế hoạch truy vấn của từng tool ERP: chạy tool với tham số mẫu,
+bắt lại các câu SQL nó gửi xuống DB, rồi EXPLAIN từng câu và báo bảng nào
+bị quét tuần tự (Seq Scan).
+
+- PostgreSQL: EXPLAIN trong transaction có `SET LOCAL enable_seqscan = off`,
+  nên Seq Scan còn lại = KHÔNG có index dùng được (bảng seed nhỏ, planner
+  thích quét cả bảng hơn -> không tắt thì báo nhầm).
+- SQLite: EXPLAIN QUERY PLAN, báo các bước "SCAN <bảng>" không dùng index.
+
+Cache tool (TOOL_CACHE_ENABLED) bị tắt để tool nào cũng chạy SQL thật.
+Thoát với mã 1 nếu có tool bị quét tuần tự (dùng được trong CI).
+"""
+
+import sys
+import os
+import re
+import inspect
+import argparse
+from datetime import date
+
+# Thao tác này giúp Python tìm thấy thư mục 'app'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+# -------------------------------------
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.erp_tools.modules.finance_accounting import tools as finance_tools
+from app.erp_tools.modules.hrm import tools as hrm_tools
+from app.erp_tools.modules.sales_crm import tools as sales_crm_tools
+from app.erp_tools.modules.supply_chain import tools as supply_chain_tools
+
+TOOL_MODULES = [finance_tools, hrm_tools, sales_crm_tools, supply_chain_tools]
+
+# Tool ghi dữ liệu -> không chạy
+WRITE_TOOLS = {"create_review"}
+
+# Tham số mẫu theo tên tham số (id không cần tồn tại: plan vẫn như nhau)
+SAMPLE_ARGS = {
+    "month": date.today().month,
+    "year": date.today().year,
+    "keyword": "iphone",
+    "product_keyword": "iphone",
+    "warehouse_keyword": "hà nội",
+    "sku": "SKU-0001",
+    "code": "SALE10",
+    "gr_code": "GR-0001",
+    "gi_code": "GI-0001",
+    "pr_code": "PR-0001",
+    "po_code": "PO-0001",
+    "supplier_code": "SUP-0001",
+    "stocktake_code": "ST-0001",
+    "issue_type": "SALES_ORDER",
+    "ref": "SO-0001",
+    "event_code": "SALE_INVOICE",
+    "required_qty": 1,
+}
+
+SEQ_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"^SCAN (\w+)\b(?! USING (?:COVERING )?INDEX)"),
+}
+
+
+# =====================================================
+# BẮT SQL CỦA TOOL
+# =====================================================
+_captured: list | None = None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if _captured is not None and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        _captured.append((conn.engine, statement, parameters))
+
+
+def sample_kwargs(fn) -> dict:
+    kwargs = {}
+    for name, param in inspect.signature(fn).parameters.items():
+        if name in SAMPLE_ARGS:
+            kwargs[name] = SAMPLE_ARGS[name]
+        elif param.default is not inspect.Parameter.empty:
+            continue
+        elif param.annotation is str:
+            kwargs[name] = "1"
+        else:
+            # *_id, limit... -> 1
+            kwargs[name] = 1
+    return kwargs
+
+
+def collect_tools(only: set[str]) -> list:
+    tools = []
+    for module in TOOL_MODULES:
+        for name, fn in inspect.getmembers(module, inspect.isfunction):
+            if fn.__module__ != module.__name__ or name.startswith("_") or name in WRITE_TOOLS:
+                continue
+            if only and name not in only:
+                continue
+            tools.append((module.__name__.split(".")[-2], name, fn))
+    return tools
+
+
+# =====================================================
+# EXPLAIN
+# =====================================================
+def explain(engine: Engine, statement: str, parameters) -> list[str]:
+    dialect = engine.dialect.name
+    with engine.connect() as connection:
+        with connection.begin():
+            if dialect == "postgresql":
+                connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+                rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+                return [row[0] for row in rows]
+
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[-1] for row in rows]
+
+
+def seq_scanned_tables(engine: Engine, plan: list[str]) -> set[str]:
+    pattern = SEQ_SCAN_PATTERNS.get(engine.dialect.name)
+    if pattern is None:
+        return set()
+    return {
+        match.group(1)
+        for line in plan
+        for match in [pattern.search(line.strip())]
+        if match
+    }
+
+
+def check_tool(fn) -> tuple[int, set[str], str | None]:
+    global _captured
+    _captured = []
+    error = None
+    try:
+        fn(**sample_kwargs(fn))
+    except Exception as e:
+        error = str(e).splitlines()[0]
+    finally:
+        statements, _captured = _captured, None
+
+    tables = set()
+    for engine, statement, parameters in statements:
+        try:
+            plan = explain(engine, statement, parameters)
+        except Exception as e:
+            error = error or str(e).splitlines()[0]
+            continue
+        tables |= seq_scanned_tables(engine, plan)
+    return len(statements), tables, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN SQL của các tool ERP, báo Seq Scan")
+    parser.add_argument("tools", nargs="*", help="Chỉ kiểm tra các tool này (mặc định: tất cả)")
+    args = parser.parse_args()
+
+    settings.TOOL_CACHE_ENABLED = False
+
+    flagged = 0
+    for domain, name, fn in collect_tools(set(args.tools)):
+        count, tables, error = check_tool(fn)
+        if error:
+            status = f"⚠️  lỗi khi chạy: {error}"
+        elif tables:
+            status = "❌ Seq Scan: " + ", ".join(sorted(tables))
+        else:
+            status = "✅"
+        print(f"{domain:<20} {name:<40} {count:>2} câu SQL  {status}")
+        flagged += bool(tables)
+
+    print(f"\n{flagged} tool còn quét tuần tự")
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
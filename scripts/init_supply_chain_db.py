@@ -6,11 +6,14 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 
 from app.db.supply_chain_database import SupplyChainEngine, SupplyChainBase
-import app.erp_tools.modules.supply_chain.models
+from app.erp_tools.modules.supply_chain.models import rebuild_derived_tables_without_triggers
 
 def init_supply_chain_db():
     print("🚀 Đang tạo bảng Supply Chain...")
     SupplyChainBase.metadata.create_all(bind=SupplyChainEngine)
+    # Bảng đã có sẵn dữ liệu (chạy lại sau khi seed) -> tính lại bảng tổng hợp
+    with SupplyChainEngine.begin() as connection:
+        rebuild_derived_tables_without_triggers(connection)
     print("✅ Tạo database Supply Chain thành công!")
 
 if __name__ == "__main__":
@@ -0,0 +1,193 @@
+# scripts/load_test_chat.py
+"""
+Load test đường chat end-to-end với stub Gemini server chạy local.
+
+- Stub server giả lập REST API của Gemini (`:generateContent` và
+  `:streamGenerateContent`), trả lời sau `--delay-ms` để mô phỏng thời gian
+  sinh câu trả lời (bản stream chia đều độ trễ cho STUB_STREAM_CHUNKS đoạn).
+- So sánh các endpoint trên CÙNG một app:
+    /baseline/chat  : endpoint `def` đồng bộ (handle_chat_rag) — chạy trên
+                      threadpool mặc định của Starlette (40 thread)
+    /api/chat       : endpoint async thật của app (chat_service -> *_async)
+    /api/chat/stream: SSE, đo thêm thời gian tới token đầu tiên (TTFT)
+
+Cần ChromaDB đã nạp dữ liệu và DATABASE_URL của bảng chats như khi chạy app.
+Vì stub dùng transport REST, lời gọi LLM async chạy trên pool "llm"
+(LLM_MAX_CONCURRENCY thread); với grpc (mặc định) SDK gọi async native.
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import threading
+
+# Thao tác này giúp Python tìm thấy thư mục 'app'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+# -------------------------------------
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+HOST = "127.0.0.1"
+STUB_PORT = 8091
+APP_PORT = 8092
+STUB_STREAM_CHUNKS = 10
+
+# Phải đặt trước khi import app (Settings đọc biến môi trường lúc import)
+os.environ["LLM_API_ENDPOINT"] = f"http://{HOST}:{STUB_PORT}"
+os.environ["LLM_TRANSPORT"] = "rest"
+
+from app.main import app  # noqa: E402
+from app.db.schemas.chat_schema import ChatRequest, ChatResponse  # noqa: E402
+from app.services.chat_rag import handle_chat_rag  # noqa: E402
+
+# Câu hỏi không khớp từ khoá ERP nào -> đi thẳng vào RAG
+QUESTION = "Quy trình phê duyệt ngân sách dự án trong doanh nghiệp gồm những bước nào?"
+
+
+# =============================
+# STUB GEMINI SERVER
+# =============================
+def build_stub_llm(delay_ms: float) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str):
+        await asyncio.sleep(delay_ms / 1000)
+        return _candidate(f"Câu trả lời mẫu từ {model}.")
+
+    @stub.post("/v1beta/models/{model}:streamGenerateContent")
+    async def stream_generate_content(model: str):
+        # REST streaming của SDK đọc một JSON array được gửi dần từng phần tử
+        async def chunks():
+            yield "["
+            for i in range(STUB_STREAM_CHUNKS):
+                await asyncio.sleep(delay_ms / 1000 / STUB_STREAM_CHUNKS)
+                yield ("," if i else "") + json.dumps(_candidate(f"đoạn {i} "))
+            yield "]"
+
+        return StreamingResponse(chunks(), media_type="application/json")
+
+    return stub
+
+
+def _candidate(text: str) -> dict:
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0
+        }]
+    }
+
+
+def start_server(asgi_app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host=HOST, port=port, log_level="warning"))
+    server.install_signal_handlers = lambda: None  # chạy trong thread phụ
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+# =============================
+# CLIENT
+# =============================
+async def post_json(path: str, payload: dict) -> tuple[int, float | None]:
+    """
+    Gửi POST, đọc hết response. Trả về (status, thời điểm nhận frame "token"
+    đầu tiên tính từ lúc gửi — chỉ có với endpoint SSE).
+    """
+    t0 = time.perf_counter()
+    reader, writer = await asyncio.open_connection(HOST, APP_PORT)
+    body = json.dumps(payload).encode()
+    writer.write(
+        (
+            f"POST {path} HTTP/1.1\r\nHost: {HOST}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode() + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+
+    first_token = None
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        if first_token is None and line.startswith(b"event: token"):
+            first_token = time.perf_counter() - t0
+
+    writer.close()
+    await writer.wait_closed()
+    return int(status_line.split()[1]), first_token
+
+
+async def run_load(path: str, concurrency: int, total: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, ttft, errors = [], [], 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            t0 = time.perf_counter()
+            status, first_token = await post_json(path, {"question": QUESTION, "session_id": f"load_{i % 50}"})
+            latencies.append(time.perf_counter() - t0)
+            if first_token is not None:
+                ttft.append(first_token * 1000)
+            if status != 200:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - t0
+
+    lat_ms = sorted(x * 1000 for x in latencies)
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(lat_ms),
+        "p95": lat_ms[max(0, int(len(lat_ms) * 0.95) - 1)],
+        "ttft": statistics.median(ttft) if ttft else None,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /api/chat với stub LLM")
+    parser.add_argument("--delay-ms", type=float, default=1000, help="Độ trễ giả lập của LLM")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests-per-client", type=int, default=2)
+    args = parser.parse_args()
+
+    # Endpoint đồng bộ kiểu cũ để so sánh
+    def baseline_chat(request: ChatRequest) -> ChatResponse:
+        return handle_chat_rag(request)
+
+    app.add_api_route("/baseline/chat", baseline_chat, methods=["POST"], response_model=ChatResponse)
+
+    start_server(build_stub_llm(args.delay_ms), STUB_PORT)
+    start_server(app, APP_PORT)
+
+    # Warm-up: tải model embedding, mở kết nối DB / Chroma
+    asyncio.run(run_load("/api/chat", 1, 2))
+
+    print(f"Stub LLM delay: {args.delay_ms:.0f} ms")
+    for path in ("/baseline/chat", "/api/chat", "/api/chat/stream"):
+        for c in args.concurrency:
+            r = asyncio.run(run_load(path, c, c * args.requests_per_client))
+            ttft = f" | TTFT p50 {r['ttft']:8.1f} ms" if r["ttft"] is not None else ""
+            print(
+                f"{path:<16} | concurrency {c:4d} | {r['rps']:7.1f} req/s "
+                f"| p50 {r['p50']:8.1f} ms | p95 {r['p95']:8.1f} ms{ttft} | lỗi {r['errors']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
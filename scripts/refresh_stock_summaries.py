@@ -0,0 +1,30 @@
+import sys
+import os
+
+# Cho phép import app/*
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from app.db.supply_chain_database import SupplyChainEngine, SupplyChainBase
+from app.erp_tools.modules.supply_chain.models import rebuild_last_movements, rebuild_stock_summaries
+
+
+def refresh_stock_summaries():
+    """
+    Tạo bảng tổng hợp tồn kho + trigger (PostgreSQL) nếu chưa có,
+    rồi tính lại toàn bộ từ current_stock / inventory_transaction_logs.
+    Dùng khi nâng cấp database cũ, hoặc với database không có trigger (SQLite).
+    """
+    print("🚀 Đang cập nhật bảng tổng hợp tồn kho...")
+    with SupplyChainEngine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            # Tính lại từ toàn bộ current_stock / log lâu hơn statement_timeout của app
+            connection.exec_driver_sql("SET LOCAL statement_timeout = 0")
+        SupplyChainBase.metadata.create_all(bind=connection)
+        rebuild_stock_summaries(connection)
+        rebuild_last_movements(connection)
+    print("✅ Đã cập nhật product_stock_summary / warehouse_stock_summary / product_last_movement!")
+
+
+if __name__ == "__main__":
+    refresh_stock_summaries()
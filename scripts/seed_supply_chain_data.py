@@ -7,7 +7,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 
 from datetime import date
-from app.db.supply_chain_database import SupplyChainSessionLocal
+from app.db.supply_chain_database import SupplyChainEngine, SupplyChainSessionLocal
 
 from app.erp_tools.modules.supply_chain.models import (
     Warehouse,
@@ -22,6 +22,7 @@ from app.erp_tools.modules.supply_chain.models import (
     GoodsReceipt,
     GRItem,
     CurrentStock,
+    rebuild_derived_tables_without_triggers,
 )
 
 def seed_supply_chain_data():
@@ -231,6 +232,10 @@ def seed_supply_chain_data():
 
         # --------------------------------------------------
         db.commit()
+
+        # SQLite không có trigger -> tự tính bảng tổng hợp tồn kho từ current_stock
+        with SupplyChainEngine.begin() as connection:
+            rebuild_derived_tables_without_triggers(connection)
         print("✅ Seed Supply Chain data thành công!")
 
     except Exception as e:
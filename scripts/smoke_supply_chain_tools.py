@@ -0,0 +1,62 @@
+# scripts/smoke_supply_chain_tools.py
+
+import sys
+import os
+import inspect
+
+# Thao tác này giúp Python tìm thấy thư mục 'app'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+# -------------------------------------
+
+from app.erp_tools.router.supply_chain_router import REGISTRY
+
+# =====================================================
+# GỌI THỬ MỌI TOOL ĐÃ GẮN VÀO INTENT SUPPLY CHAIN (không gọi LLM)
+# Bắt lỗi SQL (join sai, cột trùng tên...) trước khi lên /chat thành lỗi 500.
+# Dùng database đã seed (scripts/seed_supply_chain_data.py); kết quả rỗng
+# không sao, chỉ exception mới tính là lỗi.
+# =====================================================
+
+# Tên tham số của tool -> giá trị mẫu khớp dữ liệu seed
+SAMPLE_ARGS = {
+    "product_id": 1,
+    "keyword": "iphone",
+    "sku": "SC-IP15PM",
+    "warehouse": "Hà Nội",
+    "product": "iphone",
+    "bin_id": 1,
+    "gr_code": "GR-001",
+    "gi_code": "GI-001",
+    "ref": "SO-001",
+    "po_id": 1,
+    "po_code": "PO-001",
+    "pr_code": "PR-001",
+    "supplier_id": 1,
+    "supplier_code": "SUP-001",
+    "stocktake_code": "ST-001",
+    "stocktake_id": 1,
+}
+
+
+def smoke_call_tools() -> int:
+    errors = 0
+    for intent in REGISTRY.intents:
+        if intent.tool is None:
+            continue
+
+        parameters = inspect.signature(intent.tool).parameters
+        kwargs = {name: SAMPLE_ARGS[name] for name in parameters if name in SAMPLE_ARGS}
+        try:
+            result = intent.tool(**kwargs)
+            print(f"  ✅ {intent.name}({kwargs}) -> {repr(result)[:80]}")
+        except Exception as e:
+            errors += 1
+            print(f"  ❌ {intent.name}({kwargs}) -> {type(e).__name__}: {e}")
+
+    print(f"\n{'✅ Tất cả tool chạy được' if not errors else f'❌ {errors} tool lỗi'}")
+    return errors
+
+
+if __name__ == "__main__":
+    sys.exit(1 if smoke_call_tools() else 0)